@@ -1,191 +1,198 @@
 #!/usr/bin/env python3
-import os
 import random
-import json
-import time
 import sys
-import threading
 from collections import defaultdict
-import pyfiglet
-from termcolor import colored
-from tqdm import tqdm
-from colorama import init, Fore, Back, Style
-from pynput import keyboard
 
-init(autoreset=True)
+from content import ContentError, load_content
+from renderer import default_renderer, NULL_RENDERER, Renderer
+from saves import Autosaver, SaveStore
 
-SAVE_FILE = "rpg_save_russian.json"
+SAVE_FILE = "rpg_save_russian.json"  # Одиночное сохранение прежних версий: переносится в слот при загрузке
 MAX_LEVEL = 20
 XP_THRESHOLD = 100
 
-TITLE_ART = pyfiglet.figlet_format("RPG ИГРА", font="slant")
+# Контент берется из пакетов content/*.toml|json (см. content.py); при неизменных файлах - из кэша
+CONTENT = load_content()
+CLASS_STATS = {name: char_class["stats"] for name, char_class in CONTENT["classes"].items()}
+LEVEL_UP_STATS = {name: char_class["level_up"] for name, char_class in CONTENT["classes"].items()}
+STARTING_ITEMS = {name: char_class["starting_items"] for name, char_class in CONTENT["classes"].items()}
+ENEMIES = CONTENT["enemies"]
+ITEMS = CONTENT["items"]
+QUESTS = CONTENT["quests"]
+LOCATIONS = CONTENT["locations"]
+HEALTH_POTION = CONTENT["potions"]["health"]
+MANA_POTION = CONTENT["potions"]["mana"]
+COMMON_DROPS = [drop["item"] for drop in CONTENT["drops"] if "min_level" not in drop]
+RARE_DROPS = [(drop["min_level"], drop["item"]) for drop in CONTENT["drops"] if "min_level" in drop]
 
-def animate_text(text, delay=0.03, color='white'):
-    for char in text:
-        print(colored(char, color), end='', flush=True)
-        time.sleep(delay)
-    print()
+class Registry:
+    """Записи контента в исходном порядке и индекс по ключу для поиска за O(1)"""
 
-def loading_screen(description="Загрузка", duration=3):
-    for _ in tqdm(range(100), desc=colored(description, 'yellow'), 
-                 bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}]"):
-        time.sleep(duration/100)
-    print()
+    def __init__(self, kind, entries, key="name"):
+        self.kind = kind
+        self.key = key
+        self.entries = entries
+        self.index = {}
+        for entry in entries:
+            if entry[key] in self.index:
+                raise ContentError(f"{kind}: повторяющийся ключ {entry[key]!r}")
+            self.index[entry[key]] = entry
 
-def frame_text(text, width=60, color='cyan'):
-    border = colored('┌' + '─' * (width-2) + '┐', color)
-    footer = colored('└' + '─' * (width-2) + '┘', color)
-    
-    print(border)
-    for line in text.split('\n'):
-        space = width - 2 - len(line)
-        print(colored('│', color) + line + ' ' * space + colored('│', color))
-    print(footer)
-
-def sound_effect(effect_type):
-    effects = {
-        'hit': '\a', 
-        'level_up': ''.join(['\a' for _ in range(3)]),
-        'error': '\a\a',
-        'item': '\a',
-        'death': ''.join(['\a' for _ in range(5)])
-    }
-    if effect_type in effects:
-        print(effects[effect_type], end='', flush=True)
-        
-def animate_battle_effect(attacker, defender, damage, effect_type='hit'):
-    animations = {
-        'hit': ['   (>o<) ', '  (×_×)  ', ' (>д<)   '],
-        'magic': ['  ⋆*･ﾟ  ', ' ★⋆｡˚   ', '☆･⋆。   '],
-        'critical': [' ✯✯✯⚔️ ', ' ⚔️⚔️⚔️  ', ' ⚔️✯✯✯  ']
-    }
+    def __getitem__(self, key):
+        try:
+            return self.index[key]
+        except KeyError:
+            raise KeyError(f"{self.kind}: нет записи {key!r}") from None
+
+    def get(self, key, default=None):
+        return self.index.get(key, default)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class EnemyTemplate:
+    """Неизменяемый шаблон врага; экземпляры Enemy ссылаются на него, а не копируют его поля"""
+    __slots__ = ("name", "hp", "mp", "strength", "defense", "agility", "xp", "gold", "desc", "attack_msg")
+
+    def __init__(self, **fields):
+        unknown = fields.keys() - set(self.__slots__)
+        if unknown:
+            raise ContentError(f"враг {fields.get('name')!r}: неизвестные поля {sorted(unknown)}")
+        for field in self.__slots__:
+            object.__setattr__(self, field, fields[field])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"шаблон врага {self.name!r} неизменяем")
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+
+def _template_field(name):
+    return property(lambda self: getattr(self.template, name))
+
+
+class Enemy:
+    """Враг в бою: общий шаблон и собственные изменяемые боевые характеристики.
+
+    Как и прежний словарь врага, поддерживает доступ enemy["hp"], которым пользуются боевые формулы.
+    """
+    __slots__ = ("template", "hp", "mp", "strength", "defense", "agility")
+
+    def __init__(self, template, hp=None, strength=None, defense=None):
+        self.template = template
+        self.hp = template.hp if hp is None else hp
+        self.mp = template.mp
+        self.strength = template.strength if strength is None else strength
+        self.defense = template.defense if defense is None else defense
+        self.agility = template.agility
+
+    name = _template_field("name")
+    desc = _template_field("desc")
+    attack_msg = _template_field("attack_msg")
+    xp = _template_field("xp")
+    gold = _template_field("gold")
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def copy(self):
+        enemy = Enemy.__new__(Enemy)
+        for field in self.__slots__:
+            setattr(enemy, field, getattr(self, field))
+        return enemy
+
+
+ENEMY_REGISTRY = Registry("враг", [EnemyTemplate(**enemy) for enemy in ENEMIES])
+QUEST_REGISTRY = Registry("задание", QUESTS, key="id")
+LOCATION_REGISTRY = Registry("локация", LOCATIONS)
+
+STAT_NAMES = ("strength", "defense", "agility", "critical", "luck")  # Характеристики с бонусами экипировки
+
+# Боевые правила - общие для Combat и безголового симулятора (simulator.py)
+ATTACK_SPREAD = (0.8, 1.2)
+ENEMY_SPREAD = (0.8, 1.2)
+SPECIAL_COST = 10
+FLEE_CHANCE = 0.5
+BURN_POWER = 5
+BURN_DURATION = 3
+ENEMY_LEVEL_SCALE = 0.2  # Прирост характеристик врага за каждый уровень персонажа
+
+def scale_enemy(enemy_template, level, scale_step=ENEMY_LEVEL_SCALE):
+    """Экземпляр врага по шаблону с учетом уровня персонажа"""
+    level_scale = 1 + (level - 1) * scale_step
+    return Enemy(enemy_template,
+                 hp=int(enemy_template.hp * level_scale),
+                 strength=int(enemy_template.strength * level_scale),
+                 defense=int(enemy_template.defense * level_scale))
+
+def attack_profile(character, enemy):
+    """Параметры базовой атаки: (шанс уклонения врага, шанс крита, урон, урон при крите)"""
+    # Влияние удачи на уклонение врага
+    dodge_chance = min(0.3, enemy["agility"] / 30) * (1.0 - character.luck / 100)
+    crit_chance = min(0.5, character.critical / 100)
     
-    frames = animations.get(effect_type, animations['hit'])
-    for frame in frames:
-        os.system('cls')
-        print(f"\n{colored(attacker, 'green')} атакует {colored(defender, 'red')}!")
-        print(colored(frame, 'yellow'))
-        print(f"Урон: {colored(str(damage), 'red')}")
-        time.sleep(0.2)
-    time.sleep(0.3)
-
-CLASS_STATS = {
-    "Воин": {"hp": 120, "mp": 20, "strength": 10, "defense": 8, "agility": 5, "critical": 5, "luck": 3},
-    "Маг": {"hp": 80, "mp": 100, "strength": 4, "defense": 4, "agility": 7, "critical": 3, "luck": 5},
-    "Лучник": {"hp": 90, "mp": 50, "strength": 7, "defense": 5, "agility": 10, "critical": 8, "luck": 7}
-}
+    base_damage = character.strength * 2
+    defense_reduction = enemy["defense"] / 2
+    return (dodge_chance, crit_chance,
+            max(1, base_damage - defense_reduction),
+            max(1, base_damage * 1.8 - defense_reduction))
 
-ENEMIES = [
-    {"name": "Гоблин", "hp": 50, "mp": 0, "strength": 5, "defense": 3, "agility": 7, "xp": 20, "gold": 10, 
-     "desc": "Мелкий зеленокожий враг с острыми зубами", "attack_msg": "скалит зубы и замахивается дубиной"},
-    {"name": "Волк", "hp": 40, "mp": 0, "strength": 6, "defense": 2, "agility": 9, "xp": 15, "gold": 5,
-     "desc": "Серый хищник с острыми клыками", "attack_msg": "щелкает челюстями и рычит"},
-    {"name": "Орк", "hp": 80, "mp": 10, "strength": 8, "defense": 5, "agility": 4, "xp": 30, "gold": 15,
-     "desc": "Массивное зеленое создание с боевым топором", "attack_msg": "издает боевой клич и атакует"},
-    {"name": "Скелет", "hp": 60, "mp": 20, "strength": 6, "defense": 4, "agility": 6, "xp": 25, "gold": 12,
-     "desc": "Оживлённые кости мертвеца с ржавым мечом", "attack_msg": "лязгает костями и атакует"},
-    {"name": "Тролль", "hp": 120, "mp": 5, "strength": 12, "defense": 8, "agility": 2, "xp": 45, "gold": 25,
-     "desc": "Огромное и сильное чудовище с дубиной", "attack_msg": "ревет и наносит сокрушительный удар"},
-    {"name": "Тёмный маг", "hp": 70, "mp": 80, "strength": 5, "defense": 3, "agility": 7, "xp": 40, "gold": 30,
-     "desc": "Колдун в черной мантии с магическим посохом", "attack_msg": "произносит заклинание и атакует темной магией"}
-]
-
-ITEMS = {
-    "Зелье здоровья": {"type": "consumable", "effect": {"hp": 50}, "value": 20, "description": "Восстанавливает 50 ОЗ"},
-    "Зелье маны": {"type": "consumable", "effect": {"mp": 30}, "value": 25, "description": "Восстанавливает 30 ОМ"},
-    "Железный меч": {"type": "weapon", "effect": {"strength": 5}, "value": 100, "description": "+5 к Силе"},
-    "Стальной меч": {"type": "weapon", "effect": {"strength": 10}, "value": 250, "description": "+10 к Силе"},
-    "Кожаная броня": {"type": "armor", "effect": {"defense": 5}, "value": 120, "description": "+5 к Защите"},
-    "Стальная броня": {"type": "armor", "effect": {"defense": 10}, "value": 300, "description": "+10 к Защите"},
-    "Сапоги быстроты": {"type": "boots", "effect": {"agility": 5}, "value": 150, "description": "+5 к Ловкости"},
-    "Магический посох": {"type": "weapon", "effect": {"mp": 20, "strength": 3}, "value": 200, "description": "+3 к Силе, +20 ОМ"},
-    "Магическая мантия": {"type": "armor", "effect": {"mp": 15, "defense": 3}, "value": 180, "description": "+3 к Защите, +15 ОМ"},
-    "Амулет удачи": {"type": "accessory", "effect": {"luck": 5}, "value": 220, "description": "+5 к Удаче"},
-    "Кольцо критического удара": {"type": "accessory", "effect": {"critical": 7}, "value": 280, "description": "+7 к Шансу крит. удара"}
-}
+def special_profile(character, enemy):
+    """Параметры специальной атаки: (шанс крита, урон, урон при крите, разброс, шанс горения)"""
+    crit_chance = 0
+    burn_chance = 0
+    
+    if character.char_class == "Воин":
+        # Мощный удар игнорирует часть защиты
+        base_damage = character.strength * 3
+        defense_reduction = enemy["defense"] / 3
+        spread = (0.9, 1.3)
+    elif character.char_class == "Маг":
+        # Огненный шар в основном игнорирует защиту и может поджечь
+        base_damage = character.strength * 2 + character.max_mp / 10
+        defense_reduction = enemy["defense"] / 4
+        spread = (0.9, 1.4)
+        burn_chance = 0.3
+    else:
+        # Меткий выстрел с повышенным шансом крита
+        base_damage = character.strength * 2.5
+        defense_reduction = enemy["defense"] / 3
+        spread = (0.9, 1.2)
+        crit_chance = min(0.7, character.agility / 20)
+    
+    return (crit_chance,
+            max(1, base_damage - defense_reduction),
+            max(1, base_damage * 1.5 - defense_reduction),
+            spread, burn_chance)
 
-QUESTS = [
-    {
-        "id": "q1",
-        "name": "Угроза гоблинов",
-        "description": "Победите 3 гоблинов, угрожающих деревне.",
-        "objective": {"type": "defeat", "target": "Гоблин", "count": 3},
-        "rewards": {"xp": 50, "gold": 30, "items": ["Зелье здоровья"]}
-    },
-    {
-        "id": "q2",
-        "name": "Стая волков",
-        "description": "Очистите лес от стаи волков.",
-        "objective": {"type": "defeat", "target": "Волк", "count": 4},
-        "rewards": {"xp": 60, "gold": 25, "items": ["Кожаная броня"]}
-    },
-    {
-        "id": "q3",
-        "name": "Тёмная магия",
-        "description": "Победите темного мага, который разрушает землю.",
-        "objective": {"type": "defeat", "target": "Тёмный маг", "count": 1},
-        "rewards": {"xp": 100, "gold": 50, "items": ["Магический посох"]}
-    },
-    {
-        "id": "q4",
-        "name": "Древнее зло",
-        "description": "Исследуйте древние руины и победите скрытое зло.",
-        "objective": {"type": "defeat", "target": "Скелет", "count": 5},
-        "rewards": {"xp": 120, "gold": 60, "items": ["Амулет удачи"]}
-    },
-]
-
-LOCATIONS = [
-    {"name": "Деревня", "description": "Мирная деревня с несколькими магазинами.", 
-     "enemies": ["Гоблин"], "enemy_chance": 0.2, 
-     "ascii_art": r"""
-       _   _                              
-      | | | |                             
-  ____| |_| |__   ___ _ __ _____   ___ __ 
- |_  / __| '_ \ / _ \ '_ \______| | '_ \ 
-  / /| |_| | | |  __/ |_) |     | | | | |
- /___|\__|_| |_|\___| .__/      |_|_| |_|
-                    | |                   
-                    |_|                   
-    """},
-    {"name": "Лес", "description": "Густой лес с различной живностью.", 
-     "enemies": ["Волк", "Гоблин"], "enemy_chance": 0.4, 
-     "ascii_art": r"""
-      _                       
-     | |                      
-     | |     ___  ___         
-     | |    / _ \/ __|        
-     | |___|  __/\__ \        
-     \_____/\___||___/        
-                              
-    """},
-    {"name": "Горный перевал", "description": "Опасный горный путь.", 
-     "enemies": ["Орк", "Тролль"], "enemy_chance": 0.5, 
-     "ascii_art": r"""
-    ______  ___  _____ _____ _   _ 
-    | ___ \/ _ \|  _  |_   _| \ | |
-    | |_/ / /_\ \ | | | | | |  \| |
-    |  __/|  _  | | | | | | | . ` |
-    | |   | | | \ \_/ / | | | |\  |
-    \_|   \_| |_/\___/  \_/ \_| \_/
-                                   
-    """},
-    {"name": "Древние руины", "description": "Остатки древней цивилизации.", 
-     "enemies": ["Скелет", "Тёмный маг"], "enemy_chance": 0.6, 
-     "ascii_art": r"""
-     _____       _____  _   _ _____ 
-    |  _  |     |  _  || | | |_   _|
-    | | | |_   _| | | || | | | | |  
-    | | | | | | | | | || | | | | |  
-    \ \_/ / |_| \ \_/ /| |_| | | |  
-     \___/ \__, |\___/  \___/  \_/  
-            __/ |                   
-           |___/                    
-    """}
-]
+def enemy_profile(character, enemy):
+    """Параметры атаки врага: (шанс промаха, урон)"""
+    # Влияние удачи на шанс промаха
+    miss_chance = min(0.2, character.agility / 40) * (1.0 + character.luck / 100)
+    
+    base_damage = enemy["strength"] * 1.5
+    defense_reduction = character.defense / 2
+    return miss_chance, max(1, base_damage - defense_reduction)
 
 class Character:
-    def __init__(self, name, char_class):
+    __slots__ = ("ui", "name", "char_class", "level", "xp", "xp_next", "gold",
+                 "max_hp", "hp", "max_mp", "mp",
+                 "base_strength", "base_defense", "base_agility", "base_critical", "base_luck", "stats",
+                 "equipment", "inventory", "location", "active_quests", "completed_quests", "quest_progress")
+
+    def __init__(self, name, char_class, ui=NULL_RENDERER):
+        self.ui = ui  # Renderer, которому персонаж сообщает о событиях
         self.name = name
         self.char_class = char_class
         self.level = 1
@@ -211,170 +218,124 @@ class Character:
             "accessory": None
         }
         
-        self.inventory = defaultdict(int)
-        
-        if char_class == "Воин":
-            self.inventory["Железный меч"] = 1
-            self.inventory["Кожаная броня"] = 1
-            self.inventory["Зелье здоровья"] = 2
-        elif char_class == "Маг":
-            self.inventory["Магический посох"] = 1
-            self.inventory["Магическая мантия"] = 1
-            self.inventory["Зелье маны"] = 2
-        elif char_class == "Лучник":
-            self.inventory["Железный меч"] = 1
-            self.inventory["Сапоги быстроты"] = 1
-            self.inventory["Зелье здоровья"] = 2
+        self.inventory = defaultdict(int, STARTING_ITEMS[char_class])
             
         self.location = "Деревня"
         
         self.active_quests = {}
         self.completed_quests = []
-        self.quest_progress = defaultdict(lambda: defaultdict(int))
-        
+        self.quest_progress = {}  # id задания -> {цель: побеждено}
+        self.refresh_stats()
+        
+    def refresh_stats(self):
+        """Пересчитать итоговые характеристики (база + экипировка) после изменения любой из них"""
+        stats = {stat: getattr(self, "base_" + stat) for stat in STAT_NAMES}
+        for item_name in self.equipment.values():
+            if item_name:
+                for stat, value in ITEMS[item_name]["effect"].items():
+                    if stat in stats:
+                        stats[stat] += value
+        self.stats = stats
+
     @property
     def strength(self):
-        bonus = 0
-        for slot, item_name in self.equipment.items():
-            if item_name and "strength" in ITEMS[item_name]["effect"]:
-                bonus += ITEMS[item_name]["effect"]["strength"]
-        return self.base_strength + bonus
+        return self.stats["strength"]
     
     @property
     def defense(self):
-        bonus = 0
-        for slot, item_name in self.equipment.items():
-            if item_name and "defense" in ITEMS[item_name]["effect"]:
-                bonus += ITEMS[item_name]["effect"]["defense"]
-        return self.base_defense + bonus
+        return self.stats["defense"]
     
     @property
     def agility(self):
-        bonus = 0
-        for slot, item_name in self.equipment.items():
-            if item_name and "agility" in ITEMS[item_name]["effect"]:
-                bonus += ITEMS[item_name]["effect"]["agility"]
-        return self.base_agility + bonus
+        return self.stats["agility"]
     
     @property
     def critical(self):
-        bonus = 0
-        for slot, item_name in self.equipment.items():
-            if item_name and "critical" in ITEMS[item_name]["effect"]:
-                bonus += ITEMS[item_name]["effect"]["critical"]
-        return self.base_critical + bonus
+        return self.stats["critical"]
     
     @property
     def luck(self):
-        bonus = 0
-        for slot, item_name in self.equipment.items():
-            if item_name and "luck" in ITEMS[item_name]["effect"]:
-                bonus += ITEMS[item_name]["effect"]["luck"]
-        return self.base_luck + bonus
+        return self.stats["luck"]
     
     def add_xp(self, amount):
         self.xp += amount
-        animate_text(f"Вы получили {amount} опыта!", color='yellow')
+        self.ui.emit("xp_gained", amount=amount)
         
         if self.xp >= self.xp_next and self.level < MAX_LEVEL:
             self.level_up()
     
-    def level_up(self):
-        sound_effect('level_up')
+    def advance_level(self):
+        """Повысить уровень и характеристики без вывода на экран"""
+        growth = LEVEL_UP_STATS[self.char_class]
         self.level += 1
         
-        if self.char_class == "Воин":
-            self.max_hp += 20
-            self.max_mp += 5
-            self.base_strength += 3
-            self.base_defense += 2
-            self.base_agility += 1
-            self.base_critical += 1
-            self.base_luck += 1
-        elif self.char_class == "Маг":
-            self.max_hp += 10
-            self.max_mp += 20
-            self.base_strength += 1
-            self.base_defense += 1
-            self.base_agility += 2
-            self.base_critical += 1
-            self.base_luck += 2
-        elif self.char_class == "Лучник":
-            self.max_hp += 15
-            self.max_mp += 10
-            self.base_strength += 2
-            self.base_defense += 1
-            self.base_agility += 3
-            self.base_critical += 2
-            self.base_luck += 1
+        self.max_hp += growth["hp"]
+        self.max_mp += growth["mp"]
+        self.base_strength += growth["strength"]
+        self.base_defense += growth["defense"]
+        self.base_agility += growth["agility"]
+        self.base_critical += growth["critical"]
+        self.base_luck += growth["luck"]
+        self.refresh_stats()
         
         self.hp = self.max_hp
         self.mp = self.max_mp
         
         self.xp_next = XP_THRESHOLD * (self.level + 1)
-        
-        os.system('cls')
-        level_art = pyfiglet.figlet_format("УРОВЕНЬ ПОВЫШЕН!", font="slant")
-        print(colored(level_art, 'yellow'))
-        
-        frame_text(f"Вы достигли {self.level} уровня!\n"
-                  f"ОЗ: {self.max_hp}\n"
-                  f"ОМ: {self.max_mp}\n"
-                  f"Сила: {self.base_strength}\n"
-                  f"Защита: {self.base_defense}\n"
-                  f"Ловкость: {self.base_agility}\n"
-                  f"Крит. шанс: {self.base_critical}%\n"
-                  f"Удача: {self.base_luck}", width=50, color='cyan')
-        
-        input("\nНажмите Enter для продолжения...")
+    
+    def level_up(self):
+        self.advance_level()
+        self.ui.emit("level_up", character=self)
+        self.ui.pause()
     
     def equip_item(self, item_name):
         if item_name not in self.inventory or self.inventory[item_name] <= 0:
-            print(colored(f"У вас нет {item_name} в инвентаре.", "red"))
+            self.ui.emit("item_missing", item=item_name)
             return False
         
         item = ITEMS[item_name]
         if item["type"] not in ["weapon", "armor", "boots", "accessory"]:
-            print(colored(f"Вы не можете экипировать {item_name}. Это {item['type']}.", "red"))
+            self.ui.emit("item_not_equippable", item=item_name, item_type=item["type"])
             return False
         
         # Анимация экипировки
-        loading_screen("Экипировка предмета", 1)
+        self.ui.emit("equipping")
         
         # Снять текущий предмет
         current_item = self.equipment[item["type"]]
         if current_item:
             self.inventory[current_item] += 1
-            print(colored(f"Снято: {current_item}.", "yellow"))
+            self.ui.emit("item_unequipped", item=current_item)
         
         # Экипировать новый предмет
         self.equipment[item["type"]] = item_name
         self.inventory[item_name] -= 1
+        self.refresh_stats()
         
-        print(colored(f"Экипировано: {item_name}!", "green"))
+        self.ui.emit("item_equipped", item=item_name)
         return True
     
     def use_item(self, item_name):
         if item_name not in self.inventory or self.inventory[item_name] <= 0:
-            print(colored(f"У вас нет {item_name} в инвентаре.", "red"))
+            self.ui.emit("item_missing", item=item_name)
             return False
         
         item = ITEMS[item_name]
         if item["type"] != "consumable":
-            print(colored(f"Вы не можете использовать {item_name}. Это {item['type']}.", "red"))
+            self.ui.emit("item_not_usable", item=item_name, item_type=item["type"])
             return False
             
         # Анимация использования
-        sound_effect('item')
+        self.ui.emit("sound", effect="item")
         
         # Применить эффекты предмета
         for stat, value in item["effect"].items():
             if stat == "hp":
                 self.hp = min(self.max_hp, self.hp + value)
-                print(colored(f"Восстановлено {value} ОЗ!", "green"))
+                self.ui.emit("hp_restored", amount=value)
             elif stat == "mp":
                 self.mp = min(self.max_mp, self.mp + value)
-                print(colored(f"Восстановлено {value} ОМ!", "blue"))
+                self.ui.emit("mp_restored", amount=value)
         
         # Удалить из инвентаря
         self.inventory[item_name] -= 1
@@ -384,37 +345,19 @@ class Character:
         return True
     
     def add_quest(self, quest_id):
-        quest = next((q for q in QUESTS if q["id"] == quest_id), None)
+        quest = QUEST_REGISTRY.get(quest_id)
         if not quest:
             return False
         
         if quest_id in self.active_quests or quest_id in self.completed_quests:
-            print(colored("У вас уже есть это задание или вы его уже выполнили.", "yellow"))
+            self.ui.emit("quest_duplicate")
             return False
         
         # Добавить в активные задания
         self.active_quests[quest_id] = quest
         
         # Анимация получения квеста
-        os.system('cls')
-        quest_art = pyfiglet.figlet_format("НОВЫЙ КВЕСТ", font="small")
-        print(colored(quest_art, 'cyan'))
-        
-        print(colored(f"Новое задание принято: {quest['name']}", "cyan"))
-        animate_text(quest['description'], color='white')
-        
-        objective = quest["objective"]
-        print(colored(f"Цель: Победить {objective['count']} {objective['target']}.", "yellow"))
-        
-        print("\nНаграды:")
-        if "xp" in quest["rewards"]:
-            print(colored(f"  Опыт: {quest['rewards']['xp']}", "yellow"))
-        if "gold" in quest["rewards"]:
-            print(colored(f"  Золото: {quest['rewards']['gold']}", "yellow"))
-        if "items" in quest["rewards"]:
-            for item in quest["rewards"]["items"]:
-                print(colored(f"  Предмет: {item}", "green"))
-        
+        self.ui.emit("quest_added", quest=quest)
         return True
     
     def update_quest_progress(self, enemy_name):
@@ -424,10 +367,10 @@ class Character:
         for quest_id, quest in self.active_quests.items():
             objective = quest["objective"]
             if objective["type"] == "defeat" and objective["target"] == enemy_name:
-                self.quest_progress[quest_id][enemy_name] += 1
-                current = self.quest_progress[quest_id][enemy_name]
+                progress = self.quest_progress.setdefault(quest_id, {})
+                current = progress[enemy_name] = progress.get(enemy_name, 0) + 1
                 total = objective["count"]
-                print(colored(f"Прогресс задания: {quest['name']} - {current}/{total} {enemy_name} побеждено", "cyan"))
+                self.ui.emit("quest_progress", quest=quest["name"], current=current, total=total, target=enemy_name)
                 updated = True
                 
                 # Проверить завершение задания
@@ -448,15 +391,7 @@ class Character:
         rewards = quest["rewards"]
         
         # Анимация завершения задания
-        os.system('cls')
-        complete_art = pyfiglet.figlet_format("ЗАДАНИЕ ВЫПОЛНЕНО!", font="small")
-        print(colored(complete_art, 'green'))
-        
-        frame_text(f"{quest['name']}\n\n"
-                  f"Награды:\n"
-                  f"Опыт: {rewards.get('xp', 0)}\n"
-                  f"Золото: {rewards.get('gold', 0)}\n"
-                  f"Предметы: {', '.join(rewards.get('items', []))}", width=60, color='cyan')
+        self.ui.emit("quest_completed", quest=quest)
         
         # Выдать награды
         if "xp" in rewards:
@@ -464,21 +399,22 @@ class Character:
             
         if "gold" in rewards:
             self.gold += rewards["gold"]
-            print(colored(f"Получено {rewards['gold']} золота!", "yellow"))
+            self.ui.emit("gold_received", amount=rewards["gold"])
             
         if "items" in rewards:
             for item in rewards["items"]:
                 self.inventory[item] += 1
-                print(colored(f"Получен предмет: {item}!", "green"))
+                self.ui.emit("item_received", item=item)
                 
         # Удалить из активных заданий и добавить в завершенные
         del self.active_quests[quest_id]
         self.completed_quests.append(quest_id)
         
-        input("\nНажмите Enter для продолжения...")
+        self.ui.pause()
         return True
     
     def to_dict(self):
+        """Снимок для сохранения: не разделяет изменяемых данных с персонажем (пишется фоновым потоком)"""
         return {
             "name": self.name,
             "char_class": self.char_class,
@@ -495,17 +431,17 @@ class Character:
             "base_agility": self.base_agility,
             "base_critical": self.base_critical,
             "base_luck": self.base_luck,
-            "equipment": self.equipment,
+            "equipment": dict(self.equipment),
             "inventory": dict(self.inventory),
             "location": self.location,
             "active_quests": {k: q["id"] for k, q in self.active_quests.items()},
-            "completed_quests": self.completed_quests,
+            "completed_quests": list(self.completed_quests),
             "quest_progress": {k: dict(v) for k, v in self.quest_progress.items()}
         }
     
     @classmethod
-    def from_dict(cls, data):
-        character = cls(data["name"], data["char_class"])
+    def from_dict(cls, data, ui=NULL_RENDERER):
+        character = cls(data["name"], data["char_class"], ui)
         character.level = data["level"]
         character.xp = data["xp"]
         character.xp_next = data["xp_next"]
@@ -519,36 +455,36 @@ class Character:
         character.base_agility = data["base_agility"]
         character.base_critical = data["base_critical"]
         character.base_luck = data["base_luck"]
-        character.equipment = data["equipment"]
+        character.equipment = dict(data["equipment"])
+        character.refresh_stats()
         character.inventory = defaultdict(int, data["inventory"])
         character.location = data["location"]
         
         # Восстановить задания
-        character.completed_quests = data["completed_quests"]
+        character.completed_quests = list(data["completed_quests"])
         for quest_id in data["active_quests"].values():
-            quest = next((q for q in QUESTS if q["id"] == quest_id), None)
+            quest = QUEST_REGISTRY.get(quest_id)
             if quest:
                 character.active_quests[quest_id] = quest
                 
         # Восстановить прогресс заданий
-        character.quest_progress = defaultdict(lambda: defaultdict(int))
-        for quest_id, progress in data["quest_progress"].items():
-            for target, count in progress.items():
-                character.quest_progress[quest_id][target] = count
+        character.quest_progress = {quest_id: dict(progress) for quest_id, progress in data["quest_progress"].items()}
                 
         return character
 
 
 class Combat:
-    def __init__(self, character, enemy):
+    def __init__(self, character, enemy, rng=None):
         self.character = character
+        self.ui = character.ui
+        self.rng = rng or random  # Генератор сессии (Game.rng); без него - общий модуль random
         self.enemy = self.prepare_enemy(enemy)
         self.turn = 0
         self.effects = []  # Статус эффекты в бою
         
-    def prepare_enemy(self, enemy_template):
-        """Создать копию шаблона врага"""
-        return {**enemy_template}
+    def prepare_enemy(self, enemy):
+        """Свой экземпляр врага на этот бой: из шаблона или копия уже масштабированного"""
+        return enemy.copy() if isinstance(enemy, Enemy) else Enemy(enemy)
     
     def character_turn(self, action):
         """Обработать ход персонажа"""
@@ -557,93 +493,61 @@ class Combat:
         
         if action == "attack":
             # Базовая атака
-            base_damage = self.character.strength * 2
-            dodge_chance = min(0.3, self.enemy["agility"] / 30)
-            
-            # Влияние удачи на уклонение врага
-            dodge_modifier = 1.0 - (self.character.luck / 100)
-            dodge_chance *= dodge_modifier
+            dodge_chance, crit_chance, damage, crit_damage = attack_profile(self.character, self.enemy)
             
-            if random.random() < dodge_chance:
-                print(colored(f"{self.enemy['name']} уклонился от атаки!", "yellow"))
+            if self.rng.random() < dodge_chance:
+                self.ui.emit("dodge", enemy=self.enemy["name"])
                 return False
                 
             # Проверка на критический удар
-            crit_chance = min(0.5, self.character.critical / 100)
-            crit_hit = False
-            
-            if random.random() < crit_chance:
-                base_damage *= 1.8
-                crit_hit = True
+            if self.rng.random() < crit_chance:
+                damage = crit_damage
                 effect_type = 'critical'
-                print(colored("КРИТИЧЕСКИЙ УДАР!", "red", attrs=['bold']))
+                self.ui.emit("critical")
                 
             # Рассчитать урон с учетом защиты
-            defense_reduction = self.enemy["defense"] / 2
-            damage = max(1, base_damage - defense_reduction)
-            damage = round(damage * random.uniform(0.8, 1.2))  # Добавить случайность
+            damage = round(damage * self.rng.uniform(*ATTACK_SPREAD))  # Добавить случайность
             
             # Анимация атаки
-            if crit_hit:
-                animate_battle_effect(self.character.name, self.enemy["name"], damage, 'critical')
-            else:
-                animate_battle_effect(self.character.name, self.enemy["name"], damage, 'hit')
+            self.ui.emit("battle_effect", attacker=self.character.name, defender=self.enemy["name"],
+                         damage=damage, effect=effect_type)
                 
             self.enemy["hp"] -= damage
-            print(colored(f"Вы нанесли {self.enemy['name']} {damage} урона!", "green"))
+            self.ui.emit("hit", enemy=self.enemy["name"], damage=damage)
             
         elif action == "special":
             # Специальная атака - стоит ОМ
-            if self.character.mp < 10:
-                print(colored("Недостаточно ОМ для специальной атаки!", "red"))
-                sound_effect('error')
+            if self.character.mp < SPECIAL_COST:
+                self.ui.emit("no_mana")
+                self.ui.emit("sound", effect="error")
                 return False
                 
-            self.character.mp -= 10
+            self.character.mp -= SPECIAL_COST
+            crit_chance, damage, crit_damage, spread, burn_chance = special_profile(self.character, self.enemy)
             
-            if self.character.char_class == "Воин":
-                # Воин: Мощный удар (высокий урон)
-                print(colored("Вы используете МОЩНЫЙ УДАР!", "yellow"))
-                base_damage = self.character.strength * 3
-                defense_reduction = self.enemy["defense"] / 3  # Игнорирует часть защиты
-                damage = max(1, base_damage - defense_reduction)
-                damage = round(damage * random.uniform(0.9, 1.3))
-                effect_type = 'hit'
-                
-            elif self.character.char_class == "Маг":
+            self.ui.emit("special_attack", char_class=self.character.char_class)
+            if self.character.char_class == "Маг":
                 # Маг: Огненный шар (магический урон, игнорирует физическую защиту)
-                print(colored("Вы создаете ОГНЕННЫЙ ШАР!", "yellow"))
-                base_damage = self.character.strength * 2 + self.character.max_mp / 10
-                defense_reduction = self.enemy["defense"] / 4  # В основном игнорирует защиту
-                damage = max(1, base_damage - defense_reduction)
-                damage = round(damage * random.uniform(0.9, 1.4))
                 effect_type = 'magic'
                 
-                # Шанс наложить эффект горения
-                if random.random() < 0.3:
-                    self.effects.append({"target": "enemy", "type": "burn", "duration": 3, "power": 5})
-                    print(colored(f"{self.enemy['name']} загорелся! (Получает 5 урона каждый ход в течение 3 ходов)", "red"))
-                
-            elif self.character.char_class == "Лучник":
-                # Лучник: Меткий выстрел (шанс критического удара)
-                print(colored("Вы делаете МЕТКИЙ ВЫСТРЕЛ!", "yellow"))
-                base_damage = self.character.strength * 2.5
-                crit_chance = min(0.7, self.character.agility / 20)
+            if crit_chance and self.rng.random() < crit_chance:
+                self.ui.emit("critical")
+                damage = crit_damage
+                effect_type = 'critical'
                 
-                if random.random() < crit_chance:
-                    print(colored("КРИТИЧЕСКИЙ УДАР!", "red", attrs=['bold']))
-                    base_damage *= 1.5
-                    effect_type = 'critical'
-                    
-                defense_reduction = self.enemy["defense"] / 3
-                damage = max(1, base_damage - defense_reduction)
-                damage = round(damage * random.uniform(0.9, 1.2))
+            damage = round(damage * self.rng.uniform(*spread))
+            
+            # Шанс наложить эффект горения
+            if burn_chance and self.rng.random() < burn_chance:
+                self.effects.append({"target": "enemy", "type": "burn", "duration": BURN_DURATION, "power": BURN_POWER})
+                self.ui.emit("burning", enemy=self.enemy["name"], power=BURN_POWER, duration=BURN_DURATION)
             
             # Анимация атаки
-            animate_battle_effect(self.character.name, self.enemy["name"], damage, effect_type)
+            self.ui.emit("battle_effect", attacker=self.character.name, defender=self.enemy["name"],
+                         damage=damage, effect=effect_type)
             
             self.enemy["hp"] -= damage
-            print(colored(f"Вы использовали специальную атаку против {self.enemy['name']} и нанесли {damage} урона!", "blue"))
+            self.ui.emit("special_hit", enemy=self.enemy["name"], damage=damage)
             
         elif action == "use_potion":
             # Пусть игровой цикл обрабатывает использование зелий
@@ -657,31 +561,24 @@ class Combat:
     def enemy_turn(self):
         """Обработать ход врага"""
         # Шанс врага промахнуться
-        miss_chance = min(0.2, self.character.agility / 40)
-        
-        # Влияние удачи на шанс промаха
-        miss_modifier = 1.0 + (self.character.luck / 100)
-        miss_chance *= miss_modifier
+        miss_chance, damage = enemy_profile(self.character, self.enemy)
         
-        if random.random() < miss_chance:
-            print(colored(f"{self.enemy['name']} промахнулся!", "green"))
+        if self.rng.random() < miss_chance:
+            self.ui.emit("enemy_miss", enemy=self.enemy["name"])
             return
             
         # Рассчитать урон врага с учетом защиты
-        base_damage = self.enemy["strength"] * 1.5
-        defense_reduction = self.character.defense / 2
-        damage = max(1, base_damage - defense_reduction)
-        damage = round(damage * random.uniform(0.8, 1.2))  # Добавить случайность
+        damage = round(damage * self.rng.uniform(*ENEMY_SPREAD))  # Добавить случайность
         
         # Аннимация атаки врага
-        print(colored(f"\n{self.enemy['name']} {self.enemy['attack_msg']}!", "yellow"))
-        time.sleep(0.5)
+        self.ui.emit("enemy_attack", enemy=self.enemy["name"], message=self.enemy["attack_msg"])
         
         # Анимация получения урона
-        animate_battle_effect(self.enemy["name"], self.character.name, damage, 'hit')
+        self.ui.emit("battle_effect", attacker=self.enemy["name"], defender=self.character.name,
+                     damage=damage, effect="hit")
         
         self.character.hp -= damage
-        print(colored(f"{self.enemy['name']} атаковал вас и нанес {damage} урона!", "red"))
+        self.ui.emit("enemy_hit", enemy=self.enemy["name"], damage=damage)
         
         # Обработать эффекты после хода врага
         self.process_effects()
@@ -706,50 +603,48 @@ class Combat:
             if effect["type"] == "burn" and effect["target"] == "enemy":
                 burn_damage = effect["power"]
                 self.enemy["hp"] -= burn_damage
-                print(colored(f"{self.enemy['name']} получает {burn_damage} урона от горения!", "red"))
+                self.ui.emit("burn_damage", enemy=self.enemy["name"], damage=burn_damage)
                 
             elif effect["type"] == "poison" and effect["target"] == "character":
                 poison_damage = effect["power"]
                 self.character.hp -= poison_damage
-                print(colored(f"Вы получаете {poison_damage} урона от яда!", "red"))
+                self.ui.emit("poison_damage", damage=poison_damage)
                 
             # Сохранить эффекты с оставшейся длительностью
             if effect["duration"] > 0:
                 new_effects.append(effect)
             else:
-                print(colored(f"Эффект {effect['type']} закончился!", "yellow"))
+                self.ui.emit("effect_ended", effect=effect["type"])
                 
         self.effects = new_effects
         
     def award_rewards(self):
         """Выдать награды за победу над врагом"""
         if self.is_enemy_defeated():
-            victory_art = pyfiglet.figlet_format("ПОБЕДА!", font="banner3-D")
-            print(colored(victory_art, 'green'))
-            
-            animate_text(f"Вы победили {self.enemy['name']}!", color='green')
+            self.ui.emit("victory", enemy=self.enemy["name"])
             
             # Выдать опыт
             xp = self.enemy["xp"]
-            print(colored(f"Вы получили {xp} опыта!", "yellow"))
+            self.ui.emit("xp_reward", amount=xp)
             self.character.add_xp(xp)
             
             # Выдать золото
             gold = self.enemy["gold"]
-            print(colored(f"Вы нашли {gold} золота!", "yellow"))
+            self.ui.emit("gold_found", amount=gold)
             self.character.gold += gold
             
             # Шанс выпадения предмета (30% + бонус от удачи)
             drop_chance = 0.3 + (self.character.luck / 200)  # Максимум +10% от удачи
-            if random.random() < drop_chance:
+            if self.rng.random() < drop_chance:
                 # С увеличением уровня могут выпадать лучшие предметы
-                if self.character.level >= 3 and random.random() < 0.3:
-                    possible_items = ["Зелье здоровья", "Зелье маны", "Амулет удачи"]
+                rare_items = [item for level, item in RARE_DROPS if self.character.level >= level]
+                if rare_items and self.rng.random() < 0.3:
+                    possible_items = COMMON_DROPS + rare_items
                 else:
-                    possible_items = ["Зелье здоровья", "Зелье маны"]
+                    possible_items = COMMON_DROPS
                     
-                item = random.choice(possible_items)
-                print(colored(f"{self.enemy['name']} выронил {item}!", "green"))
+                item = self.rng.choice(possible_items)
+                self.ui.emit("item_dropped", enemy=self.enemy["name"], item=item)
                 self.character.inventory[item] += 1
                 
             # Обновить прогресс заданий
@@ -759,39 +654,463 @@ class Combat:
         return False
 
 
+# Игровое ядро: команды меняют GameState и сообщают о событиях, ничего не спрашивая у игрока.
+# Game ниже - терминальный клиент поверх него; боты и серверы применяют те же команды напрямую.
+
+REST_COST = 10
+
+
+def shop_items(location_name):
+    """Товары магазина локации (поле shop в пакете контента); пустой список - магазина нет"""
+    return LOCATION_REGISTRY.get(location_name, {}).get("shop", [])
+
+
+class EventLog(Renderer):
+    """Renderer ядра: копит события текущей команды и сразу передает их ui клиента, если он задан.
+
+    Пауза тоже событие - ("pause", {"prompt": ...}): бот видит, где игрок читал
+    бы экран, а терминал ждет Enter там же, где и раньше. Перед паузой
+    вызывается checkpoint (автосохранение): игрок может выйти, не дочитав.
+    """
+
+    def __init__(self, ui=None, checkpoint=None):
+        self.ui = ui
+        self.checkpoint = checkpoint
+        self.events = []
+
+    def emit(self, kind, **data):
+        self.events.append((kind, data))
+        if self.ui:
+            self.ui.emit(kind, **data)
+
+    def ask(self, prompt, **data):
+        raise RuntimeError(f"ядро не задает вопросов ({prompt}): ответ передается аргументом команды")
+
+    def pause(self, prompt="continue"):
+        self.events.append(("pause", {"prompt": prompt}))
+        if self.checkpoint:
+            self.checkpoint()
+        if self.ui:
+            self.ui.pause(prompt)
+
+    def last(self):
+        """Вид последнего события - отказ, которым закончился метод персонажа"""
+        return self.events[-1][0]
+
+
+class Result:
+    """Итог команды.
+
+    ok - команда выполнена; error - вид события отказа (состояние не менялось);
+    events - [(вид, данные)] по порядку, данные - живые объекты, как у renderer;
+    outcome - "victory", "defeat" или "fled", если команда завершила бой.
+    """
+    __slots__ = ("ok", "error", "events", "outcome")
+
+    def __init__(self, error, events, outcome=None):
+        self.ok = error is None
+        self.error = error
+        self.events = events
+        self.outcome = outcome
+
+    def kinds(self):
+        """Виды событий по порядку"""
+        return [kind for kind, _ in self.events]
+
+    def __repr__(self):
+        return f"Result(ok={self.ok}, error={self.error!r}, events={len(self.events)}, outcome={self.outcome!r})"
+
+
+class GameState:
+    """Персонаж, генератор случайностей сессии и текущий бой - все, к чему применяются команды"""
+
+    def __init__(self, character, rng=None, log=None):
+        self.character = character
+        self.rng = rng or random.Random()
+        self.log = log or EventLog()
+        character.ui = self.log  # Опыт, уровни и задания персонажа - тоже события команды
+        self.combat = None  # Combat, пока идет бой: тогда доступны только боевые команды
+        self.enemy_max_hp = None
+        self.destination = None  # Куда шел персонаж, когда на него напали: путь продолжится после боя
+        self.outcome = None
+
+    def apply(self, command):
+        """Выполнить команду и вернуть Result; бой, в котором кто-то пал, завершается здесь же"""
+        self.log.events = []
+        self.outcome = None
+        if command.in_combat is not None and command.in_combat != (self.combat is not None):
+            error = "no_combat" if command.in_combat else "in_combat"
+            self.log.emit(error)
+        else:
+            error = command.apply(self)
+            if self.combat and (self.combat.is_character_defeated() or self.combat.is_enemy_defeated()):
+                self.end_combat()
+        return Result(error, self.log.events, self.outcome)
+
+    def start_combat(self):
+        """Встреча со случайным врагом текущей локации"""
+        location = LOCATION_REGISTRY.get(self.character.location, LOCATIONS[0])
+        enemy_name = self.rng.choice(location["enemies"])
+        enemy_template = ENEMY_REGISTRY.get(enemy_name, ENEMY_REGISTRY.entries[0])
+        
+        # Масштабировать врага с учетом уровня персонажа
+        enemy_template = scale_enemy(enemy_template, self.character.level)
+        
+        self.log.emit("combat_start", character=self.character, enemy=enemy_template)
+        self.combat = Combat(self.character, enemy_template, self.rng)
+        self.enemy_max_hp = enemy_template["hp"]
+
+    def end_combat(self):
+        """Награды за победу или поражение"""
+        if self.combat.is_enemy_defeated():
+            self.combat.award_rewards()  # Опыт, золото, добыча и завершение заданий
+            self.leave_combat("victory")
+        else:
+            self.log.emit("defeat")
+            
+            # Позволить игроку продолжить с низким здоровьем
+            self.character.hp = 1
+            self.log.emit("revived")
+            self.character.location = "Деревня"
+            self.leave_combat("defeat")
+
+    def leave_combat(self, outcome):
+        self.outcome = outcome
+        self.log.pause()
+        self.combat = self.enemy_max_hp = None
+        self.finish_travel()
+
+    def finish_travel(self):
+        """Прийти в destination, если персонаж был в пути"""
+        destination, self.destination = self.destination, None
+        # Сменить локацию если выжил в бою
+        if destination and not self.character.hp <= 0:
+            location = LOCATION_REGISTRY[destination]
+            self.character.location = location["name"]
+            self.log.emit("arrived", location=location)
+
+
+class Command:
+    """Действие игрока: apply(state) меняет состояние, сообщая о событиях в state.log,
+    и возвращает None или вид события отказа"""
+    __slots__ = ()
+    in_combat = False  # True - только в бою, False - только вне боя, None - в любой момент
+
+    def apply(self, state):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(repr(getattr(self, name)) for name in self.__slots__)})"
+
+
+class Encounter(Command):
+    """Случайная встреча между действиями игрока (game_loop проверяет ее перед каждым меню)"""
+    __slots__ = ()
+
+    def apply(self, state):
+        location = LOCATION_REGISTRY.get(state.character.location, LOCATIONS[0])
+        if state.rng.random() < location["enemy_chance"] * 0.3:  # Уменьшенный шанс по сравнению с исследованием
+            state.log.emit("location_encounter", location=state.character.location)
+            state.log.emit("sound", effect="hit")
+            state.log.pause()
+            state.start_combat()
+
+
+class Explore(Command):
+    """Исследовать текущую локацию: враг, находка или ничего"""
+    __slots__ = ()
+
+    def apply(self, state):
+        character, rng, log = state.character, state.rng, state.log
+        location = LOCATION_REGISTRY.get(character.location, LOCATIONS[0])
+        
+        log.emit("explore", location=location)
+        
+        # Случайный шанс встречи с врагом в зависимости от локации
+        if rng.random() < location["enemy_chance"]:
+            log.emit("encounter")
+            log.emit("sound", effect="hit")
+            log.pause()
+            state.start_combat()
+        # Нет врага, но может быть найдется что-то
+        elif rng.random() < 0.4:  # 40% шанс найти что-то
+            if rng.random() < 0.7:  # 70% времени найти зелье
+                item = HEALTH_POTION if rng.random() < 0.5 else MANA_POTION
+                character.inventory[item] += 1
+                log.emit("found_item", item=item)
+                log.emit("sound", effect="item")
+            else:  # 30% времени найти золото
+                gold = rng.randint(5, 20)
+                character.gold += gold
+                log.emit("found_gold", amount=gold)
+        else:
+            log.emit("found_nothing")
+
+
+class Travel(Command):
+    """Отправиться в локацию destination (по имени); по дороге может напасть враг"""
+    __slots__ = ("destination",)
+
+    def __init__(self, destination):
+        self.destination = destination
+
+    def apply(self, state):
+        location = LOCATION_REGISTRY.get(self.destination)
+        if not location or location["name"] == state.character.location:
+            state.log.emit("invalid_direction")
+            return "invalid_direction"
+        
+        state.log.emit("travelling", destination=location["name"])
+        state.destination = location["name"]
+        
+        # Шанс случайного боя при путешествии
+        if state.rng.random() < 0.4:  # 40% шанс встретить врага
+            state.log.emit("travel_ambush")
+            state.log.pause()
+            state.start_combat()
+        else:
+            state.finish_travel()
+
+
+def shop_refusal(state):
+    if not shop_items(state.character.location):
+        state.log.emit("no_shop")
+        return "no_shop"
+
+
+class Buy(Command):
+    """Купить предмет item в магазине текущей локации"""
+    __slots__ = ("item",)
+
+    def __init__(self, item):
+        self.item = item
+
+    def apply(self, state):
+        character = state.character
+        refusal = shop_refusal(state)
+        if refusal:
+            return refusal
+        if self.item not in shop_items(character.location):
+            state.log.emit("not_for_sale", item=self.item)
+            return "not_for_sale"
+        
+        price = ITEMS[self.item]["value"]
+        if character.gold < price:
+            state.log.emit("not_enough_gold", item=self.item)
+            state.log.emit("sound", effect="error")
+            return "not_enough_gold"
+        
+        # Эффект покупки
+        state.log.emit("buying")
+        character.gold -= price
+        character.inventory[self.item] += 1
+        state.log.emit("bought", item=self.item, price=price)
+        state.log.emit("sound", effect="item")
+
+
+class Sell(Command):
+    """Продать предмет item за полцены"""
+    __slots__ = ("item",)
+
+    def __init__(self, item):
+        self.item = item
+
+    def apply(self, state):
+        character = state.character
+        refusal = shop_refusal(state)
+        if refusal:
+            return refusal
+        if character.inventory.get(self.item, 0) <= 0:
+            state.log.emit("item_missing", item=self.item)
+            return "item_missing"
+        if self.item in character.equipment.values():
+            state.log.emit("cannot_sell_equipped")
+            return "cannot_sell_equipped"
+        
+        sell_price = ITEMS[self.item]["value"] // 2
+        
+        # Эффект продажи
+        state.log.emit("selling")
+        character.inventory[self.item] -= 1
+        if character.inventory[self.item] <= 0:
+            del character.inventory[self.item]
+        character.gold += sell_price
+        state.log.emit("sold", item=self.item, price=sell_price)
+        state.log.emit("sound", effect="item")
+
+
+class Equip(Command):
+    """Экипировать предмет item из инвентаря"""
+    __slots__ = ("item",)
+
+    def __init__(self, item):
+        self.item = item
+
+    def apply(self, state):
+        if not state.character.equip_item(self.item):
+            return state.log.last()
+
+
+class Use(Command):
+    """Использовать расходник item; в бою после этого ходит враг"""
+    __slots__ = ("item",)
+    in_combat = None
+
+    def __init__(self, item):
+        self.item = item
+
+    def apply(self, state):
+        if not state.character.use_item(self.item):
+            return state.log.last()
+        if state.combat:
+            state.combat.enemy_turn()
+
+
+class Attack(Command):
+    """Базовая атака; если враг не уклонился и устоял, он отвечает"""
+    __slots__ = ()
+    in_combat = True
+
+    def apply(self, state):
+        if state.combat.character_turn("attack") and not state.combat.is_enemy_defeated():
+            state.combat.enemy_turn()
+
+
+class Special(Command):
+    """Специальная атака класса за SPECIAL_COST ОМ"""
+    __slots__ = ()
+    in_combat = True
+
+    def apply(self, state):
+        if not state.combat.character_turn("special"):
+            return "no_mana"
+        if not state.combat.is_enemy_defeated():
+            state.combat.enemy_turn()
+
+
+class Flee(Command):
+    """Попытка сбежать (FLEE_CHANCE); неудача дает врагу бесплатную атаку"""
+    __slots__ = ()
+    in_combat = True
+
+    def apply(self, state):
+        state.log.emit("flee_attempt")
+        if state.rng.random() < FLEE_CHANCE:
+            state.log.emit("fled")
+            state.leave_combat("fled")
+        else:
+            state.log.emit("flee_failed")
+            state.combat.enemy_turn()
+
+
+class Rest(Command):
+    """Отдых в таверне Деревни за REST_COST золота: ОЗ и ОМ полностью восстанавливаются"""
+    __slots__ = ()
+
+    def apply(self, state):
+        character = state.character
+        if character.location != "Деревня":
+            state.log.emit("rest_village_only")
+            return "rest_village_only"
+        if character.gold < REST_COST:
+            state.log.emit("rest_no_gold")
+            return "rest_no_gold"
+        
+        character.gold -= REST_COST
+        
+        # Анимация отдыха
+        state.log.emit("resting")
+        character.hp = character.max_hp
+        character.mp = character.max_mp
+        state.log.emit("rested")
+
+
+class AcceptQuest(Command):
+    """Взять задание quest_id (задания выдают только в Деревне)"""
+    __slots__ = ("quest_id",)
+
+    def __init__(self, quest_id):
+        self.quest_id = quest_id
+
+    def apply(self, state):
+        if state.character.location != "Деревня":
+            state.log.emit("visit_village")
+            return "visit_village"
+        if self.quest_id not in QUEST_REGISTRY:
+            state.log.emit("unknown_quest", quest=self.quest_id)
+            return "unknown_quest"
+        if not state.character.add_quest(self.quest_id):
+            return state.log.last()
+
+
+AUTO_BATTLE_CHOICES = {
+    "attack": ("1", "Атака"),
+    "special": ("2", "Специальная атака"),
+    "health_potion": ("3", HEALTH_POTION),
+    "mana_potion": ("3", MANA_POTION),
+    "flee": ("4", "Бежать")
+}
+
+
 class Game:
-    def __init__(self):
+    def __init__(self, ui=None, autosave=True, store=None, seed=None, legacy_save=SAVE_FILE):
+        self.ui = ui or default_renderer()  # Весь ввод и вывод игры идет через renderer
+        self.seed = seed
+        self.rng = random.Random(seed)  # Все случайности сессии: с тем же зерном и вводом игра повторяется
         self.character = None
+        self.state = None  # GameState персонажа: все действия в игре - команды ядра
+        self.saves = store or SaveStore()  # SaveStore (папка saves/) или database.CharacterDB
+        self.autosaver = Autosaver(self.saves)  # Единственный, кто пишет в saves во время игры
+        self.autosave_enabled = autosave
+        self.slot = None  # Слот сохранения текущего персонажа
+        self.legacy_save = legacy_save  # Одиночное сохранение прежних версий для переноса или None
         self.running = True
         self.listener = None
+        self.auto_battler = None  # Общий для всех боёв, чтобы таблица транспозиций не терялась
+        
+    def autosave(self, full=False):
+        """Отдать снимок персонажа фоновому сохранению (изменения - в журнал слота); ввод игры не ждет записи"""
+        if not (self.autosave_enabled and self.character and self.slot):
+            return
+        error = self.autosaver.take_error()
+        if error:
+            self.ui.emit("autosave_failed", error=str(error))
+        self.autosaver.request(self.slot, self.character.to_dict(), full)
+        
+    def close(self):
+        """Дописать автосохранение перед выходом и отпустить журнал слота"""
+        self.autosaver.close()
+        if self.slot:
+            self.saves.release(self.slot)
+        self.saves.close()
+        
+    def use_character(self, character):
+        """Играть персонажем: его события идут через журнал команд на экран, перед паузами - автосохранение"""
+        self.character = character
+        self.state = GameState(character, self.rng, EventLog(self.ui, checkpoint=self.autosave))
+        
+    def play(self, command):
+        """Выполнить команду ядра; если она начала бой - провести его до конца"""
+        result = self.state.apply(command)
+        if self.state.combat:
+            self.handle_combat()
+        return result
         
     def clear_screen(self):
         """Очистить экран терминала"""
-        os.system('cls')
+        self.ui.emit("clear")
         
     def display_title(self):
         """Отобразить заголовок игры"""
-        self.clear_screen()
-        print(colored(TITLE_ART, 'yellow'))
-        print(colored('='*60, 'cyan'))
-        print(colored('Добро пожаловать в text rpg, GitHub: @Nekicj '.center(60), 'green'))
-        print(colored('='*60, 'cyan'))
+        self.ui.emit("title")
         
     def main_menu(self):
         """Отобразить главное меню и обработать опции"""
         while self.running:
             self.display_title()
+            self.ui.emit("main_menu")
             
-            menu_items = [
-                ("Новая игра", "green"),
-                ("Загрузить игру", "blue"),
-                ("Выход", "red")
-            ]
-            
-            for i, (item, color) in enumerate(menu_items, 1):
-                print(colored(f"[{i}] ", 'cyan') + colored(item, color))
-            
-            choice = input("\nВведите ваш выбор (1-3): ")
+            choice = self.ui.ask("main_menu")
             
             if choice == "1":
                 self.create_character()
@@ -802,68 +1121,51 @@ class Game:
                     self.game_loop()
             elif choice == "3":
                 self.running = False
-                print(colored("\nСпасибо за игру!", "yellow"))
+                self.ui.emit("goodbye")
                 break
             else:
-                print(colored("Неверный выбор. Попробуйте снова.", "red"))
-                input("Нажмите Enter для продолжения...")
+                self.ui.emit("invalid_choice_retry")
+                self.ui.pause("continue_inline")
                 
     def create_character(self):
         """Процесс создания персонажа"""
-        self.clear_screen()
-        char_art = pyfiglet.figlet_format("СОЗДАНИЕ ГЕРОЯ", font="slant")
-        print(colored(char_art, 'green'))
-        print(colored('='*60, 'cyan'))
+        self.ui.emit("create_character")
         
         # Получить имя персонажа
         while True:
-            name = input(colored("Введите имя персонажа: ", "cyan"))
+            name = self.ui.ask("character_name")
             if name.strip():
                 break
-            print(colored("Имя не может быть пустым.", "red"))
+            self.ui.emit("empty_name")
             
         # Выбрать класс персонажа
-        print(colored("\nВыберите класс:", "cyan"))
-        
-        classes = [
-            ("Воин", "green", "Высокое здоровье и сила, низкая мана"),
-            ("Маг", "blue", "Высокая мана, низкое здоровье и защита"),
-            ("Лучник", "yellow", "Сбалансированные характеристики с высокой ловкостью")
-        ]
-        
-        for i, (class_name, color, desc) in enumerate(classes, 1):
-            print(colored(f"[{i}] ", "cyan") + colored(class_name, color) + f" - {desc}")
+        classes = list(CONTENT["classes"].items())
+        self.ui.emit("class_menu", classes=classes)
         
         while True:
-            choice = input(colored("\nВведите ваш выбор (1-3): ", "cyan"))
-            if choice == "1":
-                char_class = "Воин"
-                break
-            elif choice == "2":
-                char_class = "Маг"
-                break
-            elif choice == "3":
-                char_class = "Лучник"
+            choice = self.ui.ask("character_class", count=len(classes))
+            if choice.isdigit() and 1 <= int(choice) <= len(classes):
+                char_class = classes[int(choice) - 1][0]
                 break
             else:
-                print(colored("Неверный выбор. Попробуйте снова.", "red"))
+                self.ui.emit("invalid_choice_retry")
         
         # Эффект создания персонажа
-        print(colored("\nСоздание персонажа...", "yellow"))
-        loading_screen("Создание персонажа", 2)
+        self.ui.emit("creating_character")
                 
         # Создать персонажа
-        self.character = Character(name, char_class)
+        self.use_character(Character(name, char_class))
+        self.slot = self.saves.free_slot(name)
         
         # Отобразить информацию о персонаже
         self.display_character_info()
         
-        print(colored("\nПерсонаж успешно создан!", "green"))
+        self.ui.emit("character_created")
         
         # Добавить стартовый квест
-        self.character.add_quest("q1")
+        self.state.apply(AcceptQuest("q1"))
         
-        input("\nНажмите Enter, чтобы начать приключение...")
+        self.ui.pause("start_adventure")
         return True
         
     def display_character_info(self):
@@ -871,43 +1173,7 @@ class Game:
         if not self.character:
             return
             
-        char = self.character
-        
-        self.clear_screen()
-        char_art = pyfiglet.figlet_format(f"{char.name}", font="small")
-        print(colored(char_art, 'cyan'))
-        
-        frame_text(f"Класс: {char.char_class} | Уровень: {char.level} | Локация: {char.location}\n"
-                  f"Золото: {char.gold} | Опыт: {char.xp}/{char.xp_next}", width=60, color='yellow')
-        
-        # Характеристики
-        print(colored("\n◉ ХАРАКТЕРИСТИКИ:", "cyan"))
-        print(colored(f"ОЗ: {char.hp}/{char.max_hp}", "green"))
-        print(colored(f"ОМ: {char.mp}/{char.max_mp}", "blue"))
-        print(colored(f"Сила: {char.strength} ({char.base_strength} + {char.strength - char.base_strength})", "red"))
-        print(colored(f"Защита: {char.defense} ({char.base_defense} + {char.defense - char.base_defense})", "magenta"))
-        print(colored(f"Ловкость: {char.agility} ({char.base_agility} + {char.agility - char.base_agility})", "yellow"))
-        print(colored(f"Крит. шанс: {char.critical}% ({char.base_critical}% + {char.critical - char.base_critical}%)", "red"))
-        print(colored(f"Удача: {char.luck} ({char.base_luck} + {char.luck - char.base_luck})", "green"))
-        
-        # Экипировка
-        print(colored("\n◉ ЭКИПИРОВКА:", "cyan"))
-        for slot, item in char.equipment.items():
-            slot_names = {"weapon": "Оружие", "armor": "Броня", "boots": "Обувь", "accessory": "Аксессуар"}
-            if item:
-                item_desc = ITEMS[item]["description"]
-                print(f"{colored(slot_names[slot], 'white')}: {colored(item, 'green')} {colored(f'({item_desc})', 'yellow')}")
-            else:
-                print(f"{colored(slot_names[slot], 'white')}: {colored('Пусто', 'red')}")
-                
-        # Активные задания
-        if char.active_quests:
-            print(colored("\n◉ АКТИВНЫЕ ЗАДАНИЯ:", "cyan"))
-            for quest_id, quest in char.active_quests.items():
-                objective = quest["objective"]
-                current = char.quest_progress[quest_id].get(objective["target"], 0)
-                total = objective["count"]
-                print(f"{colored(quest['name'], 'white')}: {colored(f'{current}/{total} {objective["target"]} побеждено', 'yellow')}")
+        self.ui.emit("character_info", character=self.character, items=ITEMS)
                 
     def display_inventory(self):
         """Отображает инвентарь персонажа с возможностью использовать или экипировать предметы"""
@@ -915,54 +1181,23 @@ class Game:
             return
             
         while True:
-            self.clear_screen()
-            inv_art = pyfiglet.figlet_format("ИНВЕНТАРЬ", font="small")
-            print(colored(inv_art, 'yellow'))
-            
-            print(colored(f"Золото: {self.character.gold}", "yellow"))
+            self.ui.emit("inventory", gold=self.character.gold)
             
             if not self.character.inventory:
-                print(colored("\nВаш инвентарь пуст.", "red"))
-                input("\nНажмите Enter для возврата...")
+                self.ui.emit("inventory_empty")
+                self.ui.pause("back")
                 return
-                
-            # Отобразить предметы с нумерацией для выбора
-            print(colored("\n◉ ПРЕДМЕТЫ:", "cyan"))
-            items = list(self.character.inventory.items())
             
             # Сгруппировать предметы по типу
             grouped_items = {"consumable": [], "weapon": [], "armor": [], "boots": [], "accessory": []}
-            for item_name, count in items:
+            for item_name, count in self.character.inventory.items():
                 item = ITEMS[item_name]
                 grouped_items[item["type"]].append((item_name, count))
                 
-            # Отобразить по группам
-            type_names = {
-                "consumable": "Расходные предметы",
-                "weapon": "Оружие",
-                "armor": "Броня",
-                "boots": "Обувь",
-                "accessory": "Аксессуары"
-            }
-            
-            item_counter = 1
-            for item_type, type_items in grouped_items.items():
-                if type_items:
-                    print(colored(f"\n{type_names[item_type]}:", "yellow"))
-                    for item_name, count in type_items:
-                        item = ITEMS[item_name]
-                        equipped = ""
-                        if item_type != "consumable" and item_name in self.character.equipment.values():
-                            equipped = colored(" [НАДЕТО]", "green")
-                            
-                        print(colored(f"[{item_counter}] ", "cyan") + colored(f"{item_name} (x{count}){equipped}", "white") + 
-                              f" - {colored(item['description'], 'yellow')}")
-                        item_counter += 1
-                    
-            print("\n" + colored("[И] ", "cyan") + colored("Использовать/Экипировать предмет", "green"))
-            print(colored("[Н] ", "cyan") + colored("Назад", "red"))
+            # Отобразить по группам с нумерацией для выбора
+            self.ui.emit("inventory_items", groups=grouped_items, items=ITEMS, equipped=self.character.equipment.values())
             
-            choice = input("\nВаш выбор: ").lower()
+            choice = self.ui.ask("choice").lower()
             
             if choice == 'н':
                 break
@@ -970,91 +1205,50 @@ class Game:
                 # Выбрать предмет для использования или экипировки
                 try:
                     flat_items = [item for sublist in grouped_items.values() for item in sublist]
-                    item_num = int(input(f"\nВведите номер предмета (1-{len(flat_items)}): "))
+                    item_num = int(self.ui.ask("item_number", count=len(flat_items)))
                     
                     if 1 <= item_num <= len(flat_items):
                         item_name = flat_items[item_num-1][0]
                         item = ITEMS[item_name]
                         
                         if item["type"] == "consumable":
-                            self.character.use_item(item_name)
+                            self.state.apply(Use(item_name))
                         else:
-                            self.character.equip_item(item_name)
+                            self.state.apply(Equip(item_name))
                             
-                        input("\nНажмите Enter для продолжения...")
+                        self.ui.pause()
                     else:
-                        print(colored("Неверный номер предмета.", "red"))
-                        input("\nНажмите Enter для продолжения...")
+                        self.ui.emit("invalid_item_number")
+                        self.ui.pause()
                 except ValueError:
-                    print(colored("Пожалуйста, введите корректное число.", "red"))
-                    input("\nНажмите Enter для продолжения...")
+                    self.ui.emit("invalid_number")
+                    self.ui.pause()
             else:
-                print(colored("Неверный выбор.", "red"))
-                input("\nНажмите Enter для продолжения...")
+                self.ui.emit("invalid_choice")
+                self.ui.pause()
                 
     def shop_menu(self):
         """Отображает магазин с товарами для покупки"""
         if not self.character:
             return
             
-        # Магазин только в Деревне
-        if self.character.location != "Деревня":
-            print(colored("В этой локации нет магазина. Необходимо быть в Деревне.", "red"))
-            input("\nНажмите Enter для продолжения...")
+        stock = shop_items(self.character.location)
+        if not stock:
+            self.ui.emit("no_shop")
+            self.ui.pause()
             return
             
         while True:
-            self.clear_screen()
-            shop_art = pyfiglet.figlet_format("МАГАЗИН", font="small")
-            print(colored(shop_art, 'cyan'))
-            
-            frame_text(f"Ваше золото: {self.character.gold}", width=40, color='yellow')
-            
-            # Отобразить товары для продажи с нумерацией
-            print(colored("\n◉ ТОВАРЫ:", "cyan"))
-            shop_items = [
-                "Зелье здоровья", "Зелье маны", "Железный меч", "Кожаная броня", 
-                "Сапоги быстроты", "Стальной меч", "Стальная броня", "Магический посох", 
-                "Магическая мантия", "Амулет удачи", "Кольцо критического удара"
-            ]
-            
             # Сгруппировать товары по типу
             grouped_items = {"consumable": [], "weapon": [], "armor": [], "boots": [], "accessory": []}
-            for item_name in shop_items:
+            for item_name in stock:
                 item = ITEMS[item_name]
                 grouped_items[item["type"]].append(item_name)
                 
-            # Отобразить по группам
-            type_names = {
-                "consumable": "Зелья и расходники",
-                "weapon": "Оружие",
-                "armor": "Броня",
-                "boots": "Обувь",
-                "accessory": "Аксессуары"
-            }
+            # Отобразить по группам с нумерацией
+            self.ui.emit("shop", gold=self.character.gold, groups=grouped_items, items=ITEMS)
             
-            item_counter = 1
-            for item_type, type_items in grouped_items.items():
-                if type_items:
-                    print(colored(f"\n{type_names[item_type]}:", "yellow"))
-                    for item_name in type_items:
-                        item = ITEMS[item_name]
-                        price = item["value"]
-                        color = "white"
-                        if self.character.gold < price:
-                            color = "red"  # Недостаточно золота
-                            
-                        print(colored(f"[{item_counter}] ", "cyan") + 
-                              colored(f"{item_name.ljust(20)}", color) + 
-                              colored(f"{price} золота", "yellow") + 
-                              f" - {item['description']}")
-                        item_counter += 1
-                    
-            print("\n" + colored("[К] ", "cyan") + colored("Купить предмет", "green"))
-            print(colored("[П] ", "cyan") + colored("Продать предмет", "green"))
-            print(colored("[Н] ", "cyan") + colored("Назад", "red"))
-            
-            choice = input("\nВаш выбор: ").lower()
+            choice = self.ui.ask("choice").lower()
             
             if choice == 'н':
                 break
@@ -1063,62 +1257,32 @@ class Game:
                 flat_items = [item for sublist in grouped_items.values() for item in sublist]
                 
                 try:
-                    item_num = int(input(f"\nВведите номер предмета для покупки (1-{len(flat_items)}): "))
+                    item_num = int(self.ui.ask("buy_number", count=len(flat_items)))
                     if 1 <= item_num <= len(flat_items):
-                        item_name = flat_items[item_num-1]
-                        item = ITEMS[item_name]
-                        price = item["value"]
-                        
-                        if self.character.gold >= price:
-                            # Эффект покупки
-                            loading_screen("Покупка предмета", 1)
-                            
-                            self.character.gold -= price
-                            self.character.inventory[item_name] += 1
-                            print(colored(f"Вы купили {item_name} за {price} золота.", "green"))
-                            sound_effect('item')
-                        else:
-                            print(colored(f"Недостаточно золота для покупки {item_name}.", "red"))
-                            sound_effect('error')
-                            
-                        input("\nНажмите Enter для продолжения...")
+                        if self.state.apply(Buy(flat_items[item_num-1])).ok:
+                            self.autosave()
+                        self.ui.pause()
                     else:
-                        print(colored("Неверный номер предмета.", "red"))
-                        input("\nНажмите Enter для продолжения...")
+                        self.ui.emit("invalid_item_number")
+                        self.ui.pause()
                 except ValueError:
-                    print(colored("Пожалуйста, введите корректное число.", "red"))
-                    input("\nНажмите Enter для продолжения...")
+                    self.ui.emit("invalid_number")
+                    self.ui.pause()
             
             elif choice == 'п':
                 # Продать предмет
                 if not self.character.inventory:
-                    print(colored("У вас нет предметов для продажи.", "red"))
-                    input("\nНажмите Enter для продолжения...")
+                    self.ui.emit("nothing_to_sell")
+                    self.ui.pause()
                     continue
                     
                 # Отобразить инвентарь для продажи (полцены)
-                self.clear_screen()
-                print(colored("ПРОДАЖА ПРЕДМЕТОВ", "yellow"))
-                print(colored(f"Ваше золото: {self.character.gold}", "yellow"))
-                
-                print(colored("\nВаши предметы:", "cyan"))
                 items = list(self.character.inventory.items())
-                for i, (item_name, count) in enumerate(items, 1):
-                    item = ITEMS[item_name]
-                    sell_price = item["value"] // 2
-                    
-                    # Нельзя продать экипированные предметы
-                    if item_name in self.character.equipment.values():
-                        print(colored(f"[{i}] ", "cyan") + 
-                              colored(f"{item_name} (x{count}) - [НАДЕТО]", "red"))
-                        continue
-                        
-                    print(colored(f"[{i}] ", "cyan") + 
-                          colored(f"{item_name} (x{count})", "white") + 
-                          colored(f" - Продать за {sell_price} золота", "yellow"))
+                self.ui.emit("sell_list", gold=self.character.gold, inventory=items, items=ITEMS,
+                             equipped=self.character.equipment.values())
                     
                 try:
-                    item_num = int(input(f"\nВведите номер предмета для продажи (1-{len(items)}) или 0 для отмены: "))
+                    item_num = int(self.ui.ask("sell_number", count=len(items)))
                     if item_num == 0:
                         continue
                         
@@ -1129,73 +1293,39 @@ class Game:
                         
                         # Проверка на экипировку
                         if item_name in self.character.equipment.values():
-                            print(colored("Нельзя продать экипированный предмет. Сначала снимите его.", "red"))
-                            input("\nНажмите Enter для продолжения...")
+                            self.ui.emit("cannot_sell_equipped")
+                            self.ui.pause()
                             continue
                         
                         # Подтвердить продажу
-                        confirm = input(f"Продать {item_name} за {sell_price} золота? (д/н): ").lower()
-                        if confirm == 'д':
-                            # Эффект продажи
-                            loading_screen("Продажа предмета", 1)
-                            
-                            self.character.inventory[item_name] -= 1
-                            if self.character.inventory[item_name] <= 0:
-                                del self.character.inventory[item_name]
-                                
-                            self.character.gold += sell_price
-                            print(colored(f"Вы продали {item_name} за {sell_price} золота.", "green"))
-                            sound_effect('item')
+                        confirm = self.ui.ask("confirm_sell", item=item_name, price=sell_price).lower()
+                        if confirm == 'д' and self.state.apply(Sell(item_name)).ok:
+                            self.autosave()
                         
-                        input("\nНажмите Enter для продолжения...")
+                        self.ui.pause()
                     else:
-                        print(colored("Неверный номер предмета.", "red"))
-                        input("\nНажмите Enter для продолжения...")
+                        self.ui.emit("invalid_item_number")
+                        self.ui.pause()
                 except ValueError:
-                    print(colored("Пожалуйста, введите корректное число.", "red"))
-                    input("\nНажмите Enter для продолжения...")
+                    self.ui.emit("invalid_number")
+                    self.ui.pause()
             else:
-                print(colored("Неверный выбор.", "red"))
-                input("\nНажмите Enter для продолжения...")
+                self.ui.emit("invalid_choice")
+                self.ui.pause()
     
     def travel_menu(self):
         """Отображает доступные локации для путешествия"""
         if not self.character:
             return
             
-        self.clear_screen()
-        travel_art = pyfiglet.figlet_format("ПУТЕШЕСТВИЕ", font="small")
-        print(colored(travel_art, 'yellow'))
-        
         # Текущая локация
-        location = next((loc for loc in LOCATIONS if loc["name"] == self.character.location), LOCATIONS[0])
+        location = LOCATION_REGISTRY.get(self.character.location, LOCATIONS[0])
         
-        # Отобразить ASCII-арт текущей локации
-        print(colored(location["ascii_art"], "cyan"))
+        # Доступные направления с номерами для выбора
+        destinations = [(i, loc) for i, loc in enumerate(LOCATIONS, 1) if loc["name"] != self.character.location]
+        self.ui.emit("travel", location=location, destinations=destinations)
         
-        frame_text(f"Текущая локация: {location['name']}\n{location['description']}", 
-                  width=60, color='green')
-        
-        # Отобразить доступные локации
-        print(colored("\n◉ ДОСТУПНЫЕ НАПРАВЛЕНИЯ:", "cyan"))
-        
-        for i, loc in enumerate(LOCATIONS, 1):
-            if loc["name"] != self.character.location:
-                danger_level = ""
-                if loc["enemy_chance"] < 0.3:
-                    danger_level = colored("■□□ (Низкая опасность)", "green")
-                elif loc["enemy_chance"] < 0.5:
-                    danger_level = colored("■■□ (Средняя опасность)", "yellow")
-                else:
-                    danger_level = colored("■■■ (Высокая опасность)", "red")
-                    
-                print(colored(f"[{i}] ", "cyan") + 
-                      colored(f"{loc['name']}", "white") + 
-                      f" - {loc['description']} {danger_level}")
-                
-        print("\n" + colored("[Н] ", "cyan") + colored("Назад", "red"))
-        
-        choice = input("\nВаш выбор: ").lower()
+        choice = self.ui.ask("choice").lower()
         
         if choice == 'н':
             return
@@ -1205,138 +1335,45 @@ class Game:
             if 1 <= choice <= len(LOCATIONS):
                 new_location = LOCATIONS[choice-1]
                 if new_location["name"] != self.character.location:
-                    # Эффект путешествия
-                    self.clear_screen()
-                    print(colored(f"Путешествие в {new_location['name']}...", "yellow"))
-                    loading_screen("В пути", 2)
-                    
-                    # Шанс случайного боя при путешествии
-                    if random.random() < 0.4:  # 40% шанс встретить врага
-                        print(colored("\nВо время путешествия вы столкнулись с врагом!", "red"))
-                        input("\nНажмите Enter для продолжения...")
-                        self.handle_combat()
-                        
-                    # Сменить локацию если выжил в бою
-                    if not self.character.hp <= 0:
-                        self.character.location = new_location["name"]
-                        
-                        # Отобразить новую локацию
-                        self.clear_screen()
-                        print(colored(new_location["ascii_art"], "cyan"))
-                        
-                        print(colored(f"\nВы прибыли в {new_location['name']}!", "green"))
-                        animate_text(new_location["description"], color='white')
-                    
+                    self.play(Travel(new_location["name"]))
             else:
-                print(colored("Неверное направление.", "red"))
+                self.ui.emit("invalid_direction")
         except ValueError:
-            print(colored("Пожалуйста, введите корректное число.", "red"))
+            self.ui.emit("invalid_number")
             
-        input("\nНажмите Enter для продолжения...")
+        self.ui.pause()
     
     def handle_combat(self):
-        """Обработать боевое столкновение"""
-        if not self.character:
-            return
-            
-        # Получить врагов для текущей локации
-        location = next((loc for loc in LOCATIONS if loc["name"] == self.character.location), LOCATIONS[0])
-        possible_enemies = location["enemies"]
-        
-        # Выбрать случайного врага
-        enemy_name = random.choice(possible_enemies)
-        enemy_template = next((e for e in ENEMIES if e["name"] == enemy_name), ENEMIES[0])
-        
-        # Масштабировать врага с учетом уровня персонажа
-        level_scale = 1 + (self.character.level - 1) * 0.2
-        enemy_template = enemy_template.copy()
-        enemy_template["hp"] = int(enemy_template["hp"] * level_scale)
-        enemy_template["strength"] = int(enemy_template["strength"] * level_scale)
-        enemy_template["defense"] = int(enemy_template["defense"] * level_scale)
-        
-        # Начать бой с эффектом
-        self.clear_screen()
-        battle_art = pyfiglet.figlet_format("БОЙ!", font="banner3-D")
-        print(colored(battle_art, 'red'))
-        
-        print(colored(f"Вы столкнулись с {enemy_name}!", "red"))
-        print(colored(f"Описание: {enemy_template['desc']}", "yellow"))
-        
-        loading_screen("Подготовка к бою", 1)
-        
-        # Создать экземпляр боя
-        combat = Combat(self.character, enemy_template)
+        """Провести бой, начатый командой ядра: спрашивать действие, пока бой не закончится"""
+        combat = self.state.combat
+        auto_matchup = None  # Задан, когда включен авто-бой
         
         # Цикл боя
-        while not combat.is_character_defeated() and not combat.is_enemy_defeated():
-            self.clear_screen()
-            enemy = combat.enemy
-            
+        while self.state.combat:
             # Отобразить UI боя
-            print(colored("╔" + "═" * 58 + "╗", "red"))
-            print(colored("║", "red") + colored(" БОЙ! ".center(58), "yellow") + colored("║", "red"))
-            print(colored("╚" + "═" * 58 + "╝", "red"))
-            
-            # Характеристики персонажа
-            hp_percent = self.character.hp / self.character.max_hp
-            hp_bar = "■" * int(hp_percent * 20) + "□" * (20 - int(hp_percent * 20))
-            
-            mp_percent = self.character.mp / self.character.max_mp
-            mp_bar = "■" * int(mp_percent * 20) + "□" * (20 - int(mp_percent * 20))
-            
-            hp_color = "green"
-            if hp_percent < 0.3:
-                hp_color = "red"
-            elif hp_percent < 0.7:
-                hp_color = "yellow"
-            
-            mp_color = "blue"
-            if mp_percent < 0.3:
-                mp_color = "red"
-            elif mp_percent < 0.5:
-                mp_color = "magenta"
-            
-            print(f"\n{colored('Вы', 'green')}: {self.character.name} | {colored('Уровень', 'cyan')} {self.character.level} {self.character.char_class}")
-            print(f"{colored('ОЗ', hp_color)}: {self.character.hp}/{self.character.max_hp} {colored(hp_bar, hp_color)}")
-            print(f"{colored('ОМ', mp_color)}: {self.character.mp}/{self.character.max_mp} {colored(mp_bar, mp_color)}")
-            
-            # Характеристики врага
-            enemy_hp_percent = enemy["hp"] / enemy_template["hp"]
-            enemy_hp_bar = "■" * int(enemy_hp_percent * 20) + "□" * (20 - int(enemy_hp_percent * 20))
-            enemy_hp_color = "green"
-            if enemy_hp_percent < 0.3:
-                enemy_hp_color = "red"
-            elif enemy_hp_percent < 0.7:
-                enemy_hp_color = "yellow"
-                
-            print(f"\n{colored(enemy['name'], 'red')} | {colored('ОЗ', enemy_hp_color)}: {enemy['hp']} {colored(enemy_hp_bar, enemy_hp_color)}")
-            
-            # Варианты боя
-            print(colored("\n▶ Действия:", "cyan"))
-            print(colored("[1] ", "cyan") + colored("Атака", "white") + " - Базовая атака")
-            print(colored("[2] ", "cyan") + colored("Специальная атака", "blue") + f" (10 ОМ) - Особая атака класса {self.character.char_class}")
-            print(colored("[3] ", "cyan") + colored("Использовать зелье", "green") + " - Восстановить ОЗ/ОМ")
-            print(colored("[4] ", "cyan") + colored("Бежать", "yellow") + " - Попытаться сбежать (50% шанс)")
-            
-            choice = input("\nВыберите действие: ")
+            self.ui.emit("combat_status", character=self.character, enemy=combat.enemy,
+                         enemy_max_hp=self.state.enemy_max_hp)
+            
+            auto_potion = None
+            if auto_matchup:
+                # Авто-бой: действие выбирает поиск по правилам боя
+                from autobattle import combat_state
+                action = self.auto_battler(auto_matchup, combat_state(combat))
+                choice, label = AUTO_BATTLE_CHOICES[action]
+                self.ui.emit("auto_action", label=label)
+                if choice == "3":
+                    auto_potion = label
+            else:
+                choice = self.ui.ask("combat_action")
             
-            if choice == "1":
-                # Базовая атака
-                if combat.character_turn("attack"):
-                    # Ход врага если атака была успешной
-                    if not combat.is_enemy_defeated():
-                        combat.enemy_turn()
-                else:
-                    input("\nНажмите Enter для продолжения...")
+            if choice in ("1", "2"):
+                # Базовая или специальная атака; враг отвечает, если удар прошел
+                result = self.state.apply(Attack() if choice == "1" else Special())
+                if not auto_matchup and (not result.ok or "dodge" in result.kinds()):
+                    self.ui.pause()
                     
-            elif choice == "2":
-                # Специальная атака
-                if combat.character_turn("special"):
-                    # Ход врага если атака была успешной
-                    if not combat.is_enemy_defeated():
-                        combat.enemy_turn()
-                else:
-                    input("\nНажмите Enter для продолжения...")
+            elif choice == "3" and auto_potion:
+                self.state.apply(Use(auto_potion))
                     
             elif choice == "3":
                 # Показать доступные зелья
@@ -1344,238 +1381,130 @@ class Game:
                           if ITEMS[item]["type"] == "consumable" and count > 0]
                 
                 if not potions:
-                    print(colored("У вас нет зелий!", "red"))
-                    sound_effect('error')
-                    input("\nНажмите Enter для продолжения...")
+                    self.ui.emit("no_potions")
+                    self.ui.emit("sound", effect="error")
+                    self.ui.pause()
                     continue
                     
-                print(colored("\nДоступные зелья:", "cyan"))
-                for i, (potion, count) in enumerate(potions, 1):
-                    print(colored(f"[{i}] ", "cyan") + 
-                          colored(f"{potion} (x{count})", "white") + 
-                          f" - {ITEMS[potion]['description']}")
+                self.ui.emit("potion_list", potions=potions, items=ITEMS)
                     
                 try:
-                    potion_choice = int(input("\nВыберите зелье (0 для отмены): "))
+                    potion_choice = int(self.ui.ask("potion"))
                     if potion_choice == 0:
                         continue
                         
                     if 1 <= potion_choice <= len(potions):
-                        potion_name = potions[potion_choice-1][0]
-                        if self.character.use_item(potion_name):
-                            # Ход врага после использования зелья
-                            combat.enemy_turn()
+                        # Ход врага после использования зелья
+                        self.state.apply(Use(potions[potion_choice-1][0]))
                 except ValueError:
-                    print(colored("Неверный выбор.", "red"))
-                    input("\nНажмите Enter для продолжения...")
+                    self.ui.emit("invalid_choice")
+                    self.ui.pause()
                     
             elif choice == "4":
-                # Попытаться сбежать (50% шанс)
-                print(colored("\nВы пытаетесь сбежать...", "yellow"))
-                time.sleep(1)
-                
-                if random.random() < 0.5:
-                    print(colored("Вы успешно сбежали!", "green"))
-                    input("\nНажмите Enter для продолжения...")
-                    return
-                else:
-                    print(colored("Вам не удалось сбежать!", "red"))
-                    # Враг получает бесплатную атаку
-                    combat.enemy_turn()
+                # Попытаться сбежать; при неудаче враг получает бесплатную атаку
+                self.state.apply(Flee())
+                    
+            elif choice == "5":
+                from autobattle import AutoBattler
+                from simulator import Matchup
+                if self.auto_battler is None:
+                    # С зерном решение не должно зависеть от скорости машины: поиск до полной глубины без дедлайна
+                    self.auto_battler = AutoBattler(time_budget=0) if self.seed is not None else AutoBattler()
+                auto_matchup = Matchup(self.character, combat.enemy)
+                self.ui.emit("auto_battle_on")
+                continue
                     
             else:
-                print(colored("Неверный выбор.", "red"))
+                self.ui.emit("invalid_choice")
                 
-            # Пауза чтобы игрок мог прочитать сообщения боя
-            if not combat.is_character_defeated() and not combat.is_enemy_defeated():
-                input("\nНажмите Enter для продолжения...")
-                
-        # Бой завершен
-        if combat.is_enemy_defeated():
-            combat.award_rewards()
-            input("\nНажмите Enter для продолжения...")
-        elif combat.is_character_defeated():
-            self.clear_screen()
-            defeat_art = pyfiglet.figlet_format("ПОРАЖЕНИЕ", font="banner3-D")
-            print(colored(defeat_art, 'red'))
-            sound_effect('death')
-            
-            # Позволить игроку продолжить с низким здоровьем
-            self.character.hp = 1
-            print(colored("\nБоги улыбнулись вам и сохранили вашу жизнь.", "green"))
-            print(colored("Вы просыпаетесь с 1 ОЗ обратно в Деревне.", "green"))
-            self.character.location = "Деревня"
-            input("\nНажмите Enter для продолжения...")
+            # Пауза чтобы игрок мог прочитать сообщения боя (итог боя ядро показывает само)
+            if not auto_matchup and self.state.combat:
+                self.ui.pause()
     
     def quest_menu(self):
         """Отображает активные задания и доступные задания"""
         if not self.character:
             return
             
-        self.clear_screen()
-        quest_art = pyfiglet.figlet_format("ЗАДАНИЯ", font="small")
-        print(colored(quest_art, 'cyan'))
+        self.ui.emit("quest_log")
         
         # Отобразить активные задания
         if self.character.active_quests:
-            print(colored("\n◉ АКТИВНЫЕ ЗАДАНИЯ:", "cyan"))
-            for quest_id, quest in self.character.active_quests.items():
-                objective = quest["objective"]
-                current = self.character.quest_progress[quest_id].get(objective["target"], 0)
-                total = objective["count"]
-                
-                progress_bar = "■" * current + "□" * (total - current)
-                
-                print(colored(f"{quest['name']}", "yellow"))
-                print(f"  {colored(quest['description'], 'white')}")
-                print(f"  Прогресс: {colored(f'{current}/{total} {objective['target']} побеждено', 'green')} {progress_bar}")
-                
-                # Отобразить награды
-                rewards = quest["rewards"]
-                print(f"  Награды: {colored(f'Опыт: {rewards.get('xp', 0)}', 'yellow')} | " + 
-                      f"{colored(f'Золото: {rewards.get('gold', 0)}', 'yellow')} | " + 
-                      f"{colored(f'Предметы: {', '.join(rewards.get('items', []))}', 'green')}")
-                print()
+            self.ui.emit("active_quests", quests=self.character.active_quests, progress=self.character.quest_progress)
         else:
-            print(colored("\nУ вас нет активных заданий.", "yellow"))
+            self.ui.emit("no_active_quests")
             
         # Отобразить доступные задания (если в Деревне)
         if self.character.location == "Деревня":
+            completed = set(self.character.completed_quests)
             available_quests = [q for q in QUESTS if q["id"] not in self.character.active_quests 
-                                and q["id"] not in self.character.completed_quests]
+                                and q["id"] not in completed]
             
             if available_quests:
-                print(colored("\n◉ ДОСТУПНЫЕ ЗАДАНИЯ:", "cyan"))
-                for i, quest in enumerate(available_quests, 1):
-                    print(colored(f"[{i}] ", "cyan") + 
-                          colored(f"{quest['name']}", "yellow") + 
-                          f": {quest['description']}")
+                self.ui.emit("available_quests", quests=available_quests)
                     
-                print("\n" + colored("[П] ", "cyan") + colored("Принять задание", "green"))
-                
-                choice = input("\nВведите ваш выбор (или любую другую клавишу для возврата): ").lower()
+                choice = self.ui.ask("quest_choice").lower()
                 
                 if choice == 'п':
                     try:
-                        quest_num = int(input(f"Введите номер задания (1-{len(available_quests)}): "))
+                        quest_num = int(self.ui.ask("quest_number", count=len(available_quests)))
                         if 1 <= quest_num <= len(available_quests):
-                            quest = available_quests[quest_num-1]
-                            self.character.add_quest(quest["id"])
+                            self.state.apply(AcceptQuest(available_quests[quest_num-1]["id"]))
                         else:
-                            print(colored("Неверный номер задания.", "red"))
-                            input("\nНажмите Enter для продолжения...")
+                            self.ui.emit("invalid_quest_number")
+                            self.ui.pause()
                     except ValueError:
-                        print(colored("Пожалуйста, введите корректное число.", "red"))
-                        input("\nНажмите Enter для продолжения...")
+                        self.ui.emit("invalid_number")
+                        self.ui.pause()
             else:
-                print(colored("\nНет новых заданий в этой локации.", "yellow"))
+                self.ui.emit("no_new_quests")
         else:
-            print(colored("\nПосетите Деревню, чтобы принять новые задания.", "yellow"))
+            self.ui.emit("visit_village")
             
         # Отобразить завершенные задания
         if self.character.completed_quests:
-            print(colored("\n◉ ЗАВЕРШЕННЫЕ ЗАДАНИЯ:", "green"))
-            for quest_id in self.character.completed_quests:
-                quest = next((q for q in QUESTS if q["id"] == quest_id), None)
-                if quest:
-                    print(colored(f"✓ {quest['name']}", "green"))
+            quests = [QUEST_REGISTRY.get(quest_id) for quest_id in self.character.completed_quests]
+            self.ui.emit("completed_quests", quests=[quest for quest in quests if quest])
                     
-        input("\nНажмите Enter для продолжения...")
+        self.ui.pause()
     
     def explore(self):
         """Исследовать текущую локацию для случайных встреч"""
         if not self.character:
             return
             
-        # Получить данные текущей локации
-        location = next((loc for loc in LOCATIONS if loc["name"] == self.character.location), LOCATIONS[0])
-        
-        self.clear_screen()
-        print(colored(f"ИССЛЕДОВАНИЕ {location['name']}".center(60), "yellow"))
-        print(colored("="*60, "cyan"))
-        
-        print(colored(location["ascii_art"], "cyan"))
-        animate_text(f"Вы исследуете {location['name']}...", color='white')
-        
-        # Эффект исследования
-        loading_screen("Исследование местности", 2)
-        
-        # Случайный шанс встречи с врагом в зависимости от локации
-        if random.random() < location["enemy_chance"]:
-            print(colored("\nВы столкнулись с врагом!", "red"))
-            sound_effect('hit')
-            input("\nНажмите Enter для продолжения...")
-            self.handle_combat()
-        else:
-            # Нет врага, но может быть найдется что-то
-            if random.random() < 0.4:  # 40% шанс найти что-то
-                item_chance = random.random()
-                
-                if item_chance < 0.7:  # 70% времени найти зелье
-                    if random.random() < 0.5:
-                        item = "Зелье здоровья"
-                    else:
-                        item = "Зелье маны"
-                        
-                    self.character.inventory[item] += 1
-                    print(colored(f"\nВы нашли {item}!", "green"))
-                    sound_effect('item')
-                else:  # 30% времени найти золото
-                    gold = random.randint(5, 20)
-                    self.character.gold += gold
-                    print(colored(f"\nВы нашли {gold} золота!", "yellow"))
-            else:
-                print(colored("\nВы исследовали местность, но не нашли ничего интересного.", "white"))
-                
-        input("\nНажмите Enter для продолжения...")
+        self.play(Explore())
+        self.ui.pause()
     
     def rest(self):
         """Отдых для восстановления ОЗ и ОМ (только в Деревне)"""
         if not self.character:
             return
             
+        # Таверну и вопрос показывать, только если ядро согласится на отдых
         if self.character.location != "Деревня":
-            print(colored("Вы можете отдыхать только в Деревне.", "red"))
-            input("\nНажмите Enter для продолжения...")
+            self.ui.emit("rest_village_only")
+            self.ui.pause()
             return
-        rest_cost = 10
-        
-        self.clear_screen()
-        rest_art = pyfiglet.figlet_format("ТАВЕРНА", font="small")
-        print(colored(rest_art, 'yellow'))
         
-        frame_text(f"Таверна \"Сонный Тролль\"\nСтоимость ночлега: {rest_cost} золота", width=50, color='yellow')
+        self.ui.emit("tavern", character=self.character, cost=REST_COST)
         
-        print(colored(f"\nВаше золото: {self.character.gold}", "yellow"))
-        print(colored(f"Текущее здоровье: {self.character.hp}/{self.character.max_hp}", "green"))
-        print(colored(f"Текущая мана: {self.character.mp}/{self.character.max_mp}", "blue"))
-        
-        if self.character.gold < rest_cost:
-            print(colored("\nУ вас недостаточно золота для отдыха.", "red"))
-            input("\nНажмите Enter для продолжения...")
+        if self.character.gold < REST_COST:
+            self.ui.emit("rest_no_gold")
+            self.ui.pause()
             return
             
-        choice = input(colored(f"\nОтдохнуть за {rest_cost} золота? (д/н): ", "cyan")).lower()
+        choice = self.ui.ask("confirm_rest", cost=REST_COST).lower()
         
         if choice == 'д':
-            self.character.gold -= rest_cost
-            
-            # Анимация отдыха
-            print(colored("\nВы отдыхаете в таверне...", "yellow"))
-            loading_screen("Сон", 2)
-            
-            self.character.hp = self.character.max_hp
-            self.character.mp = self.character.max_mp
-            
-            print(colored("\nВы хорошо отдохнули и чувствуете себя полностью восстановленным!", "green"))
-            print(colored("ОЗ и ОМ полностью восстановлены!", "green"))
+            self.state.apply(Rest())
         
-        input("\nНажмите Enter для продолжения...")
+        self.ui.pause()
     
     def save_game(self):
-        """Сохранить игру в файл"""
+        """Сохранить игру в слот персонажа"""
         if not self.character:
-            print(colored("Нет персонажа для сохранения.", "red"))
+            self.ui.emit("nothing_to_save")
             return False
             
         try:
@@ -1583,45 +1512,51 @@ class Game:
             save_data = self.character.to_dict()
             
             # Анимация сохранения
-            print(colored("\nСохранение игры...", "yellow"))
-            loading_screen("Сохранение данных", 1)
+            self.ui.emit("saving")
             
-            # Сохранить в файл
-            with open(SAVE_FILE, 'w') as f:
-                json.dump(save_data, f, indent=2)
+            # Запись идет через автосохранение, чтобы слот не писали два потока сразу
+            self.autosaver.save(self.slot, save_data)
                 
-            print(colored("\nИгра успешно сохранена!", "green"))
+            self.ui.emit("saved", slot=self.slot)
             return True
             
         except Exception as e:
-            print(colored(f"\nОшибка при сохранении игры: {str(e)}", "red"))
+            self.ui.emit("save_failed", error=str(e))
             return False
             
     def load_game(self):
-        """Загрузить игру из файла"""
+        """Выбрать слот по индексу сохранений и загрузить его"""
         try:
-            if not os.path.exists(SAVE_FILE):
-                print(colored("\nФайл сохранения не найден.", "red"))
-                input("\nНажмите Enter для продолжения...")
+            if self.legacy_save:
+                self.saves.import_file(self.legacy_save)
+            slots = self.saves.slots()
+            if not slots:
+                self.ui.emit("no_save_file")
+                self.ui.pause()
+                return False
+                
+            self.ui.emit("save_slots", slots=slots)
+            choice = self.ui.ask("slot_number", count=len(slots))
+            if not (choice.isdigit() and 1 <= int(choice) <= len(slots)):
                 return False
+            slot = slots[int(choice) - 1]["slot"]
                 
             # Анимация загрузки
-            print(colored("\nЗагрузка сохраненной игры...", "yellow"))
-            loading_screen("Загрузка данных", 1)
+            self.ui.emit("loading_save")
             
-            # Загрузить из файла
-            with open(SAVE_FILE, 'r') as f:
-                save_data = json.load(f)
+            # Загрузить из файла слота
+            save_data = self.saves.load(slot)
                 
-            self.character = Character.from_dict(save_data)
+            self.use_character(Character.from_dict(save_data))
+            self.slot = slot
             
-            print(colored("\nИгра успешно загружена!", "green"))
-            input("\nНажмите Enter для продолжения...")
+            self.ui.emit("loaded")
+            self.ui.pause()
             return True
             
         except Exception as e:
-            print(colored(f"\nОшибка при загрузке игры: {str(e)}", "red"))
-            input("\nНажмите Enter для продолжения...")
+            self.ui.emit("load_failed", error=str(e))
+            self.ui.pause()
             return False
     
     def game_loop(self):
@@ -1631,76 +1566,18 @@ class Game:
             
         while self.running and self.character:
             # Проверка на случайное событие
-            location = next((loc for loc in LOCATIONS if loc["name"] == self.character.location), LOCATIONS[0])
-            if random.random() < location["enemy_chance"] * 0.3:  # Уменьшенный шанс по сравнению с исследованием
-                print(colored(f"\nВы столкнулись с врагом в локации {self.character.location}!", "red"))
-                sound_effect('hit')
-                input("\nНажмите Enter для продолжения...")
-                self.handle_combat()
-                
-                if self.character.hp <= 0:
-                    continue
+            encounter = self.play(Encounter())
+            if encounter.events and self.character.hp <= 0:
+                continue
                     
-            # Отобразить главное игровое меню
-            self.clear_screen()
-            title_art = pyfiglet.figlet_format(f"{self.character.name}", font="small")
-            print(colored(title_art, 'cyan'))
-            
-            # Текущая локация
-            location = next((loc for loc in LOCATIONS if loc["name"] == self.character.location), LOCATIONS[0])
-            print(colored(location["ascii_art"], "cyan"))
-            
-            # Информация о персонаже
-            char = self.character
-            
-            hp_percent = self.character.hp / self.character.max_hp
-            hp_bar = "■" * int(hp_percent * 20) + "□" * (20 - int(hp_percent * 20))
-            hp_color = "green"
-            if hp_percent < 0.3:
-                hp_color = "red"
-            elif hp_percent < 0.7:
-                hp_color = "yellow"
-                
-            print(colored(f"Локация: {char.location}", "green"))
-            print(f"{colored('Уровень:', 'yellow')} {char.level} | {colored('Класс:', 'yellow')} {char.char_class} | {colored('Золото:', 'yellow')} {char.gold}")
-            print(f"{colored('ОЗ:', hp_color)} {char.hp}/{char.max_hp} {colored(hp_bar, hp_color)}")
-            print(f"{colored('Опыт:', 'blue')} {char.xp}/{char.xp_next}")
-            
-            # Кнопки активных заданий
-            if char.active_quests:
-                print(colored("\n▶ АКТИВНЫЕ ЗАДАНИЯ:", "yellow"))
-                for quest_id, quest in list(char.active_quests.items())[:2]:  # Показать только 2 активных задания
-                    objective = quest["objective"]
-                    current = char.quest_progress[quest_id].get(objective["target"], 0)
-                    total = objective["count"]
-                    progress = f"{current}/{total}"
-                    print(colored(f"• {quest['name']}: {progress}", "white"))
-            
-            # Главное меню
-            print(colored("\n▶ ДЕЙСТВИЯ:", "cyan"))
-            actions = [
-                (1, "Исследовать", "white", "Поиск сокровищ и врагов"),
-                (2, "Путешествовать", "white", "Перемещение между локациями"),
-                (3, "Магазин", "white", "Купить/продать предметы"),
-                (4, "Инвентарь", "white", "Управление предметами"),
-                (5, "Персонаж", "white", "Просмотр характеристик"),
-                (6, "Задания", "white", "Управление заданиями"),
-                (7, "Отдых", "white", "Восстановить ОЗ и ОМ (только в Деревне)"),
-                (8, "Сохранить", "green", "Сохранить прогресс"),
-                (9, "Выход", "red", "Выход в главное меню")
-            ]
+            # Остальные изменения (путешествие, отдых, экипировка) - при возврате в меню
+            self.autosave()
             
-            half = len(actions) // 2 + len(actions) % 2
-            for i in range(half):
-                line = colored(f"[{actions[i][0]}] ", "cyan") + colored(actions[i][1], actions[i][2]) + f" - {actions[i][3]}"
-                if i + half < len(actions):
-                    padding = 35 - len(actions[i][1]) - len(actions[i][3])
-                    padding = max(2, padding)
-                    line += " " * padding
-                    line += colored(f"[{actions[i+half][0]}] ", "cyan") + colored(actions[i+half][1], actions[i+half][2]) + f" - {actions[i+half][3]}"
-                print(line)
+            # Отобразить главное игровое меню
+            location = LOCATION_REGISTRY.get(self.character.location, LOCATIONS[0])
+            self.ui.emit("game_menu", character=self.character, location=location)
             
-            choice = input("\nВведите ваш выбор (1-9): ")
+            choice = self.ui.ask("game_menu")
             
             if choice == "1":
                 self.explore()
@@ -1712,44 +1589,65 @@ class Game:
                 self.display_inventory()
             elif choice == "5":
                 self.display_character_info()
-                input("\nНажмите Enter для продолжения...")
+                self.ui.pause()
             elif choice == "6":
                 self.quest_menu()
             elif choice == "7":
                 self.rest()
             elif choice == "8":
                 self.save_game()
-                input("\nНажмите Enter для продолжения...")
+                self.ui.pause()
             elif choice == "9":
-                confirm = input(colored("Вы уверены, что хотите выйти? Несохраненный прогресс будет потерян. (д/н): ", "yellow")).lower()
+                confirm = self.ui.ask("confirm_exit_autosave" if self.autosave_enabled else "confirm_exit").lower()
                 if confirm == 'д':
                     break
             else:
-                print(colored("\nНеверный выбор. Пожалуйста, попробуйте снова.", "red"))
-                input("\nНажмите Enter для продолжения...")
+                self.ui.emit("invalid_menu_choice")
+                self.ui.pause()
+        
+        # Полный снимок сжимает журнал и обновляет заголовок слота, прежде чем меню загрузки прочитает слоты
+        self.autosave(full=True)
+        self.autosaver.flush()
 
 
 if __name__ == "__main__":
+    # Модули симуляции (odds.py и др.) импортируют RPGame - отдать им уже загруженный модуль
+    sys.modules.setdefault("RPGame", sys.modules[__name__])
+    
+    import argparse
+    parser = argparse.ArgumentParser(description="Текстовая RPG")
+    parser.add_argument("--fast-start", action="store_true", help="сразу в главное меню, без заставки и загрузки")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="множитель длительности анимаций: 0.5 - вдвое быстрее, 0 - без пауз")
+    parser.add_argument("--no-autosave", action="store_true", help="сохранять только вручную (пункт 8)")
+    parser.add_argument("--db", metavar="PATH", help="хранить персонажей в базе SQLite вместо папки saves/")
+    parser.add_argument("--seed", type=int, help="зерно случайностей: с тем же вводом игра повторяется")
+    parser.add_argument("--record", metavar="PATH", help="записать ввод сессии для replay.py")
+    args = parser.parse_args()
+
+    ui = default_renderer(args.time_scale)
+    seed = args.seed
+    if args.record:
+        from replay import InputRecorder
+        if seed is None:
+            seed = random.randrange(2**32)  # Запись без зерна не воспроизвести
+        ui = InputRecorder(ui, args.record, seed, autosave=not args.no_autosave)
     try:
-        os.system("cls")
-        
-        print(colored(TITLE_ART, 'yellow'))
-        
-        # Анимированный текст приветствия
-        animate_text("Было сделано Аутистом", color='green')
-        animate_text("Под бутылкой хенеси с принглс", color='cyan')
-        
-        print("\n" + colored("Загрузка игры...", 'yellow'))
-        loading_screen("Подготовка RPG окружения", 2)
+        if not args.fast_start:
+            ui.emit("intro")
         
         # Инициализировать и запустить игру
-        game = Game()
+        store = None
+        if args.db:
+            from database import CharacterDB
+            store = CharacterDB(args.db)
+        game = Game(ui, autosave=not args.no_autosave, store=store, seed=seed)
         game.main_menu()
         
     except KeyboardInterrupt:
-        print(colored("\n\nИгра прервана. Спасибо за игру!", "yellow"))
+        ui.emit("interrupted")
     except Exception as e:
-        print(colored(f"\n\nПроизошла ошибка: {str(e)}", "red"))
+        ui.emit("crashed", error=str(e))
         # import traceback; traceback.print_exc()
     finally: # Очистка ресурсов
        
@@ -1759,7 +1657,8 @@ if __name__ == "__main__":
         except:
             pass
         
-        farewell_art = pyfiglet.figlet_format("ДО СВИДАНИЯ!", font="slant")
-        print(colored(farewell_art, 'green'))
-        print(colored("Благодарим за игру в нашу текстовую RPG!", 'cyan'))
-        print(colored("Надеемся, вам понравилось приключение в мире фэнтези!", 'yellow'))
+        if 'game' in locals():
+            game.close()
+        
+        ui.emit("farewell")
+        ui.close()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""Авто-бой: выбор действия поиском expectimax по правилам Combat с таблицей транспозиций"""
+import argparse
+import math
+import random
+import time
+
+from RPGame import SPECIAL_COST, FLEE_CHANCE, BURN_POWER, BURN_DURATION
+from odds import transition_tables, _tick
+from simulator import (Matchup, POLICIES, HEALTH_POTION, MANA_POTION, WIN, LOSS, FLEE,
+                       run_fights, _parse_levels)
+
+# Ценность исходов боя: поражение отправляет в Деревню, бегство лишь лишает награды
+OUTCOME_VALUES = {WIN: 1.0, FLEE: 0.35, LOSS: 0.0}
+SEARCH_DEPTH = 3               # Максимальная глубина итеративного углубления
+TIME_BUDGET = 0.0008           # Секунд на решение; не успевший уровень углубления отбрасывается
+DAMAGE_BUCKETS = 3             # Точек в сжатом распределении урона для узлов случая
+TRANSPOSITION_LIMIT = 200000   # Записей в таблице транспозиций до её очистки
+
+
+def _buckets(distribution, count):
+    """Сжать распределение урона до count точек (средние по квантильным группам)"""
+    items = sorted(distribution.items())
+    buckets = []
+    target = 1.0 / count
+    mass = weighted = 0.0
+    for value, prob in items:
+        mass += prob
+        weighted += value * prob
+        if mass >= target - 1e-12:
+            buckets.append((weighted / mass, mass))
+            mass = weighted = 0.0
+    if mass > 1e-12:
+        buckets.append((weighted / mass, mass))
+    return [(round(value), prob) for value, prob in buckets]
+
+
+def _mean(distribution):
+    return sum(value * prob for value, prob in distribution.items())
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+class BattleModel:
+    """Сжатая модель переходов и оценка позиции для одного Matchup"""
+
+    def __init__(self, matchup, buckets=DAMAGE_BUCKETS, values=OUTCOME_VALUES):
+        tables = transition_tables(matchup.key)
+        self.matchup = matchup
+        self.values = values
+        self.dodge = tables["dodge"]
+        self.miss = tables["miss"]
+        self.burn = tables["burn"]
+        self.attack = _buckets(tables["attack"], buckets)
+        self.special = _buckets(tables["special"], buckets)
+        self.enemy = _buckets(tables["enemy"], buckets)
+
+        # Средние значения для оценки листьев
+        self.attack_mean = _mean(tables["attack"])
+        self.special_mean = _mean(tables["special"]) + self.burn * BURN_POWER * BURN_DURATION
+        self.enemy_mean = (1 - self.miss) * _mean(tables["enemy"])
+
+    def actions(self, state):
+        """Допустимые действия в состоянии"""
+        hp, mp, enemy_hp, burns, health_potions, mana_potions = state
+        actions = ["attack"]
+        if mp >= SPECIAL_COST:
+            actions.append("special")
+        if health_potions and hp < self.matchup.max_hp:
+            actions.append("health_potion")
+        if mana_potions and mp < self.matchup.max_mp:
+            actions.append("mana_potion")
+        actions.append("flee")
+        return actions
+
+    def _enemy_turn(self, hp, mp, enemy_hp, burns, health_potions, mana_potions, prob, out):
+        if enemy_hp <= 0:
+            out.append((prob, WIN))
+            return
+        out.append((prob * self.miss, (hp, mp, enemy_hp, burns, health_potions, mana_potions)))
+        hit = prob * (1 - self.miss)
+        burned_hp, new_burns = _tick(enemy_hp, burns)
+        for damage, p in self.enemy:
+            if burned_hp <= 0:
+                out.append((hit * p, WIN))
+            elif hp - damage <= 0:
+                out.append((hit * p, LOSS))
+            else:
+                out.append((hit * p, (hp - damage, mp, burned_hp, new_burns, health_potions, mana_potions)))
+
+    def outcomes(self, state, action):
+        """Список (вероятность, следующее состояние или исход) после хода с действием action"""
+        hp, mp, enemy_hp, burns, health_potions, mana_potions = state
+        matchup = self.matchup
+        out = []
+        if action == "attack":
+            out.append((self.dodge, state))
+            burned_hp, new_burns = _tick(enemy_hp, burns)
+            for damage, p in self.attack:
+                self._enemy_turn(hp, mp, burned_hp - damage, new_burns, health_potions, mana_potions,
+                                 (1 - self.dodge) * p, out)
+        elif action == "special":
+            burned_hp, new_burns = _tick(enemy_hp, burns)
+            for damage, p in self.special:
+                self._enemy_turn(hp, mp - SPECIAL_COST, burned_hp - damage, new_burns,
+                                 health_potions, mana_potions, (1 - self.burn) * p, out)
+                if self.burn:
+                    self._enemy_turn(hp, mp - SPECIAL_COST, burned_hp - damage - BURN_POWER,
+                                     new_burns + (BURN_DURATION - 1,), health_potions, mana_potions,
+                                     self.burn * p, out)
+        elif action == "health_potion":
+            self._enemy_turn(min(matchup.max_hp, hp + matchup.heal), mp, enemy_hp, burns,
+                             health_potions - 1, mana_potions, 1.0, out)
+        elif action == "mana_potion":
+            self._enemy_turn(hp, min(matchup.max_mp, mp + matchup.restore), enemy_hp, burns,
+                             health_potions, mana_potions - 1, 1.0, out)
+        elif action == "flee":
+            out.append((FLEE_CHANCE, FLEE))
+            self._enemy_turn(hp, mp, enemy_hp, burns, health_potions, mana_potions, 1 - FLEE_CHANCE, out)
+        return out
+
+    def evaluate(self, state):
+        """Эвристическая ценность позиции: гонка 'кто кого убьёт раньше'"""
+        hp, mp, enemy_hp, burns, health_potions, mana_potions = state
+        matchup = self.matchup
+
+        # Ходов, чтобы добить врага: сначала спецатаки, потом обычные атаки
+        remaining = enemy_hp - BURN_POWER * sum(burns)
+        specials = (mp + mana_potions * matchup.restore) // SPECIAL_COST
+        special_total = specials * self.special_mean
+        if remaining <= special_total:
+            to_kill = remaining / self.special_mean
+        else:
+            to_kill = specials + (remaining - special_total) / self.attack_mean
+
+        # Ходов, которые персонаж переживёт (зелья здоровья тоже тратят ход)
+        to_die = (hp + health_potions * matchup.heal) / self.enemy_mean - health_potions
+
+        win_chance = 1.0 / (1.0 + math.exp(-1.5 * (to_die - to_kill + 0.5)))
+        return win_chance * self.values[WIN] + (1 - win_chance) * self.values[LOSS]
+
+
+class AutoBattler:
+    """Политика авто-боя: callable(matchup, state) -> действие, как политики simulator.POLICIES"""
+
+    def __init__(self, depth=SEARCH_DEPTH, buckets=DAMAGE_BUCKETS, values=OUTCOME_VALUES, time_budget=TIME_BUDGET):
+        self.depth = depth
+        self.time_budget = time_budget
+        self.deadline = None
+        self.buckets = buckets
+        self.values = values
+        self.models = {}
+        self.transpositions = {}  # (ключ Matchup, состояние, глубина) -> ценность
+        self.nodes = 0
+
+    def model(self, matchup):
+        model = self.models.get(matchup.key)
+        if model is None:
+            model = self.models[matchup.key] = BattleModel(matchup, self.buckets, self.values)
+        return model
+
+    def _expect(self, model, state, action, depth):
+        """Ожидаемая ценность действия (узел случая)"""
+        stay = 0.0
+        total = 0.0
+        for prob, result in model.outcomes(state, action):
+            if isinstance(result, str):
+                total += prob * self.values[result]
+            elif result == state:
+                stay += prob
+            elif depth > 1:
+                total += prob * self._search(model, result, depth - 1)
+            else:
+                total += prob * model.evaluate(result)
+        # Уклонение или промах возвращают бой в то же состояние
+        return total / (1.0 - stay) if stay < 1.0 else 0.0
+
+    def _search(self, model, state, depth):
+        """Ценность состояния при лучшем выборе действия (узел максимума)"""
+        key = (model.matchup.key, state, depth)
+        cached = self.transpositions.get(key)
+        if cached is not None:
+            return cached
+        if self.deadline and time.perf_counter() > self.deadline:
+            raise _OutOfTime
+        self.nodes += 1
+        value = max(self._expect(model, state, action, depth) for action in model.actions(state))
+        self.transpositions[key] = value
+        return value
+
+    def choose(self, matchup, state):
+        """Лучшее действие в состоянии state (итеративное углубление в пределах time_budget)"""
+        if len(self.transpositions) > TRANSPOSITION_LIMIT:
+            self.transpositions.clear()
+        model = self.model(matchup)
+        actions = model.actions(state)
+        best_action = "attack"
+        self.deadline = time.perf_counter() + self.time_budget if self.time_budget else None
+        try:
+            for depth in range(1, self.depth + 1):
+                # Глубина 1 считается всегда, чтобы решение было в любом случае
+                values = {action: self._expect(model, state, action, depth) for action in actions}
+                best_action = max(values, key=values.get)
+                if self.deadline and time.perf_counter() > self.deadline:
+                    break
+        except _OutOfTime:
+            pass  # Прерванный уровень не используется; его готовые узлы остаются в таблице транспозиций
+        finally:
+            self.deadline = None
+        return best_action
+
+    __call__ = choose
+
+
+def combat_state(combat):
+    """Компактное состояние живого боя Combat в формате Matchup.initial_state()"""
+    character = combat.character
+    burns = tuple(sorted(effect["duration"] for effect in combat.effects
+                         if effect["type"] == "burn" and effect["target"] == "enemy"))
+    return (character.hp, character.mp, combat.enemy["hp"], burns,
+            character.inventory.get(HEALTH_POTION, 0), character.inventory.get(MANA_POTION, 0))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сравнение авто-боя с простыми политиками")
+    parser.add_argument("--fights", type=int, default=2000)
+    parser.add_argument("--levels", default="1,5,10")
+    parser.add_argument("--classes", nargs="*")
+    parser.add_argument("--enemies", nargs="*")
+    parser.add_argument("--depth", type=int, default=SEARCH_DEPTH)
+    parser.add_argument("--budget-ms", type=float, default=TIME_BUDGET * 1000, help="0 - без ограничения")
+    parser.add_argument("--baseline", choices=sorted(POLICIES), default="cautious")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from RPGame import CLASS_STATS, ENEMIES
+    auto = AutoBattler(depth=args.depth, time_budget=args.budget_ms / 1000)
+    decisions = decision_time = 0
+
+    def timed(matchup, state):
+        nonlocal decisions, decision_time
+        start = time.perf_counter()
+        action = auto(matchup, state)
+        decision_time += time.perf_counter() - start
+        decisions += 1
+        return action
+
+    print(f"{'Класс':<8} {'Ур.':>3} {'Враг':<11} {'Авто':>7} {args.baseline:>9} {'Бегство':>8}")
+    for char_class in args.classes or list(CLASS_STATS):
+        for level in _parse_levels(args.levels):
+            for enemy_name in args.enemies or [e["name"] for e in ENEMIES]:
+                matchup = Matchup.for_level(char_class, level, enemy_name)
+                auto_stats = run_fights(matchup, args.fights, timed, random.Random(args.seed))
+                base_stats = run_fights(matchup, args.fights, POLICIES[args.baseline], random.Random(args.seed))
+                print(f"{char_class:<8} {level:>3} {enemy_name:<11} {auto_stats.win_rate:>7.1%} "
+                      f"{base_stats.win_rate:>9.1%} {auto_stats.rate(FLEE):>8.1%}")
+
+    print(f"\nРешений: {decisions}, в среднем {decision_time / decisions * 1e6:.0f} мкс на ход")
+
+
+if __name__ == "__main__":
+    main()
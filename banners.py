@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Кэш figlet-баннеров: загруженные шрифты, LRU готовых строк и предрасчитанный файл с постоянными заголовками"""
+import argparse
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+ASSET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "banners.json")
+CACHE_SIZE = 64  # Баннеров с изменяемым текстом (имена персонажей) в LRU
+
+# Постоянные заголовки игры: сохраняются в ASSET_FILE командой `python banners.py --build`
+FIXED_BANNERS = [
+    ("RPG ИГРА", "slant"),
+    ("ДО СВИДАНИЯ!", "slant"),
+    ("СОЗДАНИЕ ГЕРОЯ", "slant"),
+    ("УРОВЕНЬ ПОВЫШЕН!", "slant"),
+    ("НОВЫЙ КВЕСТ", "small"),
+    ("ЗАДАНИЕ ВЫПОЛНЕНО!", "small"),
+    ("ПОБЕДА!", "banner3-D"),
+    ("ПОРАЖЕНИЕ", "banner3-D"),
+    ("БОЙ!", "banner3-D"),
+    ("ИНВЕНТАРЬ", "small"),
+    ("МАГАЗИН", "small"),
+    ("ПУТЕШЕСТВИЕ", "small"),
+    ("ЗАДАНИЯ", "small"),
+    ("ТАВЕРНА", "small"),
+]
+
+# Кадры для бенчмарка: заголовки, которые рисуются при обычной игре
+BENCH_FRAMES = [
+    ("Герой", "small"), ("МАГАЗИН", "small"), ("Герой", "small"), ("ИНВЕНТАРЬ", "small"),
+    ("Герой", "small"), ("БОЙ!", "banner3-D"), ("ПОБЕДА!", "banner3-D"), ("Герой", "small"),
+]
+
+
+class BannerCache:
+    """figlet_format с кэшем: шрифт разбирается один раз, готовый текст берется из файла или LRU"""
+
+    def __init__(self, asset_file=ASSET_FILE, size=CACHE_SIZE):
+        self.size = size
+        self.fonts = {}               # шрифт -> pyfiglet.Figlet
+        self.rendered = OrderedDict()  # (текст, шрифт) -> баннер, в порядке использования
+        self.lock = threading.Lock()  # Сессии сервера рисуют из своих потоков
+        self.version, self.fixed = self.load(asset_file) if asset_file else (None, {})
+
+    @staticmethod
+    def load(asset_file):
+        """(версия pyfiglet, предрасчитанные баннеры) из файла; поврежденный файл пропускается"""
+        try:
+            with open(asset_file, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None, {}
+        return data.get("pyfiglet"), {(banner["text"], banner["font"]): banner["art"] for banner in data["banners"]}
+
+    def font(self, font):
+        figlet = self.fonts.get(font)
+        if figlet is None:
+            # pyfiglet нужен только для баннеров, которых нет в файле
+            import pyfiglet
+            if self.version != pyfiglet.__version__:
+                self.fixed = {}  # Файл собран другой версией pyfiglet - рисовать заново
+                self.version = pyfiglet.__version__
+            figlet = self.fonts[font] = pyfiglet.Figlet(font=font)
+        return figlet
+
+    def render(self, text, font="standard"):
+        """Баннер text шрифтом font (то же, что pyfiglet.figlet_format)"""
+        key = (text, font)
+        art = self.fixed.get(key)
+        if art is not None:
+            return art
+        with self.lock:
+            art = self.rendered.get(key)
+            if art is not None:
+                self.rendered.move_to_end(key)
+                return art
+            art = self.rendered[key] = self.font(font).renderText(text)
+            if len(self.rendered) > self.size:
+                self.rendered.popitem(last=False)
+            return art
+
+
+BANNERS = BannerCache()
+
+
+def build(asset_file=ASSET_FILE):
+    """Отрисовать FIXED_BANNERS и записать их в asset_file"""
+    import pyfiglet
+    banners = [{"text": text, "font": font, "art": pyfiglet.figlet_format(text, font=font)}
+               for text, font in FIXED_BANNERS]
+    with open(asset_file, "w", encoding="utf-8") as f:
+        json.dump({"pyfiglet": pyfiglet.__version__, "banners": banners}, f, ensure_ascii=False, indent=1)
+    return len(banners)
+
+
+def benchmark(rounds):
+    """Время заголовка на кадр: прямой figlet_format против BannerCache"""
+    import pyfiglet
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text, font in BENCH_FRAMES:
+            pyfiglet.figlet_format(text, font=font)
+    direct = (time.perf_counter() - start) / (rounds * len(BENCH_FRAMES))
+
+    start = time.perf_counter()
+    cache = BannerCache()
+    startup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text, font in BENCH_FRAMES:
+            cache.render(text, font)
+    cached = (time.perf_counter() - start) / (rounds * len(BENCH_FRAMES))
+    return direct, cached, startup
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Кэш figlet-баннеров")
+    parser.add_argument("--build", action="store_true", help=f"пересобрать {os.path.basename(ASSET_FILE)}")
+    parser.add_argument("--rounds", type=int, default=50, help="повторов кадров в бенчмарке")
+    args = parser.parse_args(argv)
+
+    if args.build:
+        print(f"Записано баннеров: {build()} -> {ASSET_FILE}")
+        return
+
+    direct, cached, startup = benchmark(args.rounds)
+    print(f"figlet_format:   {direct * 1e6:>9.1f} мкс на кадр")
+    print(f"BannerCache:     {cached * 1e6:>9.1f} мкс на кадр (ускорение x{direct / cached:.0f})")
+    print(f"Загрузка файла:  {startup * 1e3:>9.2f} мс при старте")
+
+
+if __name__ == "__main__":
+    main()
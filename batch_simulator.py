@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""Векторизованный (NumPy) движок боёв: N независимых боёв продвигаются шаг в шаг массивами"""
+import argparse
+import math
+import random
+import time
+from collections import Counter
+
+import numpy as np
+
+from RPGame import (CLASS_STATS, ENEMIES, MAX_LEVEL, ATTACK_SPREAD, ENEMY_SPREAD, SPECIAL_COST,
+                    FLEE_CHANCE, BURN_POWER, BURN_DURATION, ENEMY_LEVEL_SCALE)
+from simulator import (Matchup, FightStats, POLICIES, MAX_TURNS, WIN, LOSS, FLEE, TIMEOUT,
+                       run_fights, _parse_levels)
+
+ATTACK, SPECIAL, HEALTH_POTION, MANA_POTION, RUN = range(5)
+ACTIVE, WON, LOST, FLED, TIMED_OUT = range(5)
+OUTCOME_NAMES = {WON: WIN, LOST: LOSS, FLED: FLEE, TIMED_OUT: TIMEOUT}
+
+BLOCK_ROUNDS = 8  # Раундов случайных чисел, генерируемых одним блоком
+
+# Параметры Matchup, разворачиваемые в столбцы массива (по строке на бой)
+PARAMS = ("hp", "mp", "enemy_hp", "max_hp", "max_mp", "health_potions", "mana_potions", "heal", "restore",
+          "dodge", "crit", "damage", "crit_damage",
+          "special_crit", "special_damage", "special_crit_damage", "special_low", "special_span", "burn_chance",
+          "miss", "enemy_damage")
+
+
+def _matchup_row(matchup):
+    dodge, crit, damage, crit_damage = matchup.attack
+    special_crit, special_damage, special_crit_damage, spread, burn_chance = matchup.special
+    miss, enemy_damage = matchup.enemy_attack
+    return (matchup.hp, matchup.mp, matchup.enemy_hp, matchup.max_hp, matchup.max_mp,
+            matchup.health_potions, matchup.mana_potions, matchup.heal, matchup.restore,
+            dodge, crit, damage, crit_damage,
+            special_crit, special_damage, special_crit_damage, spread[0], spread[1] - spread[0], burn_chance,
+            miss, enemy_damage)
+
+
+# Векторные версии политик из simulator.POLICIES: получают словарь массивов состояния
+def attack_policy(state):
+    return np.full(len(state["hp"]), ATTACK)
+
+
+def special_policy(state):
+    return np.where(state["mp"] >= SPECIAL_COST, SPECIAL, ATTACK)
+
+
+def cautious_policy(state):
+    actions = special_policy(state)
+    heal = (state["health_potions"] > 0) & (state["hp"] < state["max_hp"] * 0.3)
+    actions[heal] = HEALTH_POTION
+    return actions
+
+
+VECTOR_POLICIES = {
+    "attack": attack_policy,
+    "special": special_policy,
+    "cautious": cautious_policy,
+}
+
+
+def _tick_burns(state, mask):
+    """Обработать горение у врагов в строках mask (аналог Combat.process_effects).
+
+    state["burns"][:, k] - число горений, которым осталось k + 1 тиков.
+    """
+    burns = state["burns"]
+    stacks = burns.sum(axis=1)
+    burning = mask & (stacks > 0)
+    if burning.any():
+        state["enemy_hp"][burning] -= BURN_POWER * stacks[burning]
+        burns[burning, :-1] = burns[burning, 1:]
+        burns[burning, -1] = 0
+
+
+def run_batch(matchups, fights, policy="special", rng=None, max_turns=MAX_TURNS):
+    """Провести fights боёв для каждого Matchup одним векторизованным проходом.
+
+    Возвращает массивы (исход, ходы, оставшиеся ОЗ) формы (len(matchups), fights).
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    vector_policy = VECTOR_POLICIES[policy] if isinstance(policy, str) else policy
+    groups = len(matchups)
+    total = groups * fights
+
+    table = np.array([_matchup_row(m) for m in matchups], dtype=np.float64)
+    rows = np.repeat(table, fights, axis=0)
+    state = {name: rows[:, i].copy() for i, name in enumerate(PARAMS)}
+    state["burns"] = np.zeros((total, BURN_DURATION), dtype=np.int64)
+    state["turns"] = np.zeros(total, dtype=np.int64)
+    state["row"] = np.arange(total)
+
+    outcome = np.zeros(total, dtype=np.int8)
+    turns_out = np.zeros(total, dtype=np.int64)
+    hp_out = np.zeros(total, dtype=np.int64)
+
+    attack_low = ATTACK_SPREAD[0]
+    attack_span = ATTACK_SPREAD[1] - ATTACK_SPREAD[0]
+    enemy_low = ENEMY_SPREAD[0]
+    enemy_span = ENEMY_SPREAD[1] - ENEMY_SPREAD[0]
+
+    block = None
+    block_round = BLOCK_ROUNDS
+    while len(state["row"]):
+        if block_round == BLOCK_ROUNDS:
+            # Броски: 0-2 ход персонажа, 3-4 ход врага
+            block = rng.random((BLOCK_ROUNDS, 5, len(state["row"])))
+            block_round = 0
+        u = block[block_round]
+        block_round += 1
+
+        n = len(state["row"])
+        state["turns"] += 1
+        actions = vector_policy(state)
+        hp, mp, enemy_hp = state["hp"], state["mp"], state["enemy_hp"]
+
+        # Строки, в которых ход засчитан и враг отвечает
+        acted = np.zeros(n, dtype=bool)
+        striking = np.zeros(n, dtype=bool)
+
+        # Базовая атака
+        attack = (actions == ATTACK) & (u[0] >= state["dodge"])
+        if attack.any():
+            damage = np.where(u[1] < state["crit"], state["crit_damage"], state["damage"])
+            enemy_hp[attack] -= np.rint(damage * (attack_low + attack_span * u[2]))[attack]
+            acted |= attack
+            striking |= attack
+
+        # Специальная атака
+        special = (actions == SPECIAL) & (mp >= SPECIAL_COST)
+        if special.any():
+            mp[special] -= SPECIAL_COST
+            crit = (state["special_crit"] > 0) & (u[0] < state["special_crit"])
+            damage = np.where(crit, state["special_crit_damage"], state["special_damage"])
+            enemy_hp[special] -= np.rint(damage * (state["special_low"] + state["special_span"] * u[1]))[special]
+            burn = special & (state["burn_chance"] > 0) & (u[2] < state["burn_chance"])
+            state["burns"][burn, -1] += 1
+            acted |= special
+            striking |= special
+
+        # Зелья
+        heal = (actions == HEALTH_POTION) & (state["health_potions"] > 0)
+        if heal.any():
+            state["health_potions"][heal] -= 1
+            hp[heal] = np.minimum(state["max_hp"], hp + state["heal"])[heal]
+            acted |= heal
+        restore = (actions == MANA_POTION) & (state["mana_potions"] > 0)
+        if restore.any():
+            state["mana_potions"][restore] -= 1
+            mp[restore] = np.minimum(state["max_mp"], mp + state["restore"])[restore]
+            acted |= restore
+
+        # Бегство
+        fleeing = actions == RUN
+        fled = fleeing & (u[0] < FLEE_CHANCE)
+        acted |= fleeing & ~fled
+
+        _tick_burns(state, striking)
+
+        # Ход врага
+        enemy_hits = acted & (enemy_hp > 0) & (u[3] >= state["miss"])
+        if enemy_hits.any():
+            hp[enemy_hits] -= np.rint(state["enemy_damage"] * (enemy_low + enemy_span * u[4]))[enemy_hits]
+            _tick_burns(state, enemy_hits)
+
+        result = np.zeros(n, dtype=np.int8)
+        result[(state["turns"] >= max_turns)] = TIMED_OUT
+        result[hp <= 0] = LOST
+        result[enemy_hp <= 0] = WON
+        result[fled] = FLED
+
+        done = result != ACTIVE
+        if done.any():
+            finished = state["row"][done]
+            outcome[finished] = result[done]
+            turns_out[finished] = state["turns"][done]
+            hp_out[finished] = hp[done]
+
+            keep = ~done
+            for name in state:
+                state[name] = state[name][keep]
+            block = block[:, :, keep]
+
+    shape = (groups, fights)
+    return outcome.reshape(shape), turns_out.reshape(shape), hp_out.reshape(shape)
+
+
+def batch_stats(outcome, turns, hp):
+    """Свернуть строку результатов run_batch в FightStats"""
+    stats = FightStats()
+    stats.fights = len(outcome)
+    codes, counts = np.unique(outcome, return_counts=True)
+    for code, count in zip(codes, counts):
+        stats.outcomes[OUTCOME_NAMES[int(code)]] = int(count)
+    won = outcome == WON
+    stats.turns = Counter(dict(zip(*(v.tolist() for v in np.unique(turns[won], return_counts=True)))))
+    stats.hp_left = Counter(dict(zip(*(v.tolist() for v in np.unique(hp[won], return_counts=True)))))
+    ended = outcome != TIMED_OUT
+    stats.fight_turns = Counter(dict(zip(*(v.tolist() for v in np.unique(turns[ended], return_counts=True)))))
+    return stats
+
+
+def grid(classes=None, levels=None, enemies=None, scale_steps=None, equip=True):
+    """Сетка параметров: {(класс, уровень, враг, шаг масштабирования): Matchup}"""
+    classes = classes or list(CLASS_STATS)
+    levels = levels or range(1, MAX_LEVEL + 1)
+    enemies = enemies or [e["name"] for e in ENEMIES]
+    scale_steps = scale_steps or [ENEMY_LEVEL_SCALE]
+    return {(char_class, level, enemy_name, step): Matchup.for_level(char_class, level, enemy_name, equip, step)
+            for char_class in classes
+            for level in levels
+            for enemy_name in enemies
+            for step in scale_steps}
+
+
+def batch_sweep(fights=1000, policy="special", seed=None, **grid_options):
+    """Оценить всю сетку параметров одним векторизованным проходом"""
+    matchups = grid(**grid_options)
+    outcome, turns, hp = run_batch(list(matchups.values()), fights, policy, np.random.default_rng(seed))
+    return {key: batch_stats(outcome[i], turns[i], hp[i]) for i, key in enumerate(matchups)}
+
+
+def _z_proportion(p1, p2, n1, n2):
+    pooled = (p1 * n1 + p2 * n2) / (n1 + n2)
+    se = math.sqrt(pooled * (1 - pooled) * (1 / n1 + 1 / n2))
+    return (p1 - p2) / se if se else 0.0
+
+
+def _z_mean(a, b):
+    """z-статистика разности средних двух распределений-счётчиков"""
+    def moments(counter):
+        n = sum(counter.values())
+        if not n:
+            return 0, 0.0, 0.0
+        mean = sum(v * c for v, c in counter.items()) / n
+        var = sum(c * (v - mean) ** 2 for v, c in counter.items()) / max(1, n - 1)
+        return n, mean, var
+
+    na, ma, va = moments(a)
+    nb, mb, vb = moments(b)
+    if not na or not nb:
+        return 0.0
+    se = math.sqrt(va / na + vb / nb)
+    return (ma - mb) / se if se else 0.0
+
+
+def cross_check(char_class, level, enemy_name, fights=20000, policy="special", seed=0, threshold=4.0):
+    """Сравнить скалярный (simulator.run_fights) и векторный движки на фиксированном зерне.
+
+    Результаты статистически одинаковы, если все z-статистики по модулю ниже threshold.
+    """
+    matchup = Matchup.for_level(char_class, level, enemy_name)
+    scalar = run_fights(matchup, fights, POLICIES[policy], random.Random(seed))
+    outcome, turns, hp = run_batch([matchup], fights, policy, np.random.default_rng(seed))
+    vector = batch_stats(outcome[0], turns[0], hp[0])
+
+    z = {outcome_name: _z_proportion(scalar.rate(outcome_name), vector.rate(outcome_name), fights, fights)
+         for outcome_name in (WIN, LOSS, FLEE)}
+    z["turns"] = _z_mean(scalar.turns, vector.turns)
+    z["hp_left"] = _z_mean(scalar.hp_left, vector.hp_left)
+    return {
+        "scalar": scalar.summary(),
+        "vector": vector.summary(),
+        "z": z,
+        "ok": all(abs(value) < threshold for value in z.values()),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Векторизованная симуляция боёв по сетке параметров")
+    parser.add_argument("--fights", type=int, default=1000, help="боёв на каждую комбинацию")
+    parser.add_argument("--levels", default=f"1-{MAX_LEVEL}", help="например 1-20 или 1,5,10")
+    parser.add_argument("--classes", nargs="*")
+    parser.add_argument("--enemies", nargs="*")
+    parser.add_argument("--scale-steps", nargs="*", type=float, help="варианты прироста врага за уровень")
+    parser.add_argument("--policy", choices=sorted(VECTOR_POLICIES), default="special")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--cross-check", action="store_true",
+                        help="сравнить с поштучным симулятором на фиксированном зерне")
+    args = parser.parse_args(argv)
+
+    levels = _parse_levels(args.levels)
+    if args.cross_check:
+        failed = 0
+        for char_class in args.classes or list(CLASS_STATS):
+            for level in levels:
+                for enemy_name in args.enemies or [e["name"] for e in ENEMIES]:
+                    report = cross_check(char_class, level, enemy_name, args.fights, args.policy, args.seed or 0)
+                    worst = max(report["z"].items(), key=lambda item: abs(item[1]))
+                    status = "OK" if report["ok"] else "РАСХОЖДЕНИЕ"
+                    print(f"{char_class:<8} {level:>3} {enemy_name:<11} "
+                          f"{report['scalar']['win_rate']:>7.2%} {report['vector']['win_rate']:>7.2%} "
+                          f"max|z|={abs(worst[1]):.2f} ({worst[0]}) {status}")
+                    failed += not report["ok"]
+        print(f"\nРасхождений: {failed}")
+        return 1 if failed else 0
+
+    start = time.perf_counter()
+    results = batch_sweep(args.fights, args.policy, args.seed, classes=args.classes, levels=levels,
+                          enemies=args.enemies, scale_steps=args.scale_steps)
+    elapsed = time.perf_counter() - start
+
+    print(f"{'Класс':<8} {'Ур.':>3} {'Враг':<11} {'Шаг':>5} {'Победы':>7} {'Ходы':>6} {'ОЗ ост.':>8}")
+    for (char_class, level, enemy_name, step), stats in results.items():
+        s = stats.summary()
+        print(f"{char_class:<8} {level:>3} {enemy_name:<11} {step:>5.2f} {s['win_rate']:>7.1%} "
+              f"{s['turns_mean']:>6.2f} {s['hp_left_mean']:>8.1f}")
+
+    total = sum(stats.fights for stats in results.values())
+    print(f"\n{total} боёв за {elapsed:.2f} с ({total / elapsed:,.0f} боёв/с)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
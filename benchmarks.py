@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""Микробенчмарки горячих путей движка: результаты в JSON и сравнение с базовым прогоном.
+
+    python -m benchmarks --output base.json
+    python -m benchmarks --baseline base.json --threshold 0.1
+"""
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import random
+import sys
+import time
+import timeit
+
+RESULTS_FORMAT = 1
+DEFAULT_THRESHOLD = 0.10  # Медленнее базового больше чем на 10% - регрессия
+MIN_TIME = 0.02  # Секунд на один повтор: число вызовов подбирается под него
+
+BENCHMARKS = {}  # имя -> подготовка, возвращающая функцию одного вызова
+
+
+def bench(name):
+    """Зарегистрировать подготовку замера: она строит данные и возвращает функцию без аргументов"""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def combat_setup(char_class="Воин", level=10, enemy="Тролль"):
+    """Бой без вывода с неубиваемыми сторонами: каждый вызов - один и тот же ход"""
+    from RPGame import Combat
+    from simulator import build_character, find_enemy, scale_enemy
+    character = build_character(char_class, level)
+    character.max_hp = character.hp = 10**9
+    combat = Combat(character, scale_enemy(find_enemy(enemy), level), random.Random(0))
+    combat.enemy["hp"] = 10**9
+    return combat
+
+
+@bench("combat.character_turn.attack")
+def bench_attack():
+    combat = combat_setup()
+    return lambda: combat.character_turn("attack")
+
+
+@bench("combat.character_turn.special")
+def bench_special():
+    combat = combat_setup("Маг")
+    character = combat.character
+
+    def run():
+        character.mp = 100
+        combat.character_turn("special")
+        combat.effects.clear()  # Горение копилось бы и замедляло следующие ходы
+    return run
+
+
+@bench("combat.enemy_turn")
+def bench_enemy_turn():
+    combat = combat_setup()
+    return combat.enemy_turn
+
+
+@bench("combat.process_effects")
+def bench_process_effects():
+    from RPGame import BURN_DURATION, BURN_POWER
+    combat = combat_setup()
+    effects = [("enemy", "burn"), ("character", "poison"), ("enemy", "burn")]
+
+    def run():
+        combat.effects = [{"target": target, "type": kind, "duration": BURN_DURATION, "power": BURN_POWER}
+                          for target, kind in effects]
+        combat.process_effects()
+    return run
+
+
+@bench("engine.apply.attack")
+def bench_engine_attack():
+    from RPGame import Attack, GameState
+    combat = combat_setup()
+    state = GameState(combat.character, combat.rng)
+    state.combat = combat
+    combat.ui = state.log  # Бой сообщает о событиях в журнал команды, как в игре
+    return lambda: state.apply(Attack())
+
+
+@bench("character.stats")
+def bench_stats():
+    from RPGame import STAT_NAMES
+    from simulator import build_character
+    character = build_character("Лучник", 10)
+    getters = [lambda stat=stat: getattr(character, stat) for stat in STAT_NAMES]
+
+    def run():
+        for getter in getters:
+            getter()
+    return run
+
+
+@bench("character.update_quest_progress")
+def bench_quest_progress():
+    from RPGame import QUESTS, Character
+    character = Character("Замер", "Воин")
+    for quest in QUESTS:
+        character.add_quest(quest["id"])
+    target = QUESTS[0]["objective"]["target"]
+
+    def run():
+        character.quest_progress = {}  # Без сброса задание завершилось бы и выпало из активных
+        character.update_quest_progress(target)
+    return run
+
+
+@bench("character.to_dict")
+def bench_to_dict():
+    from savefile import benchmark_character
+    return benchmark_character(10).to_dict
+
+
+@bench("character.from_dict")
+def bench_from_dict():
+    from RPGame import Character
+    from savefile import benchmark_character
+    data = benchmark_character(10).to_dict()
+    return lambda: Character.from_dict(data)
+
+
+@bench("banner.render.uncached")
+def bench_banner_uncached():
+    from banners import BannerCache
+    cache = BannerCache(asset_file=None, size=0)
+    cache.font("small")  # Разбор шрифта - разовая цена, замеряется сама отрисовка
+    return lambda: cache.render("Герой", "small")
+
+
+@bench("banner.render.cached")
+def bench_banner_cached():
+    from banners import BannerCache
+    cache = BannerCache(asset_file=None)
+    cache.render("Герой", "small")
+    return lambda: cache.render("Герой", "small")
+
+
+def frame_setup(renderer_class):
+    """Кадр главного меню игры (как в game_loop) для renderer_class, выводящего в os.devnull"""
+    from RPGame import LOCATION_REGISTRY
+    from renderer import FastForward
+    from savefile import benchmark_character
+    character = benchmark_character(10)
+    location = LOCATION_REGISTRY[character.location]
+    stream = open(os.devnull, "w", encoding="utf-8")
+    ui = renderer_class(stream, time_scale=0, keys=FastForward(stream))
+    character.ui = ui
+
+    def run():
+        ui.emit("clear")
+        ui.emit("game_menu", character=character, location=location)
+        ui.flush()
+    return run
+
+
+@bench("frame.game_menu.terminal")
+def bench_frame_terminal():
+    from renderer import TerminalRenderer
+    return frame_setup(TerminalRenderer)
+
+
+@bench("frame.game_menu.screen")
+def bench_frame_screen():
+    from renderer import ScreenRenderer
+    return frame_setup(ScreenRenderer)
+
+
+def measure(function, repeat):
+    """(лучшее, медиана) нс на вызов по repeat повторам, каждый не короче MIN_TIME"""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    number = max(1, int(number * MIN_TIME / 0.2))  # autorange подбирает под 0.2 с
+    times = sorted(t / number * 1e9 for t in timer.repeat(repeat, number))
+    return times[0], times[len(times) // 2], number
+
+
+def run(patterns, repeat):
+    """{имя: результат} для замеров, подходящих под patterns (fnmatch)"""
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if patterns and not any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+            continue
+        best, median, number = measure(setup(), repeat)
+        results[name] = {"best_ns": best, "median_ns": median, "number": number, "repeat": repeat}
+        print(f"{name:<36} {format_ns(best):>10} {format_ns(median):>10}", flush=True)
+    return results
+
+
+def format_ns(ns):
+    if ns >= 1e6:
+        return f"{ns / 1e6:.2f} мс"
+    if ns >= 1e3:
+        return f"{ns / 1e3:.2f} мкс"
+    return f"{ns:.0f} нс"
+
+
+def spread(result):
+    """Шум замера: насколько медиана повторов хуже лучшего"""
+    return result["median_ns"] / result["best_ns"] - 1
+
+
+def compare(results, baseline):
+    """[(имя, базовое нс, текущее нс, изменение, шум)]; сравниваются лучшие времена - они меньше всего шумят"""
+    rows = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base:
+            rows.append((name, base["best_ns"], result["best_ns"], result["best_ns"] / base["best_ns"] - 1,
+                         max(spread(base), spread(result))))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Микробенчмарки движка с сохранением и сравнением результатов")
+    parser.add_argument("-k", dest="patterns", action="append", metavar="PATTERN",
+                        help="только замеры, подходящие под шаблон (например combat.*); можно несколько")
+    parser.add_argument("--repeat", type=int, default=15, help="повторов каждого замера")
+    parser.add_argument("--output", metavar="PATH", help="записать результаты в JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="сравнить с результатами прежнего прогона")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="доля замедления, после которой замер считается регрессией")
+    parser.add_argument("--list", action="store_true", help="показать замеры и выйти")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+
+    print(f"{'Замер':<36} {'Лучшее':>10} {'Медиана':>10}")
+    results = run(args.patterns, args.repeat)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"format": RESULTS_FORMAT, "created": time.time(), "python": platform.python_version(),
+                       "machine": platform.machine(), "results": results}, f, ensure_ascii=False, indent=2)
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("format") != RESULTS_FORMAT:
+        print(f"{args.baseline}: неизвестный формат результатов")
+        return 2
+    rows = compare(results, baseline["results"])
+    print(f"\nСравнение с {args.baseline} (Python {baseline['python']}), порог +{args.threshold:.0%}")
+    print(f"{'Замер':<36} {'Было':>10} {'Стало':>10} {'Изменение':>10}")
+    regressions = 0
+    for name, before, after, change, noise in rows:
+        # Замедление меньше разброса повторов не отличить от помех машины
+        regression = change > max(args.threshold, noise)
+        regressions += regression
+        mark = "  РЕГРЕССИЯ" if regression else f"  (в пределах шума ±{noise:.0%})" if change > args.threshold else ""
+        print(f"{name:<36} {format_ns(before):>10} {format_ns(after):>10} {change:>+10.1%}{mark}")
+    print(f"\nРегрессий: {regressions}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
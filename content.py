@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""Пакеты контента: JSON/TOML-файлы из content/, проверка схемы и скомпилированный кэш"""
+import argparse
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+
+CONTENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "content")
+CACHE_FILE = os.path.join("__pycache__", "content.pickle")  # Относительно каталога пакетов
+CACHE_FORMAT = 2  # Увеличить при изменении схемы: старый кэш станет недействительным
+PACK_SUFFIXES = (".json", ".toml")
+
+STATS = ("hp", "mp", "strength", "defense", "agility", "critical", "luck")
+ITEM_TYPES = ("consumable", "weapon", "armor", "boots", "accessory")
+POTION_EFFECTS = {"health": "hp", "mana": "mp"}  # Зелья боя и характеристика, которую они восстанавливают
+
+
+class ContentError(ValueError):
+    """Ошибка в описании контента: нарушение схемы, повторяющийся ключ или ссылка на несуществующую запись"""
+
+
+# Схема: тип значения, словарь обязательных полей или обертка ниже
+class ListOf:
+    def __init__(self, schema):
+        self.schema = schema
+
+
+class MappingOf:
+    """Словарь с произвольными строковыми ключами и значениями по схеме"""
+
+    def __init__(self, schema):
+        self.schema = schema
+
+
+class Optional:
+    def __init__(self, schema):
+        self.schema = schema
+
+
+NUMBER = (int, float)
+STAT_BLOCK = {stat: int for stat in STATS}
+
+SCHEMA = {
+    "classes": MappingOf({"color": str, "description": str, "stats": STAT_BLOCK, "level_up": STAT_BLOCK,
+                          "starting_items": MappingOf(int)}),
+    "items": MappingOf({"type": str, "effect": MappingOf(int), "value": int, "description": str}),
+    "enemies": ListOf({"name": str, "hp": int, "mp": int, "strength": int, "defense": int, "agility": int,
+                       "xp": int, "gold": int, "desc": str, "attack_msg": str}),
+    "quests": ListOf({"id": str, "name": str, "description": str,
+                      "objective": {"type": str, "target": str, "count": int},
+                      "rewards": {"xp": int, "gold": int, "items": Optional(ListOf(str))}}),
+    "locations": ListOf({"name": str, "description": str, "enemies": ListOf(str), "enemy_chance": NUMBER,
+                         "ascii_art": str, "shop": Optional(ListOf(str))}),
+    "drops": ListOf({"item": str, "min_level": Optional(int)}),
+    "potions": MappingOf(str),
+}
+
+# Ключи записей в списках: по ним ищут реестры RPGame
+LIST_KEYS = {"enemies": "name", "quests": "id", "locations": "name"}
+
+
+def check_schema(value, schema, path, errors):
+    """Дописать в errors все расхождения value со schema"""
+    if isinstance(schema, dict):
+        if not isinstance(value, dict):
+            errors.append(f"{path}: ожидается таблица")
+            return
+        for field, field_schema in schema.items():
+            if field in value:
+                check_schema(value[field], field_schema.schema if isinstance(field_schema, Optional) else field_schema,
+                             f"{path}.{field}", errors)
+            elif not isinstance(field_schema, Optional):
+                errors.append(f"{path}: нет поля {field!r}")
+        for field in value.keys() - schema.keys():
+            errors.append(f"{path}: неизвестное поле {field!r}")
+    elif isinstance(schema, ListOf):
+        if not isinstance(value, list):
+            errors.append(f"{path}: ожидается список")
+            return
+        for i, entry in enumerate(value):
+            check_schema(entry, schema.schema, f"{path}[{i}]", errors)
+    elif isinstance(schema, MappingOf):
+        if not isinstance(value, dict):
+            errors.append(f"{path}: ожидается таблица")
+            return
+        for key, entry in value.items():
+            check_schema(entry, schema.schema, f"{path}[{key!r}]", errors)
+    elif isinstance(value, bool) or not isinstance(value, schema):
+        expected = " или ".join(t.__name__ for t in schema) if isinstance(schema, tuple) else schema.__name__
+        errors.append(f"{path}: ожидается {expected}, получено {type(value).__name__}")
+
+
+def read_pack(path):
+    """Разобрать один JSON/TOML-файл пакета"""
+    try:
+        if path.endswith(".toml"):
+            import tomllib  # Нужен только при пересборке кэша
+            with open(path, "rb") as f:
+                return tomllib.load(f)
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except ValueError as e:
+        raise ContentError(f"{os.path.basename(path)}: {e}") from None
+
+
+def merge_packs(packs):
+    """Объединить пакеты [(имя файла, данные)] по секциям; повтор ключа между пакетами - ошибка"""
+    content = {section: {} if isinstance(schema, MappingOf) else [] for section, schema in SCHEMA.items()}
+    errors = []
+    for name, pack in packs:
+        if not isinstance(pack, dict):
+            errors.append(f"{name}: ожидается таблица секций")
+            continue
+        for section in pack.keys() - SCHEMA.keys():
+            errors.append(f"{name}: неизвестная секция {section!r}")
+        for section, schema in SCHEMA.items():
+            if section not in pack:
+                continue
+            before = len(errors)
+            check_schema(pack[section], schema, f"{name}: {section}", errors)
+            if len(errors) > before:
+                continue
+            if isinstance(schema, MappingOf):
+                for key in pack[section].keys() & content[section].keys():
+                    errors.append(f"{name}: {section}: {key!r} уже описан в другом пакете")
+                content[section].update(pack[section])
+            else:
+                content[section].extend(pack[section])
+    if errors:
+        raise ContentError("\n".join(errors))
+    return content
+
+
+def validate_content(content):
+    """Проверить ключи и ссылки между записями: враги и товары локаций, цели и награды заданий, предметы"""
+    errors = []
+    for section, key in LIST_KEYS.items():
+        seen = set()
+        for entry in content[section]:
+            if entry[key] in seen:
+                errors.append(f"{section}: повторяющийся ключ {entry[key]!r}")
+            seen.add(entry[key])
+    enemies = {enemy["name"] for enemy in content["enemies"]}
+    items = content["items"]
+    for name, item in items.items():
+        if item["type"] not in ITEM_TYPES:
+            errors.append(f"предмет {name!r}: неизвестный тип {item['type']!r}")
+        for stat in item["effect"].keys() - set(STATS):
+            errors.append(f"предмет {name!r}: неизвестная характеристика {stat!r}")
+    for name, char_class in content["classes"].items():
+        for item_name in char_class["starting_items"]:
+            if item_name not in items:
+                errors.append(f"класс {name!r}: неизвестный начальный предмет {item_name!r}")
+    for location in content["locations"]:
+        for enemy_name in location["enemies"]:
+            if enemy_name not in enemies:
+                errors.append(f"локация {location['name']!r}: неизвестный враг {enemy_name!r}")
+        for item_name in location.get("shop", []):
+            if item_name not in items:
+                errors.append(f"локация {location['name']!r}: неизвестный товар {item_name!r}")
+    for drop in content["drops"]:
+        if drop["item"] not in items:
+            errors.append(f"добыча: неизвестный предмет {drop['item']!r}")
+    if not any("min_level" not in drop for drop in content["drops"]):
+        errors.append("добыча: нет ни одного предмета без min_level")
+    potions = content["potions"]
+    for kind in potions.keys() - POTION_EFFECTS.keys():
+        errors.append(f"зелья: неизвестное зелье {kind!r}")
+    for kind, stat in POTION_EFFECTS.items():
+        item_name = potions.get(kind)
+        if item_name is None:
+            errors.append(f"зелья: нет зелья {kind!r}")
+        elif item_name not in items:
+            errors.append(f"зелья: неизвестный предмет {item_name!r}")
+        elif items[item_name]["type"] != "consumable" or stat not in items[item_name]["effect"]:
+            errors.append(f"зелья: {item_name!r} не восстанавливает {stat}")
+    for quest in content["quests"]:
+        objective = quest["objective"]
+        if objective["type"] == "defeat" and objective["target"] not in enemies:
+            errors.append(f"задание {quest['id']!r}: неизвестная цель {objective['target']!r}")
+        for item_name in quest["rewards"].get("items", []):
+            if item_name not in items:
+                errors.append(f"задание {quest['id']!r}: неизвестный предмет награды {item_name!r}")
+    for section in ("classes", "enemies", "locations"):
+        if not content[section]:
+            errors.append(f"{section}: нет ни одной записи")
+    if errors:
+        raise ContentError("\n".join(errors))
+
+
+def compile_packs(paths):
+    """Разобрать, объединить и проверить пакеты: готовый контент для игры"""
+    content = merge_packs([(os.path.basename(path), read_pack(path)) for path in paths])
+    validate_content(content)
+    return content
+
+
+def pack_files(content_dir):
+    return sorted(os.path.join(content_dir, name) for name in os.listdir(content_dir)
+                  if name.endswith(PACK_SUFFIXES))
+
+
+def cache_key(paths):
+    """Ключ кэша: формат и (имя, mtime, размер) каждого пакета, как у .pyc"""
+    files = []
+    for path in paths:
+        stat = os.stat(path)
+        files.append((os.path.basename(path), stat.st_mtime_ns, stat.st_size))
+    return CACHE_FORMAT, tuple(files)
+
+
+def read_cache(cache_file, key):
+    """Контент из кэша, если он собран из тех же файлов; иначе None"""
+    try:
+        with open(cache_file, "rb") as f:
+            if pickle.load(f) != key:
+                return None
+            return pickle.load(f)
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        return None  # Нет кэша или он поврежден - пакеты разбираются заново
+
+
+def write_cache(cache_file, key, content):
+    """Записать кэш атомарно; каталог только для чтения просто остается без кэша"""
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "wb") as f:
+            pickle.dump(key, f, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(content, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        pass
+
+
+def load_content(content_dir=CONTENT_DIR, use_cache=True):
+    """Контент всех пакетов из content_dir; при неизменных файлах - из кэша без разбора и проверки"""
+    paths = pack_files(content_dir)
+    if not paths:
+        raise ContentError(f"нет пакетов контента ({', '.join(PACK_SUFFIXES)}) в {content_dir}")
+    key = cache_key(paths)
+    cache_file = os.path.join(content_dir, CACHE_FILE)
+    if use_cache:
+        content = read_cache(cache_file, key)
+        if content is not None:
+            return content
+    content = compile_packs(paths)
+    write_cache(cache_file, key, content)
+    return content
+
+
+def generate_pack(path, count):
+    """Синтетический JSON-пакет на count врагов, предметов и заданий (для бенчмарка)"""
+    enemies = [{"name": f"Враг {i}", "hp": 50 + i % 100, "mp": i % 30, "strength": 5 + i % 10,
+                "defense": 3 + i % 8, "agility": 4 + i % 9, "xp": 20 + i % 40, "gold": 10 + i % 25,
+                "desc": f"Сгенерированный враг номер {i}", "attack_msg": "атакует"} for i in range(count)]
+    items = {f"Предмет {i}": {"type": ITEM_TYPES[i % len(ITEM_TYPES)], "effect": {STATS[i % len(STATS)]: 1 + i % 9},
+                              "value": 10 + i, "description": f"Сгенерированный предмет номер {i}"}
+             for i in range(count)}
+    quests = [{"id": f"gen{i}", "name": f"Задание {i}", "description": f"Победите врага номер {i}.",
+               "objective": {"type": "defeat", "target": f"Враг {i}", "count": 1 + i % 5},
+               "rewards": {"xp": 50, "gold": 30, "items": [f"Предмет {i}"]}} for i in range(count)]
+    locations = [{"name": f"Локация {i}", "description": f"Сгенерированная локация номер {i}",
+                  "enemies": [f"Враг {j}" for j in range(i, min(count, i + 5))], "enemy_chance": 0.5,
+                  "ascii_art": "\n" + "\n".join(f"  {'#' * 30}  " for _ in range(7)) + "\n"}
+                 for i in range(0, count, 10)]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"enemies": enemies, "items": items, "quests": quests, "locations": locations},
+                  f, ensure_ascii=False, indent=1)
+
+
+def timed(function, rounds):
+    """Лучшее время вызова function() из rounds, в секундах"""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark(content_dir, rounds):
+    """(записей, разбор с проверкой, загрузка из кэша) для пакетов content_dir"""
+    content = load_content(content_dir)
+    entries = sum(len(content[section]) for section in SCHEMA)
+    cold = timed(lambda: load_content(content_dir, use_cache=False), rounds)
+    cached = timed(lambda: load_content(content_dir), rounds)
+    return entries, cold, cached
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка пакетов контента и время их загрузки")
+    parser.add_argument("--content-dir", default=CONTENT_DIR)
+    parser.add_argument("--generate", type=int, metavar="N",
+                        help="добавить к пакетам синтетический пакет на N врагов, предметов и заданий")
+    parser.add_argument("--rounds", type=int, default=5, help="повторов замера; берется лучший")
+    args = parser.parse_args(argv)
+
+    content_dir = args.content_dir
+    if args.generate:
+        content_dir = tempfile.mkdtemp(prefix="content-bench-")
+        for path in pack_files(args.content_dir):
+            shutil.copy(path, content_dir)
+        generate_pack(os.path.join(content_dir, "generated.json"), args.generate)
+    try:
+        try:
+            entries, cold, cached = benchmark(content_dir, args.rounds)
+        except ContentError as e:
+            print(f"Ошибки в пакетах контента:\n{e}")
+            return 1
+        size = sum(os.path.getsize(path) for path in pack_files(content_dir))
+        print(f"Пакетов: {len(pack_files(content_dir))}, {size / 1024:.0f} КБ, записей: {entries}")
+        print(f"Разбор и проверка:  {cold * 1e3:>8.2f} мс")
+        print(f"Из кэша:            {cached * 1e3:>8.2f} мс (ускорение x{cold / cached:.0f})")
+    finally:
+        if args.generate:
+            shutil.rmtree(content_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""Хранилище персонажей в SQLite: таблицы персонажей, инвентаря и заданий с индексами для запросов по многим игрокам"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from journal import SCALAR_FIELDS, diff
+from savefile import SaveFile
+from saves import BINARY_SUFFIX, JSON_SUFFIX, SaveStore, slot_name
+
+DB_FILE = "saves.db"
+HEADER_COLUMNS = ("slot", "name", "char_class", "level", "location", "saved_at")  # Как заголовки SaveStore
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS characters (
+    slot TEXT PRIMARY KEY,
+    {", ".join(f"{field} {'TEXT' if field in ('name', 'char_class', 'location') else 'INTEGER'} NOT NULL"
+               for field in SCALAR_FIELDS)},
+    saved_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS characters_name ON characters (name);
+CREATE INDEX IF NOT EXISTS characters_level ON characters (level);
+CREATE INDEX IF NOT EXISTS characters_location ON characters (location, level);
+CREATE INDEX IF NOT EXISTS characters_saved_at ON characters (saved_at);
+
+-- Строки дочерних таблиц читаются по rowid: так сохраняется порядок словарей персонажа
+CREATE TABLE IF NOT EXISTS equipment (
+    slot TEXT NOT NULL, equip_slot TEXT NOT NULL, item TEXT,
+    UNIQUE (slot, equip_slot)
+);
+CREATE TABLE IF NOT EXISTS inventory (
+    slot TEXT NOT NULL, item TEXT NOT NULL, count INTEGER NOT NULL,
+    UNIQUE (slot, item)
+);
+CREATE INDEX IF NOT EXISTS inventory_item ON inventory (item);
+CREATE TABLE IF NOT EXISTS quests (
+    slot TEXT NOT NULL, quest_id TEXT NOT NULL, done INTEGER NOT NULL,
+    UNIQUE (slot, done, quest_id)
+);
+CREATE TABLE IF NOT EXISTS quest_progress (
+    slot TEXT NOT NULL, quest_id TEXT NOT NULL, target TEXT NOT NULL, count INTEGER NOT NULL,
+    UNIQUE (slot, quest_id, target)
+);
+"""
+
+# Запросы - постоянные строки: sqlite3 хранит скомпилированные выражения в кэше соединения
+INSERT_CHARACTER = (f"INSERT INTO characters (slot, {', '.join(SCALAR_FIELDS)}, saved_at) "
+                    f"VALUES ({', '.join('?' * (len(SCALAR_FIELDS) + 2))}) ON CONFLICT (slot) DO UPDATE SET "
+                    + ", ".join(f"{field} = excluded.{field}" for field in (*SCALAR_FIELDS, "saved_at")))
+SELECT_CHARACTER = f"SELECT {', '.join(SCALAR_FIELDS)} FROM characters WHERE slot = ?"
+SELECT_HEADERS = f"SELECT {', '.join(HEADER_COLUMNS)} FROM characters"
+UPDATE_FIELD = {field: f"UPDATE characters SET {field} = ? WHERE slot = ?" for field in SCALAR_FIELDS}
+TOUCH = "UPDATE characters SET saved_at = ? WHERE slot = ?"
+CHILD_TABLES = ("equipment", "inventory", "quests", "quest_progress")
+INSERT_CHILD = {
+    "equipment": "INSERT INTO equipment VALUES (?, ?, ?) ON CONFLICT DO UPDATE SET item = excluded.item",
+    "inventory": "INSERT INTO inventory VALUES (?, ?, ?) ON CONFLICT DO UPDATE SET count = excluded.count",
+    "quests": "INSERT INTO quests VALUES (?, ?, ?)",
+    "quest_progress": "INSERT INTO quest_progress VALUES (?, ?, ?, ?) ON CONFLICT DO UPDATE SET count = excluded.count",
+}
+SELECT_CHILD = {table: f"SELECT * FROM {table} WHERE slot = ? ORDER BY rowid" for table in CHILD_TABLES}
+DELETE_CHILD = {table: f"DELETE FROM {table} WHERE slot = ?" for table in CHILD_TABLES}
+DELETE_CHARACTER = "DELETE FROM characters WHERE slot = ?"
+DELETE_ITEM = "DELETE FROM inventory WHERE slot = ? AND item = ?"
+DELETE_QUEST = "DELETE FROM quests WHERE slot = ? AND quest_id = ? AND done = ?"
+DELETE_COMPLETED = "DELETE FROM quests WHERE slot = ? AND done = 1"
+DELETE_PROGRESS = "DELETE FROM quest_progress WHERE slot = ? AND quest_id = ?"
+
+
+def character_row(slot, data, saved_at):
+    return (slot, *(data[field] for field in SCALAR_FIELDS), saved_at)
+
+
+def child_rows(slot, data):
+    """{таблица: строки} для данных персонажа (Character.to_dict)"""
+    return {
+        "equipment": [(slot, equip_slot, item) for equip_slot, item in data["equipment"].items()],
+        "inventory": [(slot, item, count) for item, count in data["inventory"].items()],
+        "quests": [(slot, quest_id, 0) for quest_id in data["active_quests"].values()]
+                  + [(slot, quest_id, 1) for quest_id in data["completed_quests"]],
+        "quest_progress": [(slot, quest_id, target, count) for quest_id, targets in data["quest_progress"].items()
+                           for target, count in targets.items()],
+    }
+
+
+def read_save(path):
+    """Данные персонажа из файла сохранения SaveStore или прежнего одиночного JSON"""
+    if path.endswith(BINARY_SUFFIX):
+        data = SaveFile.read(path).to_dict()
+    else:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    data.pop("journal_seq", None)
+    return data
+
+
+class CharacterDB:
+    """Персонажи в одной базе SQLite; те же методы, что у SaveStore, так что Game и Autosaver работают с любым.
+
+    База в режиме WAL: чтение (меню, запросы) не ждет записи. save пишет
+    персонажа целиком, record - только строки, изменившиеся с прошлой записи
+    этого слота. synchronous=NORMAL: обрыв процесса записанного не теряет,
+    отключение питания может откатить последние транзакции, но не испортит базу.
+    """
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False)  # Пишет поток Autosaver, читает игра
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("PRAGMA synchronous = NORMAL")
+        self.db.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.last = {}  # слот -> данные последней записи или загрузки: от них record считает изменения
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def release(self, slot):
+        """Забыть последний снимок слота, которым больше не играют: следующая запись будет полной"""
+        with self.lock:
+            self.last.pop(slot, None)
+
+    def write_character(self, slot, data, saved_at):
+        self.db.execute(INSERT_CHARACTER, character_row(slot, data, saved_at))
+        for table, rows in child_rows(slot, data).items():
+            self.db.execute(DELETE_CHILD[table], (slot,))
+            self.db.executemany(INSERT_CHILD[table], rows)
+
+    def save(self, slot, data):
+        """Записать персонажа целиком одной транзакцией; вернуть заголовок"""
+        saved_at = time.time()
+        with self.lock:
+            with self.db:
+                self.write_character(slot, data, saved_at)
+            self.last[slot] = data
+        return dict(zip(HEADER_COLUMNS, (slot, data["name"], data["char_class"], data["level"],
+                                         data["location"], saved_at)))
+
+    def record(self, slot, data):
+        """Записать только изменения с прошлой записи слота (события journal.diff)"""
+        with self.lock:
+            last = self.last.get(slot)
+            with self.db:
+                if last is None:
+                    self.write_character(slot, data, time.time())
+                else:
+                    events = diff(last, data)
+                    if not events:
+                        return
+                    for event in events:
+                        self.apply_event(slot, event)
+                    self.db.execute(TOUCH, (time.time(), slot))
+            self.last[slot] = data
+
+    def apply_event(self, slot, event):
+        kind = event[0]
+        if kind == "set" and event[1] == "completed_quests":
+            self.db.execute(DELETE_COMPLETED, (slot,))
+            self.db.executemany(INSERT_CHILD["quests"], [(slot, quest_id, 1) for quest_id in event[2]])
+        elif kind == "set":
+            self.db.execute(UPDATE_FIELD[event[1]], (event[2], slot))
+        elif kind == "item":
+            self.db.execute(INSERT_CHILD["inventory"], (slot, event[1], event[2]))
+        elif kind == "drop":
+            self.db.execute(DELETE_ITEM, (slot, event[1]))
+        elif kind == "equip":
+            self.db.execute(INSERT_CHILD["equipment"], (slot, event[1], event[2]))
+        elif kind == "quest":
+            if event[2]:
+                self.db.execute(INSERT_CHILD["quests"], (slot, event[1], 0))
+            else:
+                self.db.execute(DELETE_QUEST, (slot, event[1], 0))
+        elif kind == "done":
+            self.db.execute(INSERT_CHILD["quests"], (slot, event[1], 1))
+        elif kind == "progress":
+            self.db.execute(INSERT_CHILD["quest_progress"], (slot, event[1], event[2], event[3]))
+        elif kind == "unprogress":
+            self.db.execute(DELETE_PROGRESS, (slot, event[1]))
+        else:
+            raise ValueError(f"неизвестное событие журнала: {kind!r}")
+
+    def load(self, slot):
+        """Данные персонажа (для Character.from_dict)"""
+        with self.lock:
+            row = self.db.execute(SELECT_CHARACTER, (slot,)).fetchone()
+            if row is None:
+                raise LookupError(f"нет персонажа в слоте {slot!r}")
+            children = {table: self.db.execute(SELECT_CHILD[table], (slot,)).fetchall() for table in CHILD_TABLES}
+            data = dict(zip(SCALAR_FIELDS, row))
+            data["equipment"] = {equip_slot: item for _, equip_slot, item in children["equipment"]}
+            data["inventory"] = {item: count for _, item, count in children["inventory"]}
+            data["active_quests"] = {quest_id: quest_id for _, quest_id, done in children["quests"] if not done}
+            data["completed_quests"] = [quest_id for _, quest_id, done in children["quests"] if done]
+            progress = data["quest_progress"] = {}
+            for _, quest_id, target, count in children["quest_progress"]:
+                progress.setdefault(quest_id, {})[target] = count
+            self.last[slot] = data  # from_dict данные копирует, так что они остаются снимком записанного
+        return data
+
+    def delete(self, slot):
+        """Удалить персонажа из слота"""
+        with self.lock, self.db:
+            for table in CHILD_TABLES:
+                self.db.execute(DELETE_CHILD[table], (slot,))
+            self.db.execute(DELETE_CHARACTER, (slot,))
+            self.last.pop(slot, None)
+
+    def slots(self, limit=None):
+        """Заголовки слотов, последние сохранения сверху"""
+        sql = SELECT_HEADERS + " ORDER BY saved_at DESC" + (" LIMIT ?" if limit else "")
+        with self.lock:
+            rows = self.db.execute(sql, (limit,) if limit else ()).fetchall()
+        return [dict(zip(HEADER_COLUMNS, row)) for row in rows]
+
+    def query(self, name=None, location=None, min_level=None, max_level=None, limit=50):
+        """Заголовки персонажей по имени, локации и уровню (по индексам), старшие уровни сверху"""
+        conditions, params = [], []
+        for condition, value in (("name = ?", name), ("location = ?", location),
+                                 ("level >= ?", min_level), ("level <= ?", max_level)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        sql = SELECT_HEADERS + (" WHERE " + " AND ".join(conditions) if conditions else "")
+        with self.lock:
+            rows = self.db.execute(sql + " ORDER BY level DESC LIMIT ?", (*params, limit)).fetchall()
+        return [dict(zip(HEADER_COLUMNS, row)) for row in rows]
+
+    def count(self):
+        with self.lock:
+            return self.db.execute("SELECT count(*) FROM characters").fetchone()[0]
+
+    def free_slot(self, name):
+        """Незанятый слот для нового персонажа name"""
+        base = slot = slot_name(name)
+        n = 2
+        with self.lock:
+            while self.db.execute("SELECT 1 FROM characters WHERE slot = ?", (slot,)).fetchone():
+                slot = f"{base}_{n}"
+                n += 1
+        return slot
+
+    def import_file(self, path):
+        """Перенести одиночный файл сохранения прежних версий в новый слот, если база пуста"""
+        if self.count() or not os.path.exists(path):
+            return None
+        data = read_save(path)
+        slot = self.free_slot(data["name"])
+        self.save(slot, data)
+        return slot
+
+    def import_many(self, characters):
+        """Записать персонажей одной транзакцией, каждому - свободный слот по имени; вернуть их число"""
+        with self.lock, self.db:
+            taken = {slot for slot, in self.db.execute("SELECT slot FROM characters")}
+            rows = {table: [] for table in ("characters", *CHILD_TABLES)}
+            saved_at = time.time()
+            for data in characters:
+                base = slot = slot_name(data["name"])
+                n = 2
+                while slot in taken:
+                    slot = f"{base}_{n}"
+                    n += 1
+                taken.add(slot)
+                rows["characters"].append(character_row(slot, data, saved_at))
+                for table, table_rows in child_rows(slot, data).items():
+                    rows[table] += table_rows
+            characters = rows.pop("characters")
+            self.db.executemany(INSERT_CHARACTER, characters)
+            for table, table_rows in rows.items():
+                self.db.executemany(INSERT_CHILD[table], table_rows)
+            return len(characters)
+
+
+def existing_saves(paths):
+    """Данные персонажей из файлов и каталогов сохранений (в каталоге SaveStore - с воспроизведенным журналом)"""
+    for path in paths:
+        if os.path.isdir(path):
+            store = SaveStore(path)
+            for header in store.slots():
+                yield store.load(header["slot"])
+            store.close()
+        elif path.endswith((BINARY_SUFFIX, JSON_SUFFIX)):
+            yield read_save(path)
+
+
+def benchmark_characters(count, seed=0):
+    """count разных персонажей: класс, уровень, локация, инвентарь и задания"""
+    from RPGame import CONTENT, ITEMS, LOCATIONS, QUESTS, Character
+    rng = random.Random(seed)
+    classes, items, locations = list(CONTENT["classes"]), list(ITEMS), [location["name"] for location in LOCATIONS]
+    templates = {char_class: Character("Шаблон", char_class).to_dict() for char_class in classes}
+    for i in range(count):
+        data = dict(templates[rng.choice(classes)])
+        data["name"] = f"Герой {i}"
+        data["level"] = rng.randint(1, 50)
+        data["gold"] = rng.randint(0, 5000)
+        data["location"] = rng.choice(locations)
+        data["equipment"] = dict(data["equipment"])
+        data["inventory"] = {item: rng.randint(1, 5) for item in rng.sample(items, 6)}
+        quests = rng.sample(QUESTS, 3)
+        data["completed_quests"] = [quests[0]["id"]]
+        data["active_quests"] = {quest["id"]: quest["id"] for quest in quests[1:]}
+        data["quest_progress"] = {quest["id"]: {quest["objective"]["target"]: rng.randint(0, 2)} for quest in quests[1:]}
+        yield data
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples), samples[int(len(samples) * 0.99)]
+
+
+def benchmark(count, rounds, seed=0):
+    """[(операция, медиана, 99-й перцентиль)] в секундах на базе с count персонажами; время заполнения и размер базы"""
+    directory = tempfile.mkdtemp(prefix="database-bench-")
+    try:
+        db = CharacterDB(os.path.join(directory, DB_FILE))
+        start = time.perf_counter()
+        db.import_many(benchmark_characters(count, seed))
+        fill = time.perf_counter() - start
+
+        rng = random.Random(seed)
+        slots = [row["slot"] for row in db.query(limit=count)]
+        timings = {name: [] for name in ("загрузка", "полная запись", "запись изменений", "запрос по локации и уровню",
+                                         "запрос по имени", "меню: 20 последних")}
+
+        def timed(name, function, *args):
+            start = time.perf_counter()
+            result = function(*args)
+            timings[name].append(time.perf_counter() - start)
+            return result
+
+        for _ in range(rounds):
+            slot = rng.choice(slots)
+            data = timed("загрузка", db.load, slot)
+            timed("полная запись", db.save, slot, data)
+            changed = {**data, "gold": data["gold"] + 5, "hp": data["hp"] - 3,
+                       "inventory": {**data["inventory"], "Зелье здоровья": 9}}
+            timed("запись изменений", db.record, slot, changed)
+            assert db.load(slot) == changed
+            timed("запрос по локации и уровню", db.query, None, data["location"], 20, 30)
+            timed("запрос по имени", db.query, data["name"])
+            timed("меню: 20 последних", db.slots, 20)
+        db.close()
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    finally:
+        shutil.rmtree(directory)
+    return [(name, *percentiles(samples)) for name, samples in timings.items()], fill, size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Персонажи в базе SQLite: перенос сохранений, запросы и бенчмарк")
+    parser.add_argument("--db", default=DB_FILE, help="файл базы")
+    parser.add_argument("--import", dest="paths", nargs="+", metavar="PATH",
+                        help="перенести в базу сохранения: каталоги слотов, файлы .sav и .json")
+    parser.add_argument("--name")
+    parser.add_argument("--location")
+    parser.add_argument("--min-level", type=int)
+    parser.add_argument("--max-level", type=int)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--bench", type=int, metavar="N", help="замер на базе из N синтетических персонажей")
+    parser.add_argument("--rounds", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        rows, fill, size = benchmark(args.bench, args.rounds)
+        print(f"{args.bench} персонажей: заполнение {fill:.1f} с, база {size / 2**20:.1f} МБ\n")
+        print(f"{'Операция':<28} {'Медиана, мс':>12} {'p99, мс':>9}")
+        for name, median, p99 in rows:
+            print(f"{name:<28} {median * 1e3:>12.3f} {p99 * 1e3:>9.3f}")
+        return 0
+
+    db = CharacterDB(args.db)
+    if args.paths:
+        imported = db.import_many(existing_saves(args.paths))
+        print(f"Перенесено персонажей: {imported}")
+        return 0
+    for header in db.query(args.name, args.location, args.min_level, args.max_level, args.limit):
+        saved_at = time.strftime("%Y-%m-%d %H:%M", time.localtime(header["saved_at"]))
+        print(f"{header['slot']:<24} {header['name']:<20} {header['char_class']:<8} "
+              f"ур. {header['level']:<3} {header['location']:<16} {saved_at}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""Журнал изменений персонажа: события между снимками, воспроизведение при загрузке и сжатие сегментов"""
+import argparse
+import copy
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+SEGMENT_SUFFIX = ".log"
+# Поля Character.to_dict, которые меняются целиком (событие "set")
+SCALAR_FIELDS = ("name", "char_class", "level", "xp", "xp_next", "gold", "max_hp", "hp", "max_mp", "mp",
+                 "base_strength", "base_defense", "base_agility", "base_critical", "base_luck", "location")
+
+
+def diff(old, new):
+    """События, переводящие состояние old (Character.to_dict) в new.
+
+    ["set", поле, значение], ["item", предмет, количество], ["drop", предмет],
+    ["equip", слот, предмет], ["quest", id, активно], ["done", id],
+    ["progress", id, цель, побеждено], ["unprogress", id]
+    """
+    events = [["set", field, new[field]] for field in SCALAR_FIELDS if old[field] != new[field]]
+
+    old_items, new_items = old["inventory"], new["inventory"]
+    if old_items != new_items:
+        events += [["item", item, count] for item, count in new_items.items() if old_items.get(item) != count]
+        events += [["drop", item] for item in old_items.keys() - new_items.keys()]
+
+    if old["equipment"] != new["equipment"]:
+        events += [["equip", slot, item] for slot, item in new["equipment"].items()
+                   if old["equipment"].get(slot) != item]
+
+    if old["active_quests"] != new["active_quests"]:
+        events += [["quest", quest_id, True] for quest_id in new["active_quests"].keys() - old["active_quests"].keys()]
+        events += [["quest", quest_id, False] for quest_id in old["active_quests"].keys() - new["active_quests"].keys()]
+
+    old_done, new_done = old["completed_quests"], new["completed_quests"]
+    if old_done != new_done:
+        if new_done[:len(old_done)] == old_done:
+            events += [["done", quest_id] for quest_id in new_done[len(old_done):]]
+        else:
+            events.append(["set", "completed_quests", new_done])
+
+    old_progress, new_progress = old["quest_progress"], new["quest_progress"]
+    if old_progress != new_progress:
+        for quest_id, targets in new_progress.items():
+            old_targets = old_progress.get(quest_id, {})
+            events += [["progress", quest_id, target, count] for target, count in targets.items()
+                       if old_targets.get(target) != count]
+        events += [["unprogress", quest_id] for quest_id in old_progress.keys() - new_progress.keys()]
+    return events
+
+
+def apply(data, events):
+    """Применить события к состоянию data на месте"""
+    for event in events:
+        kind = event[0]
+        if kind == "set":
+            data[event[1]] = event[2]
+        elif kind == "item":
+            data["inventory"][event[1]] = event[2]
+        elif kind == "drop":
+            del data["inventory"][event[1]]
+        elif kind == "equip":
+            data["equipment"][event[1]] = event[2]
+        elif kind == "quest":
+            if event[2]:
+                data["active_quests"][event[1]] = event[1]
+            else:
+                del data["active_quests"][event[1]]
+        elif kind == "done":
+            data["completed_quests"].append(event[1])
+        elif kind == "progress":
+            data["quest_progress"].setdefault(event[1], {})[event[2]] = event[3]
+        elif kind == "unprogress":
+            del data["quest_progress"][event[1]]
+        else:
+            raise ValueError(f"неизвестное событие журнала: {kind!r}")
+    return data
+
+
+class Journal:
+    """Журнал одного слота: файлы <слот>.<номер первой записи>.log рядом со снимком.
+
+    Запись - строка JSON [номер, события] с изменениями с прошлой записи, так
+    что ее размер зависит от изменений, а не от всего состояния. Снимок хранит
+    номер последней вошедшей в него записи; после снимка все сегменты удаляются.
+    Оборванная сбоем строка в хвосте сегмента при воспроизведении отбрасывается.
+
+    Сегмент открывается только на время дозаписи: fsync все равно дороже
+    открытия, а тысячи слотов сервера не держат тысячи файлов. Список
+    сегментов читается из каталога один раз и дальше ведется самим журналом,
+    поэтому слот, который отдают другому процессу, сначала освобождают
+    (SaveStore.release): его журнал там создадут и прочитают заново.
+    """
+
+    def __init__(self, directory, slot, sync=True):
+        self.directory = directory
+        self.slot = slot
+        self.sync = sync             # fsync после каждой записи
+        self.state = None            # Состояние после последней записи; None - нужен полный снимок
+        self.seq = 0                 # Номер последней записи
+        self.since_snapshot = 0      # Байт журнала после последнего снимка
+        self.segment = None          # Путь сегмента, в который идет дозапись
+        self.known = None            # [(номер первой записи, путь)] или None - каталог еще не читали
+
+    def segments(self):
+        """[(номер первой записи, путь)] по порядку"""
+        if self.known is None:
+            self.known = self.scan()
+        return list(self.known)
+
+    def scan(self):
+        prefix = self.slot + "."
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        segments = []
+        for name in names:
+            if name.startswith(prefix) and name.endswith(SEGMENT_SUFFIX):
+                first = name[len(prefix):-len(SEGMENT_SUFFIX)]
+                if first.isdigit():
+                    segments.append((int(first), os.path.join(self.directory, name)))
+        return sorted(segments)
+
+    def close_segment(self):
+        """Следующая запись начнет новый сегмент"""
+        self.segment = None
+
+    def record(self, data):
+        """Дописать изменения data относительно прошлой записи; вернуть число записанных байт"""
+        events = diff(self.state, data)
+        if not events:
+            return 0
+        self.seq += 1
+        line = (json.dumps([self.seq, events], ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        try:
+            if self.segment is None:
+                path = os.path.join(self.directory, f"{self.slot}.{self.seq:010d}{SEGMENT_SUFFIX}")
+                self.segments()  # Прежние сегменты - до создания нового
+                self.known.append((self.seq, path))  # Даже недописанный файл удалит следующий снимок
+                with open(path, "wb") as f:
+                    self.write(f, line)
+                self.segment = path
+            else:
+                with open(self.segment, "ab") as f:
+                    self.write(f, line)
+        except OSError:
+            # Строка могла записаться наполовину: следующая запись начнет новый сегмент
+            self.close_segment()
+            raise
+        self.state = data
+        self.since_snapshot += len(line)
+        return len(line)
+
+    def write(self, f, line):
+        f.write(line)
+        f.flush()
+        if self.sync:
+            os.fsync(f.fileno())
+
+    def replay(self, data, snapshot_seq):
+        """Применить к снимку (покрывает записи до snapshot_seq) все более поздние записи"""
+        self.close_segment()
+        last = snapshot_seq
+        size = 0
+        for _, path in self.segments():
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        seq, events = json.loads(line)
+                    except ValueError:
+                        break  # Запись оборвана сбоем: дальше в этом сегменте ничего нет
+                    if seq > last:
+                        apply(data, events)
+                        last = seq
+                        size += len(line)
+        self.seq = last
+        self.state = copy.deepcopy(data)  # data уйдет в Character.from_dict
+        self.since_snapshot = size  # Журнал, накопленный до загрузки, тоже приближает снимок
+        return data
+
+    def compact(self, data):
+        """Снимок data записан и покрывает все записи: удалить сегменты"""
+        self.close_segment()
+        for _, path in self.segments():
+            os.remove(path)
+        self.known = []
+        self.state = data
+        self.since_snapshot = 0
+
+
+def benchmark_state(items, quests):
+    """Поздняя игра: большой инвентарь и длинный журнал заданий"""
+    from RPGame import Character
+    data = Character("Замер", "Воин").to_dict()
+    data["inventory"] = {f"Предмет {i}": 1 + i % 5 for i in range(items)}
+    data["completed_quests"] = [f"q{i}" for i in range(quests)]
+    data["quest_progress"] = {f"q{i}": {"Гоблин": 3} for i in range(quests)}
+    return data
+
+
+def actions(data, count):
+    """Снимки после count типичных действий: урон, золото, добыча, прогресс задания"""
+    for i in range(count):
+        data = copy.deepcopy(data) if i % 50 == 0 else {**data, "inventory": dict(data["inventory"]),
+                                                        "quest_progress": dict(data["quest_progress"])}
+        data["hp"] = max(1, data["hp"] - 7)
+        data["gold"] += 5
+        if i % 3 == 0:
+            data["inventory"]["Зелье здоровья"] = data["inventory"].get("Зелье здоровья", 0) + 1
+        if i % 4 == 0:
+            data["quest_progress"]["q1"] = {"Гоблин": i}
+        yield data
+
+
+def benchmark(items, quests, count, sync):
+    """{способ: (байт на действие, секунд на действие)} и время загрузки с воспроизведением"""
+    from saves import SaveStore
+    start_state = benchmark_state(items, quests)
+    results = {}
+    directory = tempfile.mkdtemp(prefix="journal-bench-")
+    try:
+        for name in ("снимок", "журнал"):
+            store = SaveStore(os.path.join(directory, name))
+            store.save("hero", start_state)
+            store.journal("hero").sync = sync
+            written = 0
+            start = time.perf_counter()
+            for data in actions(start_state, count):
+                if name == "снимок":
+                    written += len(store.encode(data))
+                    store.save("hero", data)
+                else:
+                    written += store.journal("hero").record(data)
+            elapsed = time.perf_counter() - start
+            results[name] = (written / count, elapsed / count)
+        # Загрузка: снимок + count записей журнала
+        start = time.perf_counter()
+        loaded = SaveStore(os.path.join(directory, "журнал")).load("hero")
+        replay = time.perf_counter() - start
+        assert loaded == data, "воспроизведение журнала разошлось с состоянием"
+    finally:
+        shutil.rmtree(directory)
+    return results, replay
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Журнал изменений против полного снимка на каждое действие")
+    parser.add_argument("--items", type=int, default=2000, help="предметов в инвентаре")
+    parser.add_argument("--quests", type=int, default=300, help="заданий в журнале")
+    parser.add_argument("--actions", type=int, default=200)
+    parser.add_argument("--no-sync", action="store_true", help="без fsync после каждой записи")
+    args = parser.parse_args(argv)
+
+    results, replay = benchmark(args.items, args.quests, args.actions, not args.no_sync)
+    print(f"Инвентарь {args.items}, заданий {args.quests}, действий {args.actions}\n")
+    print(f"{'Способ':<8} {'Байт/действие':>14} {'мс/действие':>12}")
+    for name, (size, seconds) in results.items():
+        print(f"{name:<8} {size:>14.0f} {seconds * 1e3:>12.3f}")
+    print(f"\nЗагрузка снимка с воспроизведением {args.actions} записей: {replay * 1e3:.1f} мс")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Память на одного живого актера (персонаж, враг в бою) по данным tracemalloc"""
+import argparse
+import gc
+import tracemalloc
+
+from RPGame import CLASS_STATS, ENEMY_REGISTRY, QUESTS, Character, Combat, scale_enemy
+
+
+def bytes_per_actor(factory, count):
+    """Среднее число байт, которое занимает один актер из count одновременно живых"""
+    actors = [None] * count
+    factory(0)  # Прогрев: ленивые кэши и интернированные строки не должны попасть в замер
+    gc.collect()
+    tracemalloc.start()
+    for i in range(count):
+        actors[i] = factory(i)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / count
+
+
+def character_factory(char_class):
+    def factory(i):
+        return Character(f"Герой {i}", char_class)
+    return factory
+
+
+def questing_factory(char_class):
+    """Персонаж с активным заданием и прогрессом по нему"""
+    quest = QUESTS[0]
+
+    def factory(i):
+        character = Character(f"Герой {i}", char_class)
+        character.add_quest(quest["id"])
+        character.update_quest_progress(quest["objective"]["target"])
+        return character
+    return factory
+
+
+def enemy_factory(character, enemy_name, level):
+    """Враг в том виде, в каком его держит Combat во время боя"""
+    template = ENEMY_REGISTRY[enemy_name]
+
+    def factory(i):
+        return Combat(character, scale_enemy(template, level)).enemy
+    return factory
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Байт на персонажа и врага (tracemalloc)")
+    parser.add_argument("--count", type=int, default=20000, help="актеров в замере")
+    parser.add_argument("--level", type=int, default=10, help="уровень для масштабирования врагов")
+    args = parser.parse_args(argv)
+
+    char_class = next(iter(CLASS_STATS))
+    character = Character("Замер", char_class)
+    rows = [(f"Персонаж ({char_class})", character_factory(char_class)),
+            ("Персонаж с заданием", questing_factory(char_class))]
+    rows += [(f"Враг в бою: {enemy['name']}", enemy_factory(character, enemy["name"], args.level))
+             for enemy in ENEMY_REGISTRY]
+
+    print(f"{'Актер':<28} {'Байт':>8}")
+    for name, factory in rows:
+        print(f"{name:<28} {bytes_per_actor(factory, args.count):>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""Точный расчёт шансов боя: цепь Маркова по правилам Combat с мемоизацией"""
+import argparse
+import sys
+import threading
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+
+from RPGame import ATTACK_SPREAD, ENEMY_SPREAD, SPECIAL_COST, FLEE_CHANCE, BURN_POWER, BURN_DURATION, MAX_LEVEL
+from simulator import Matchup, POLICIES, WIN, LOSS, FLEE, cautious_policy, run_fights, _parse_levels
+
+STALL = "stall"  # Политика не может продвинуть бой (например, спецатака без ОМ)
+ACTIONS = ("attack", "special", "health_potion", "mana_potion", "flee")
+SOLVER_CACHE_SIZE = 32
+PREVIEW_MAX_STATES = 10000  # Бюджет точного расчёта для экрана боя
+PREVIEW_FIGHTS = 10000      # Боёв для приближённой оценки, если бюджет превышен
+
+
+class TooManyStates(Exception):
+    """Пространство состояний боя больше заданного бюджета"""
+
+
+def damage_distribution(damage, spread):
+    """Точное распределение round(damage * uniform(*spread)): {урон: вероятность}"""
+    low, high = damage * spread[0], damage * spread[1]
+    width = high - low
+    distribution = {}
+    for value in range(int(low + 0.5), int(high + 0.5) + 1):
+        overlap = min(high, value + 0.5) - max(low, value - 0.5)
+        if overlap > 0:
+            distribution[value] = overlap / width
+    return distribution
+
+
+def _mix(p, first, second):
+    """Смесь распределений: first с вероятностью p, second с 1 - p"""
+    mixed = defaultdict(float)
+    for value, prob in first.items():
+        mixed[value] += p * prob
+    for value, prob in second.items():
+        mixed[value] += (1 - p) * prob
+    return dict(mixed)
+
+
+@lru_cache(maxsize=256)
+def transition_tables(key):
+    """Таблицы переходов для Matchup.key: распределения урона всех действий"""
+    (max_hp, max_mp, attack, special, enemy_attack, heal, restore) = key
+    dodge, crit, damage, crit_damage = attack
+    special_crit, special_damage, special_crit_damage, spread, burn_chance = special
+    miss, enemy_damage = enemy_attack
+    return {
+        "dodge": dodge,
+        "attack": _mix(crit, damage_distribution(crit_damage, ATTACK_SPREAD),
+                       damage_distribution(damage, ATTACK_SPREAD)),
+        "special": _mix(special_crit, damage_distribution(special_crit_damage, spread),
+                        damage_distribution(special_damage, spread)),
+        "burn": burn_chance,
+        "miss": miss,
+        "enemy": damage_distribution(enemy_damage, ENEMY_SPREAD),
+    }
+
+
+def _tick(enemy_hp, burns):
+    """Горение после хода (Combat.process_effects)"""
+    if not burns:
+        return enemy_hp, burns
+    return enemy_hp - BURN_POWER * len(burns), tuple(d - 1 for d in burns if d > 1)
+
+
+class Solver:
+    """Точные вероятности исходов боя для одного Matchup и фиксированной политики"""
+
+    def __init__(self, matchup, policy=cautious_policy):
+        self.matchup = matchup
+        self.policy = policy
+        self.max_states = None  # Бюджет текущего solve: задается на один вызов
+        self.lock = threading.Lock()  # Один расчет на решатель; разные бои считаются параллельно
+        self.tables = transition_tables(matchup.key)
+        self.memo = {}       # состояние -> (победа, поражение, бегство, застой, ожидаемые ходы)
+        self.responses = {}  # состояние перед ходом врага -> то же после его ответа
+        self.estimates = {}  # состояние -> приближённые шансы, если точный расчёт превысил бюджет
+
+    def _hits(self, hp, mp, enemy_hp, burns, health_potions, mana_potions, prob, acc):
+        """Попадание врага с вероятностью prob (Combat.enemy_turn без промаха); добавляет в acc"""
+        enemy_hp, burns = _tick(enemy_hp, burns)
+        if enemy_hp <= 0:
+            acc[0] += prob
+            return
+        memo = self.memo
+        for damage, p in self.tables["enemy"].items():
+            q = prob * p
+            if hp - damage <= 0:
+                acc[1] += q
+            else:
+                state = (hp - damage, mp, enemy_hp, burns, health_potions, mana_potions)
+                w, l, f, s, t = memo.get(state) or self.value(state)
+                acc[0] += q * w
+                acc[1] += q * l
+                acc[2] += q * f
+                acc[3] += q * s
+                acc[4] += q * t
+
+    def _respond(self, state):
+        """Значение узла 'ход врага' после действия персонажа, приведшего в state"""
+        cached = self.responses.get(state)
+        if cached is not None:
+            return cached
+        miss = self.tables["miss"]
+        w, l, f, s, t = self.value(state)  # Промах - персонаж снова ходит из того же состояния
+        acc = [miss * w, miss * l, miss * f, miss * s, miss * t]
+        self._hits(*state, 1 - miss, acc)
+        self.responses[state] = acc
+        return acc
+
+    def _add_response(self, state, prob, acc):
+        w, l, f, s, t = self._respond(state)
+        acc[0] += prob * w
+        acc[1] += prob * l
+        acc[2] += prob * f
+        acc[3] += prob * s
+        acc[4] += prob * t
+
+    def _add_strikes(self, distribution, prob, enemy_hp, template, acc):
+        """Удар персонажа с распределением урона distribution; template - состояние без ОЗ врага"""
+        hp, mp, _, burns, health_potions, mana_potions = template
+        responses = self.responses
+        for damage, p in distribution.items():
+            q = prob * p
+            remaining = enemy_hp - damage
+            if remaining <= 0:
+                acc[0] += q  # Враг повержен ходом персонажа
+                continue
+            state = (hp, mp, remaining, burns, health_potions, mana_potions)
+            w, l, f, s, t = responses.get(state) or self._respond(state)
+            acc[0] += q * w
+            acc[1] += q * l
+            acc[2] += q * f
+            acc[3] += q * s
+            acc[4] += q * t
+
+    def value(self, state):
+        """(победа, поражение, бегство, застой, ожидаемые ходы) из состояния state"""
+        cached = self.memo.get(state)
+        if cached is not None:
+            return cached
+        if self.max_states and len(self.memo) >= self.max_states:
+            raise TooManyStates(len(self.memo))
+
+        hp, mp, enemy_hp, burns, health_potions, mana_potions = state
+        matchup = self.matchup
+        tables = self.tables
+        action = self.policy(matchup, state)
+        acc = [0.0, 0.0, 0.0, 0.0, 0.0]
+        stay = 0.0  # Вероятность остаться в том же состоянии (уклонение, промах)
+
+        if action == "attack":
+            stay = tables["dodge"]
+            # Горение после атаки не зависит от урона - считаем один раз
+            burned_hp, new_burns = _tick(enemy_hp, burns)
+            self._add_strikes(tables["attack"], 1 - stay, burned_hp,
+                              (hp, mp, None, new_burns, health_potions, mana_potions), acc)
+        elif action == "special" and mp >= SPECIAL_COST:
+            burn_chance = tables["burn"]
+            burned_hp, new_burns = _tick(enemy_hp, burns)
+            self._add_strikes(tables["special"], 1 - burn_chance, burned_hp,
+                              (hp, mp - SPECIAL_COST, None, new_burns, health_potions, mana_potions), acc)
+            if burn_chance:
+                # Новый эффект горения срабатывает сразу в этом же ходу
+                self._add_strikes(tables["special"], burn_chance, burned_hp - BURN_POWER,
+                                  (hp, mp - SPECIAL_COST, None, new_burns + (BURN_DURATION - 1,),
+                                   health_potions, mana_potions), acc)
+        elif action == "health_potion" and health_potions:
+            self._add_response((min(matchup.max_hp, hp + matchup.heal), mp, enemy_hp, burns,
+                                health_potions - 1, mana_potions), 1.0, acc)
+        elif action == "mana_potion" and mana_potions:
+            self._add_response((hp, min(matchup.max_mp, mp + matchup.restore), enemy_hp, burns,
+                                health_potions, mana_potions - 1), 1.0, acc)
+        elif action == "flee":
+            acc[2] += FLEE_CHANCE
+            stay = (1 - FLEE_CHANCE) * tables["miss"]
+            self._hits(hp, mp, enemy_hp, burns, health_potions, mana_potions,
+                       (1 - FLEE_CHANCE) * (1 - tables["miss"]), acc)
+        elif action in ACTIONS:
+            stay = 1.0  # Действие невозможно - ход не засчитывается
+        else:
+            raise ValueError(f"Неизвестное действие: {action}")
+
+        if stay >= 1.0 - 1e-12:
+            result = (0.0, 0.0, 0.0, 1.0, 0.0)
+        else:
+            # Переход в то же состояние повторяется до выхода из него
+            scale = 1.0 / (1.0 - stay)
+            result = (acc[0] * scale, acc[1] * scale, acc[2] * scale, acc[3] * scale, (1.0 + acc[4]) * scale)
+
+        self.memo[state] = result
+        return result
+
+    def solve(self, state=None, max_states=None):
+        """Шансы исходов из состояния state (по умолчанию - начало боя).
+
+        max_states - бюджет мемоизации только на этот вызов: TooManyStates, если
+        его не хватило (уже посчитанные состояния остаются в кэше).
+        """
+        state = state or self.matchup.initial_state()
+        self.max_states = max_states
+        try:
+            with deep_recursion():
+                win, loss, flee, stall, turns = self.value(state)
+        finally:
+            self.max_states = None
+        return {WIN: win, LOSS: loss, FLEE: flee, STALL: stall, "expected_turns": turns}
+
+
+_solvers = OrderedDict()
+_lock = threading.Lock()  # Кэш решателей общий для всех потоков (сессии сервера); расчет идет под Solver.lock
+_recursion_lock = threading.Lock()
+_recursion_users = 0  # Потоков внутри deep_recursion
+_recursion_limit = None  # Предел рекурсии до первого из них
+
+
+@contextmanager
+def deep_recursion(limit=20000):
+    """Поднять предел рекурсии (он общий для процесса) и вернуть прежний, когда выйдет последний поток"""
+    global _recursion_users, _recursion_limit
+    with _recursion_lock:
+        if not _recursion_users:
+            _recursion_limit = sys.getrecursionlimit()
+            sys.setrecursionlimit(max(_recursion_limit, limit))
+        _recursion_users += 1
+    try:
+        yield
+    finally:
+        with _recursion_lock:
+            _recursion_users -= 1
+            if not _recursion_users:
+                sys.setrecursionlimit(_recursion_limit)
+
+
+def get_solver(matchup, policy=cautious_policy):
+    """Solver из кэша: повторные расчёты для того же боя используют готовую мемоизацию"""
+    cache_key = (matchup.key, policy)
+    with _lock:
+        solver = _solvers.get(cache_key)
+        if solver is None:
+            solver = Solver(matchup, policy)
+            _solvers[cache_key] = solver
+            if len(_solvers) > SOLVER_CACHE_SIZE:
+                _solvers.popitem(last=False)
+        else:
+            _solvers.move_to_end(cache_key)
+    return solver
+
+
+def encounter_odds(character, enemy, policy=cautious_policy):
+    """Точные шансы боя персонажа (в текущем состоянии) с уже масштабированным врагом"""
+    matchup = Matchup(character, enemy)
+    solver = get_solver(matchup, policy)
+    with solver.lock:
+        return solver.solve(matchup.initial_state())
+
+
+def preview_odds(character, enemy, policy=cautious_policy, max_states=PREVIEW_MAX_STATES):
+    """Шансы для экрана боя: (шансы, точные ли они).
+
+    Если точный расчёт не укладывается в бюджет состояний, шансы оцениваются
+    симуляцией PREVIEW_FIGHTS боёв.
+    """
+    matchup = Matchup(character, enemy)
+    state = matchup.initial_state()
+    solver = get_solver(matchup, policy)
+    with solver.lock:
+        try:
+            return solver.solve(state, max_states), True
+        except TooManyStates:
+            estimate = solver.estimates.get(state)
+    if estimate is None:
+        # Симуляция - без блокировки: в худшем случае две сессии оценят один бой дважды
+        summary = run_fights(matchup, PREVIEW_FIGHTS, policy).summary()
+        estimate = {WIN: summary["win_rate"], LOSS: summary["loss_rate"], FLEE: summary["flee_rate"],
+                    STALL: summary["timeout_rate"], "expected_turns": summary["fight_turns_mean"]}
+        with solver.lock:
+            solver.estimates[state] = estimate
+    return estimate, False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Точные шансы исхода боя")
+    parser.add_argument("char_class")
+    parser.add_argument("enemy")
+    parser.add_argument("--levels", default=f"1-{MAX_LEVEL}")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="cautious")
+    parser.add_argument("--no-equip", action="store_true")
+    args = parser.parse_args(argv)
+
+    for level in _parse_levels(args.levels):
+        matchup = Matchup.for_level(args.char_class, level, args.enemy, not args.no_equip)
+        odds = get_solver(matchup, POLICIES[args.policy]).solve()
+        print(f"{args.char_class:<8} {level:>3} {args.enemy:<11} победа {odds[WIN]:>9.4%} "
+              f"поражение {odds[LOSS]:>9.4%} бегство {odds[FLEE]:>7.4%} ходов {odds['expected_turns']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
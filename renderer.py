@@ -0,0 +1,1067 @@
+#!/usr/bin/env python3
+"""Вывод игры: логика сообщает о событиях, а renderer решает, как их показать"""
+import re
+import shutil
+import sys
+import os
+import time
+from functools import lru_cache
+
+try:
+    import msvcrt  # Windows: опрос клавиатуры без ожидания Enter
+except ImportError:
+    msvcrt = None
+    import select
+    import termios
+    import tty
+
+from banners import BANNERS
+
+# termcolor, tqdm, colorama и pyfiglet загружаются при первом использовании,
+# чтобы импорт RPGame из скриптов не платил за них
+TITLE_BANNER = ("RPG ИГРА", "slant")
+LOADING_BAR = "{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}]"
+LOADING_INTERVAL = 0.1  # Секунд между перерисовками полоски загрузки (mininterval tqdm)
+KEY_POLL_INTERVAL = 0.02  # Секунд между проверками клавиатуры в Windows
+
+# ANSI-последовательности управления экраном
+CLEAR_SCREEN = "\x1b[H\x1b[2J"
+CLEAR_LINE_END = "\x1b[K"
+CLEAR_BELOW = "\x1b[J"
+ANSI_CODE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+RESET_CODE = "\x1b[0m"
+
+
+def __getattr__(name):
+    # TITLE_ART рисуется только по запросу
+    if name == "TITLE_ART":
+        return BANNERS.render(*TITLE_BANNER)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def colored(text, color=None, on_color=None, attrs=None):
+    """termcolor.colored; при первом вызове подменяет себя настоящей функцией"""
+    global colored
+    from termcolor import colored
+    return colored(text, color, on_color, attrs)
+
+
+@lru_cache(maxsize=None)
+def init_console():
+    """Включить цвета colorama (нужно консоли Windows) - один раз на процесс"""
+    from colorama import init
+    init(autoreset=True)
+
+
+# Простые события: вид -> (шаблон, цвет[, атрибуты])
+MESSAGES = {
+    "invalid_choice": ("Неверный выбор.", "red"),
+    "invalid_choice_retry": ("Неверный выбор. Попробуйте снова.", "red"),
+    "invalid_menu_choice": ("\nНеверный выбор. Пожалуйста, попробуйте снова.", "red"),
+    "invalid_number": ("Пожалуйста, введите корректное число.", "red"),
+    "invalid_item_number": ("Неверный номер предмета.", "red"),
+    "goodbye": ("\nСпасибо за игру!", "yellow"),
+
+    # Персонаж
+    "empty_name": ("Имя не может быть пустым.", "red"),
+    "character_created": ("\nПерсонаж успешно создан!", "green"),
+    "item_missing": ("У вас нет {item} в инвентаре.", "red"),
+    "item_not_equippable": ("Вы не можете экипировать {item}. Это {item_type}.", "red"),
+    "item_not_usable": ("Вы не можете использовать {item}. Это {item_type}.", "red"),
+    "item_unequipped": ("Снято: {item}.", "yellow"),
+    "item_equipped": ("Экипировано: {item}!", "green"),
+    "hp_restored": ("Восстановлено {amount} ОЗ!", "green"),
+    "mp_restored": ("Восстановлено {amount} ОМ!", "blue"),
+    "quest_duplicate": ("У вас уже есть это задание или вы его уже выполнили.", "yellow"),
+    "quest_progress": ("Прогресс задания: {quest} - {current}/{total} {target} побеждено", "cyan"),
+    "gold_received": ("Получено {amount} золота!", "yellow"),
+    "item_received": ("Получен предмет: {item}!", "green"),
+
+    # Бой
+    "dodge": ("{enemy} уклонился от атаки!", "yellow"),
+    "critical": ("КРИТИЧЕСКИЙ УДАР!", "red", ["bold"]),
+    "hit": ("Вы нанесли {enemy} {damage} урона!", "green"),
+    "no_mana": ("Недостаточно ОМ для специальной атаки!", "red"),
+    "burning": ("{enemy} загорелся! (Получает {power} урона каждый ход в течение {duration} ходов)", "red"),
+    "special_hit": ("Вы использовали специальную атаку против {enemy} и нанесли {damage} урона!", "blue"),
+    "enemy_miss": ("{enemy} промахнулся!", "green"),
+    "enemy_hit": ("{enemy} атаковал вас и нанес {damage} урона!", "red"),
+    "burn_damage": ("{enemy} получает {damage} урона от горения!", "red"),
+    "poison_damage": ("Вы получаете {damage} урона от яда!", "red"),
+    "effect_ended": ("Эффект {effect} закончился!", "yellow"),
+    "xp_reward": ("Вы получили {amount} опыта!", "yellow"),
+    "gold_found": ("Вы нашли {amount} золота!", "yellow"),
+    "item_dropped": ("{enemy} выронил {item}!", "green"),
+    "auto_action": ("\nАвто-бой: {label}", "magenta"),
+    "auto_battle_on": ("Авто-бой включен до конца боя.", "magenta"),
+    "no_potions": ("У вас нет зелий!", "red"),
+    "fled": ("Вы успешно сбежали!", "green"),
+    "flee_failed": ("Вам не удалось сбежать!", "red"),
+    "in_combat": ("Сначала закончите бой.", "red"),
+    "no_combat": ("Сейчас вы ни с кем не сражаетесь.", "red"),
+    "revived": ("\nБоги улыбнулись вам и сохранили вашу жизнь.\nВы просыпаетесь с 1 ОЗ обратно в Деревне.", "green"),
+
+    # Магазин
+    "no_shop": ("В этой локации нет магазина. Необходимо быть в Деревне.", "red"),
+    "bought": ("Вы купили {item} за {price} золота.", "green"),
+    "not_enough_gold": ("Недостаточно золота для покупки {item}.", "red"),
+    "not_for_sale": ("{item} не продается в этом магазине.", "red"),
+    "nothing_to_sell": ("У вас нет предметов для продажи.", "red"),
+    "cannot_sell_equipped": ("Нельзя продать экипированный предмет. Сначала снимите его.", "red"),
+    "sold": ("Вы продали {item} за {price} золота.", "green"),
+    "inventory_empty": ("\nВаш инвентарь пуст.", "red"),
+
+    # Путешествие и исследование
+    "travel_ambush": ("\nВо время путешествия вы столкнулись с врагом!", "red"),
+    "invalid_direction": ("Неверное направление.", "red"),
+    "encounter": ("\nВы столкнулись с врагом!", "red"),
+    "location_encounter": ("\nВы столкнулись с врагом в локации {location}!", "red"),
+    "found_item": ("\nВы нашли {item}!", "green"),
+    "found_gold": ("\nВы нашли {amount} золота!", "yellow"),
+    "found_nothing": ("\nВы исследовали местность, но не нашли ничего интересного.", "white"),
+
+    # Задания
+    "no_active_quests": ("\nУ вас нет активных заданий.", "yellow"),
+    "no_new_quests": ("\nНет новых заданий в этой локации.", "yellow"),
+    "visit_village": ("\nПосетите Деревню, чтобы принять новые задания.", "yellow"),
+    "invalid_quest_number": ("Неверный номер задания.", "red"),
+    "unknown_quest": ("Задания {quest} не существует.", "red"),
+
+    # Отдых
+    "rest_village_only": ("Вы можете отдыхать только в Деревне.", "red"),
+    "rest_no_gold": ("\nУ вас недостаточно золота для отдыха.", "red"),
+    "rested": ("\nВы хорошо отдохнули и чувствуете себя полностью восстановленным!\nОЗ и ОМ полностью восстановлены!", "green"),
+
+    # Сохранение
+    "nothing_to_save": ("Нет персонажа для сохранения.", "red"),
+    "saved": ("\nИгра успешно сохранена! Слот: {slot}", "green"),
+    "save_failed": ("\nОшибка при сохранении игры: {error}", "red"),
+    "autosave_failed": ("\nАвтосохранение не удалось: {error}", "red"),
+    "no_save_file": ("\nСохранений не найдено.", "red"),
+    "loaded": ("\nИгра успешно загружена!", "green"),
+    "load_failed": ("\nОшибка при загрузке игры: {error}", "red"),
+    "interrupted": ("\n\nИгра прервана. Спасибо за игру!", "yellow"),
+    "crashed": ("\n\nПроизошла ошибка: {error}", "red"),
+    "session_new": ("Код вашей сессии: {code}. Введите его при следующем входе, чтобы вернуться к персонажу.", "green"),
+    "session_busy": ("Сессия {code} уже открыта в другом подключении.", "red"),
+}
+
+# Запросы ввода: вид -> (шаблон, цвет или None)
+PROMPTS = {
+    "continue": ("\nНажмите Enter для продолжения...", None),
+    "continue_inline": ("Нажмите Enter для продолжения...", None),
+    "back": ("\nНажмите Enter для возврата...", None),
+    "start_adventure": ("\nНажмите Enter, чтобы начать приключение...", None),
+    "main_menu": ("\nВведите ваш выбор (1-3): ", None),
+    "character_name": ("Введите имя персонажа: ", "cyan"),
+    "character_class": ("\nВведите ваш выбор (1-{count}): ", "cyan"),
+    "choice": ("\nВаш выбор: ", None),
+    "item_number": ("\nВведите номер предмета (1-{count}): ", None),
+    "buy_number": ("\nВведите номер предмета для покупки (1-{count}): ", None),
+    "sell_number": ("\nВведите номер предмета для продажи (1-{count}) или 0 для отмены: ", None),
+    "confirm_sell": ("Продать {item} за {price} золота? (д/н): ", None),
+    "combat_action": ("\nВыберите действие: ", None),
+    "potion": ("\nВыберите зелье (0 для отмены): ", None),
+    "quest_choice": ("\nВведите ваш выбор (или любую другую клавишу для возврата): ", None),
+    "quest_number": ("Введите номер задания (1-{count}): ", None),
+    "slot_number": ("\nВыберите сохранение (1-{count}) или 0 для отмены: ", "cyan"),
+    "confirm_rest": ("\nОтдохнуть за {cost} золота? (д/н): ", "cyan"),
+    "game_menu": ("\nВведите ваш выбор (1-9): ", None),
+    "confirm_exit": ("Вы уверены, что хотите выйти? Несохраненный прогресс будет потерян. (д/н): ", "yellow"),
+    "session_code": ("Код сессии (Enter - новая сессия): ", "cyan"),
+    "confirm_exit_autosave": ("Выйти в главное меню? Прогресс сохранится автоматически. (д/н): ", "yellow"),
+}
+
+INVENTORY_GROUPS = {
+    "consumable": "Расходные предметы",
+    "weapon": "Оружие",
+    "armor": "Броня",
+    "boots": "Обувь",
+    "accessory": "Аксессуары"
+}
+SHOP_GROUPS = {**INVENTORY_GROUPS, "consumable": "Зелья и расходники"}
+SLOT_NAMES = {"weapon": "Оружие", "armor": "Броня", "boots": "Обувь", "accessory": "Аксессуар"}
+SPECIAL_MESSAGES = {
+    "Воин": "Вы используете МОЩНЫЙ УДАР!",      # Мощный удар (высокий урон)
+    "Маг": "Вы создаете ОГНЕННЫЙ ШАР!",         # Огненный шар (магический урон, шанс горения)
+    "Лучник": "Вы делаете МЕТКИЙ ВЫСТРЕЛ!"      # Меткий выстрел (шанс критического удара)
+}
+
+
+def bar(percent, width=20):
+    """Полоска вида ■■■□□ для доли percent"""
+    filled = int(percent * width)
+    return "■" * filled + "□" * (width - filled)
+
+def level_color(percent, low="red", middle="yellow", high="green", middle_from=0.7):
+    """Цвет полоски: low ниже 30%, middle ниже middle_from, иначе high"""
+    if percent < 0.3:
+        return low
+    if percent < middle_from:
+        return middle
+    return high
+
+
+class Renderer:
+    """Интерфейс вывода: emit - единственный выход логики на экран, ask - единственный вход.
+
+    Событие - вид (строка) и именованные данные; форматирование текста целиком
+    на стороне backend, поэтому NullRenderer не тратит на вывод ни одной операции.
+    """
+
+    def emit(self, kind, **data):
+        raise NotImplementedError
+
+    def ask(self, prompt, **data):
+        raise NotImplementedError
+
+    def pause(self, prompt="continue"):
+        """Дождаться, пока игрок прочитает экран"""
+        self.ask(prompt)
+
+    def flush(self):
+        """Показать все, что еще не выведено"""
+
+    def close(self):
+        """Завершить вывод перед выходом из игры"""
+        self.flush()
+
+
+class NullRenderer(Renderer):
+    """Ничего не выводит; ask отдаёт заготовленные ответы.
+
+    answers - последовательность ответов или функция (prompt, **data) -> ответ.
+    Без answers на любой запрос отвечает пустой строкой. Если ответы
+    закончились (или функция вернула None), ask бросает EOFError - как input()
+    на закрытом stdin.
+    """
+
+    def __init__(self, answers=None):
+        self.answers = answers if answers is None or callable(answers) else iter(answers)
+
+    def emit(self, kind, **data):
+        pass
+
+    def ask(self, prompt, **data):
+        if self.answers is None:
+            return ""
+        if callable(self.answers):
+            answer = self.answers(prompt, **data)
+        else:
+            answer = next(self.answers, None)
+        if answer is None:
+            raise EOFError(prompt)
+        return answer
+
+
+class RecordingRenderer(NullRenderer):
+    """NullRenderer, который сохраняет события в events как (вид, данные) без форматирования"""
+
+    def __init__(self, answers=None):
+        super().__init__(answers)
+        self.events = []
+
+    def emit(self, kind, **data):
+        self.events.append((kind, data))
+
+    def ask(self, prompt, **data):
+        self.events.append(("ask", {"prompt": prompt, **data}))
+        return super().ask(prompt, **data)
+
+    def kinds(self):
+        """Виды записанных событий по порядку"""
+        return [kind for kind, _ in self.events]
+
+
+NULL_RENDERER = NullRenderer()  # Вывод по умолчанию для персонажей, созданных вне Game
+
+
+class FastForward:
+    """Пропуск анимации любой клавишей: паузы ждут нажатия, не блокируя игру.
+
+    На время анимации терминал переводится в посимвольный режим без эха,
+    перед вводом строки (release) возвращается обычный режим, а нажатые
+    во время анимации клавиши отбрасываются.
+    """
+
+    def __init__(self, stdin=None):
+        self.stdin = stdin or sys.stdin
+        self.enabled = self.stdin.isatty()
+        self.pressed = False
+        self.saved = None  # Настройки терминала до посимвольного режима
+
+    def wait(self, seconds):
+        """Подождать seconds; True, если клавиша нажата (сейчас или раньше в этой анимации)"""
+        if self.pressed:
+            return True
+        if not self.enabled:
+            time.sleep(seconds)
+            return False
+        if msvcrt:
+            deadline = time.monotonic() + seconds
+            while not msvcrt.kbhit():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                time.sleep(min(remaining, KEY_POLL_INTERVAL))
+            while msvcrt.kbhit():
+                msvcrt.getwch()
+        else:
+            fd = self.stdin.fileno()
+            if self.saved is None:
+                self.saved = termios.tcgetattr(fd)
+                tty.setcbreak(fd)
+            if not select.select([fd], [], [], seconds)[0]:
+                return False
+            os.read(fd, 1024)
+        self.pressed = True
+        return True
+
+    def release(self):
+        """Анимация закончилась: вернуть терминал к построчному вводу"""
+        self.pressed = False
+        if self.saved is not None:
+            termios.tcsetattr(self.stdin.fileno(), termios.TCSAFLUSH, self.saved)
+            self.saved = None
+
+
+class TerminalRenderer(Renderer):
+    """Привычный вид игры в терминале: цвета, figlet-баннеры и анимации.
+
+    Вывод идет потоком прямо в stream; весь текст проходит через out, паузы
+    анимаций - через sleep, чтобы наследники могли перехватить и то, и другое.
+    time_scale растягивает или сжимает все паузы (0 - без анимаций), а
+    нажатие клавиши во время анимации проматывает ее до следующего вопроса.
+    """
+
+    def __init__(self, stream=None, time_scale=1.0, keys=None):
+        init_console()
+        self.stream = stream or sys.stdout
+        self.time_scale = time_scale
+        self.keys = keys or FastForward()
+
+    def out(self, text="", end="\n"):
+        """Вывести текст (аналог print с одним аргументом)"""
+        self.stream.write(text + end)
+
+    def bell(self, signal):
+        """Звуковой сигнал: не занимает места на экране"""
+        self.stream.write(signal)
+        self.stream.flush()
+
+    def sleep(self, seconds):
+        """Пауза анимации: показать накопленное и подождать"""
+        seconds *= self.time_scale
+        if seconds <= 0 or self.keys.pressed:
+            return  # Кадры без пауз покажет ближайший flush
+        self.flush()
+        self.keys.wait(seconds)
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.keys.release()
+        self.flush()
+
+    def animate_text(self, text, delay=0.03, color='white'):
+        for char in text:
+            self.out(colored(char, color), end='')
+            self.sleep(delay)
+        self.out()
+
+    def loading_screen(self, description="Загрузка", duration=3):
+        from tqdm import tqdm
+        for _ in tqdm(range(100), desc=colored(description, 'yellow'), file=self.stream,
+                     bar_format=LOADING_BAR):
+            self.sleep(duration/100)
+        self.out()
+
+    def frame_text(self, text, width=60, color='cyan'):
+        border = colored('┌' + '─' * (width-2) + '┐', color)
+        footer = colored('└' + '─' * (width-2) + '┘', color)
+
+        self.out(border)
+        for line in text.split('\n'):
+            space = width - 2 - len(line)
+            self.out(colored('│', color) + line + ' ' * space + colored('│', color))
+        self.out(footer)
+
+    def sound_effect(self, effect_type):
+        effects = {
+            'hit': '\a',
+            'level_up': ''.join(['\a' for _ in range(3)]),
+            'error': '\a\a',
+            'item': '\a',
+            'death': ''.join(['\a' for _ in range(5)])
+        }
+        if effect_type in effects:
+            self.bell(effects[effect_type])
+
+    def animate_battle_effect(self, attacker, defender, damage, effect_type='hit'):
+        animations = {
+            'hit': ['   (>o<) ', '  (×_×)  ', ' (>д<)   '],
+            'magic': ['  ⋆*･ﾟ  ', ' ★⋆｡˚   ', '☆･⋆。   '],
+            'critical': [' ✯✯✯⚔️ ', ' ⚔️⚔️⚔️  ', ' ⚔️✯✯✯  ']
+        }
+
+        frames = animations.get(effect_type, animations['hit'])
+        for frame in frames:
+            self.show_clear()
+            self.out(f"\n{colored(attacker, 'green')} атакует {colored(defender, 'red')}!")
+            self.out(colored(frame, 'yellow'))
+            self.out(f"Урон: {colored(str(damage), 'red')}")
+            self.sleep(0.2)
+        self.sleep(0.3)
+
+    def emit(self, kind, **data):
+        handler = getattr(self, "show_" + kind, None)
+        if handler:
+            handler(**data)
+            return
+        template, color, *attrs = MESSAGES[kind]
+        self.out(colored(template.format(**data) if data else template, color, attrs=attrs[0] if attrs else None))
+
+    def prompt_text(self, prompt, data):
+        template, color = PROMPTS[prompt]
+        text = template.format(**data) if data else template
+        return colored(text, color) if color else text
+
+    def ask(self, prompt, **data):
+        # Сначала построчный режим, потом вопрос: ответ, набранный сразу, не потеряется
+        self.keys.release()
+        self.flush()
+        return input(self.prompt_text(prompt, data))
+
+    # Общие эффекты
+    def show_clear(self):
+        self.out(CLEAR_SCREEN, end="")
+
+    def show_sound(self, effect):
+        self.sound_effect(effect)
+
+    def show_battle_effect(self, attacker, defender, damage, effect):
+        self.animate_battle_effect(attacker, defender, damage, effect)
+
+    def banner(self, text, font, color):
+        self.out(colored(BANNERS.render(text, font), color))
+
+    def screen(self, text, font, color):
+        """Очистить экран и вывести figlet-заголовок"""
+        self.show_clear()
+        self.banner(text, font, color)
+
+    # Вступление и меню
+    def show_intro(self):
+        self.show_clear()
+        self.banner(*TITLE_BANNER, 'yellow')
+
+        # Анимированный текст приветствия
+        self.animate_text("Было сделано Аутистом", color='green')
+        self.animate_text("Под бутылкой хенеси с принглс", color='cyan')
+
+        self.out("\n" + colored("Загрузка игры...", 'yellow'))
+        self.loading_screen("Подготовка RPG окружения", 2)
+
+    def show_farewell(self):
+        self.banner("ДО СВИДАНИЯ!", "slant", "green")
+        self.out(colored("Благодарим за игру в нашу текстовую RPG!", 'cyan'))
+        self.out(colored("Надеемся, вам понравилось приключение в мире фэнтези!", 'yellow'))
+
+    def show_title(self):
+        self.show_clear()
+        self.banner(*TITLE_BANNER, 'yellow')
+        self.out(colored('='*60, 'cyan'))
+        self.out(colored('Добро пожаловать в text rpg, GitHub: @Nekicj '.center(60), 'green'))
+        self.out(colored('='*60, 'cyan'))
+
+    def show_main_menu(self):
+        menu_items = [
+            ("Новая игра", "green"),
+            ("Загрузить игру", "blue"),
+            ("Выход", "red")
+        ]
+
+        for i, (item, color) in enumerate(menu_items, 1):
+            self.out(colored(f"[{i}] ", 'cyan') + colored(item, color))
+
+    def show_create_character(self):
+        self.screen("СОЗДАНИЕ ГЕРОЯ", "slant", "green")
+        self.out(colored('='*60, 'cyan'))
+
+    def show_class_menu(self, classes):
+        self.out(colored("\nВыберите класс:", "cyan"))
+
+        for i, (class_name, char_class) in enumerate(classes, 1):
+            self.out(colored(f"[{i}] ", "cyan") + colored(class_name, char_class["color"])
+                     + f" - {char_class['description']}")
+
+    def show_creating_character(self):
+        self.out(colored("\nСоздание персонажа...", "yellow"))
+        self.loading_screen("Создание персонажа", 2)
+
+    def show_character_info(self, character, items):
+        char = character
+
+        self.screen(f"{char.name}", "small", "cyan")
+
+        self.frame_text(f"Класс: {char.char_class} | Уровень: {char.level} | Локация: {char.location}\n"
+                  f"Золото: {char.gold} | Опыт: {char.xp}/{char.xp_next}", width=60, color='yellow')
+
+        # Характеристики
+        self.out(colored("\n◉ ХАРАКТЕРИСТИКИ:", "cyan"))
+        self.out(colored(f"ОЗ: {char.hp}/{char.max_hp}", "green"))
+        self.out(colored(f"ОМ: {char.mp}/{char.max_mp}", "blue"))
+        self.out(colored(f"Сила: {char.strength} ({char.base_strength} + {char.strength - char.base_strength})", "red"))
+        self.out(colored(f"Защита: {char.defense} ({char.base_defense} + {char.defense - char.base_defense})", "magenta"))
+        self.out(colored(f"Ловкость: {char.agility} ({char.base_agility} + {char.agility - char.base_agility})", "yellow"))
+        self.out(colored(f"Крит. шанс: {char.critical}% ({char.base_critical}% + {char.critical - char.base_critical}%)", "red"))
+        self.out(colored(f"Удача: {char.luck} ({char.base_luck} + {char.luck - char.base_luck})", "green"))
+
+        # Экипировка
+        self.out(colored("\n◉ ЭКИПИРОВКА:", "cyan"))
+        for slot, item in char.equipment.items():
+            if item:
+                item_desc = items[item]["description"]
+                self.out(f"{colored(SLOT_NAMES[slot], 'white')}: {colored(item, 'green')} {colored(f'({item_desc})', 'yellow')}")
+            else:
+                self.out(f"{colored(SLOT_NAMES[slot], 'white')}: {colored('Пусто', 'red')}")
+
+        # Активные задания
+        if char.active_quests:
+            self.out(colored("\n◉ АКТИВНЫЕ ЗАДАНИЯ:", "cyan"))
+            for quest_id, quest in char.active_quests.items():
+                objective = quest["objective"]
+                current = char.quest_progress.get(quest_id, {}).get(objective["target"], 0)
+                total = objective["count"]
+                self.out(f"{colored(quest['name'], 'white')}: {colored(f'{current}/{total} {objective["target"]} побеждено', 'yellow')}")
+
+    def show_game_menu(self, character, location):
+        char = character
+        self.screen(f"{char.name}", "small", "cyan")
+
+        # Текущая локация
+        self.out(colored(location["ascii_art"], "cyan"))
+
+        # Информация о персонаже
+        hp_percent = char.hp / char.max_hp
+        hp_color = level_color(hp_percent)
+
+        self.out(colored(f"Локация: {char.location}", "green"))
+        self.out(f"{colored('Уровень:', 'yellow')} {char.level} | {colored('Класс:', 'yellow')} {char.char_class} | {colored('Золото:', 'yellow')} {char.gold}")
+        self.out(f"{colored('ОЗ:', hp_color)} {char.hp}/{char.max_hp} {colored(bar(hp_percent), hp_color)}")
+        self.out(f"{colored('Опыт:', 'blue')} {char.xp}/{char.xp_next}")
+
+        # Кнопки активных заданий
+        if char.active_quests:
+            self.out(colored("\n▶ АКТИВНЫЕ ЗАДАНИЯ:", "yellow"))
+            for quest_id, quest in list(char.active_quests.items())[:2]:  # Показать только 2 активных задания
+                objective = quest["objective"]
+                current = char.quest_progress.get(quest_id, {}).get(objective["target"], 0)
+                total = objective["count"]
+                progress = f"{current}/{total}"
+                self.out(colored(f"• {quest['name']}: {progress}", "white"))
+
+        # Главное меню
+        self.out(colored("\n▶ ДЕЙСТВИЯ:", "cyan"))
+        actions = [
+            (1, "Исследовать", "white", "Поиск сокровищ и врагов"),
+            (2, "Путешествовать", "white", "Перемещение между локациями"),
+            (3, "Магазин", "white", "Купить/продать предметы"),
+            (4, "Инвентарь", "white", "Управление предметами"),
+            (5, "Персонаж", "white", "Просмотр характеристик"),
+            (6, "Задания", "white", "Управление заданиями"),
+            (7, "Отдых", "white", "Восстановить ОЗ и ОМ (только в Деревне)"),
+            (8, "Сохранить", "green", "Сохранить прогресс"),
+            (9, "Выход", "red", "Выход в главное меню")
+        ]
+
+        half = len(actions) // 2 + len(actions) % 2
+        for i in range(half):
+            line = colored(f"[{actions[i][0]}] ", "cyan") + colored(actions[i][1], actions[i][2]) + f" - {actions[i][3]}"
+            if i + half < len(actions):
+                padding = 35 - len(actions[i][1]) - len(actions[i][3])
+                padding = max(2, padding)
+                line += " " * padding
+                line += colored(f"[{actions[i+half][0]}] ", "cyan") + colored(actions[i+half][1], actions[i+half][2]) + f" - {actions[i+half][3]}"
+            self.out(line)
+
+    # Персонаж
+    def show_xp_gained(self, amount):
+        self.animate_text(f"Вы получили {amount} опыта!", color='yellow')
+
+    def show_level_up(self, character):
+        self.sound_effect('level_up')
+        self.screen("УРОВЕНЬ ПОВЫШЕН!", "slant", "yellow")
+
+        self.frame_text(f"Вы достигли {character.level} уровня!\n"
+                  f"ОЗ: {character.max_hp}\n"
+                  f"ОМ: {character.max_mp}\n"
+                  f"Сила: {character.base_strength}\n"
+                  f"Защита: {character.base_defense}\n"
+                  f"Ловкость: {character.base_agility}\n"
+                  f"Крит. шанс: {character.base_critical}%\n"
+                  f"Удача: {character.base_luck}", width=50, color='cyan')
+
+    def show_equipping(self):
+        self.loading_screen("Экипировка предмета", 1)
+
+    def show_quest_added(self, quest):
+        self.screen("НОВЫЙ КВЕСТ", "small", "cyan")
+
+        self.out(colored(f"Новое задание принято: {quest['name']}", "cyan"))
+        self.animate_text(quest['description'], color='white')
+
+        objective = quest["objective"]
+        self.out(colored(f"Цель: Победить {objective['count']} {objective['target']}.", "yellow"))
+
+        self.out("\nНаграды:")
+        if "xp" in quest["rewards"]:
+            self.out(colored(f"  Опыт: {quest['rewards']['xp']}", "yellow"))
+        if "gold" in quest["rewards"]:
+            self.out(colored(f"  Золото: {quest['rewards']['gold']}", "yellow"))
+        if "items" in quest["rewards"]:
+            for item in quest["rewards"]["items"]:
+                self.out(colored(f"  Предмет: {item}", "green"))
+
+    def show_quest_completed(self, quest):
+        rewards = quest["rewards"]
+        self.screen("ЗАДАНИЕ ВЫПОЛНЕНО!", "small", "green")
+
+        self.frame_text(f"{quest['name']}\n\n"
+                  f"Награды:\n"
+                  f"Опыт: {rewards.get('xp', 0)}\n"
+                  f"Золото: {rewards.get('gold', 0)}\n"
+                  f"Предметы: {', '.join(rewards.get('items', []))}", width=60, color='cyan')
+
+    # Бой
+    def show_special_attack(self, char_class):
+        if char_class in SPECIAL_MESSAGES:
+            self.out(colored(SPECIAL_MESSAGES[char_class], "yellow"))
+
+    def show_enemy_attack(self, enemy, message):
+        self.out(colored(f"\n{enemy} {message}!", "yellow"))
+        self.sleep(0.5)
+
+    def show_victory(self, enemy):
+        self.banner("ПОБЕДА!", "banner3-D", "green")
+        self.animate_text(f"Вы победили {enemy}!", color='green')
+
+    def show_defeat(self):
+        self.screen("ПОРАЖЕНИЕ", "banner3-D", "red")
+        self.sound_effect('death')
+
+    def show_combat_start(self, character, enemy):
+        self.screen("БОЙ!", "banner3-D", "red")
+
+        self.out(colored(f"Вы столкнулись с {enemy['name']}!", "red"))
+        self.out(colored(f"Описание: {enemy['desc']}", "yellow"))
+
+        # Предварительная оценка шансов (точный расчёт по правилам боя)
+        from odds import preview_odds
+        odds, exact = preview_odds(character, enemy)
+        mark = "" if exact else "≈"
+        self.out(colored(f"Шансы: победа {mark}{odds['win']:.1%} | бегство {mark}{odds['flee']:.1%} | "
+                      f"поражение {mark}{odds['loss']:.1%} | ~{odds['expected_turns']:.1f} ходов", "cyan"))
+
+        self.loading_screen("Подготовка к бою", 1)
+
+    def show_combat_status(self, character, enemy, enemy_max_hp):
+        self.show_clear()
+
+        # Отобразить UI боя
+        self.out(colored("╔" + "═" * 58 + "╗", "red"))
+        self.out(colored("║", "red") + colored(" БОЙ! ".center(58), "yellow") + colored("║", "red"))
+        self.out(colored("╚" + "═" * 58 + "╝", "red"))
+
+        # Характеристики персонажа
+        hp_percent = character.hp / character.max_hp
+        mp_percent = character.mp / character.max_mp
+        hp_color = level_color(hp_percent)
+        mp_color = level_color(mp_percent, middle="magenta", high="blue", middle_from=0.5)
+
+        self.out(f"\n{colored('Вы', 'green')}: {character.name} | {colored('Уровень', 'cyan')} {character.level} {character.char_class}")
+        self.out(f"{colored('ОЗ', hp_color)}: {character.hp}/{character.max_hp} {colored(bar(hp_percent), hp_color)}")
+        self.out(f"{colored('ОМ', mp_color)}: {character.mp}/{character.max_mp} {colored(bar(mp_percent), mp_color)}")
+
+        # Характеристики врага
+        enemy_hp_percent = enemy["hp"] / enemy_max_hp
+        enemy_hp_color = level_color(enemy_hp_percent)
+
+        self.out(f"\n{colored(enemy['name'], 'red')} | {colored('ОЗ', enemy_hp_color)}: {enemy['hp']} {colored(bar(enemy_hp_percent), enemy_hp_color)}")
+
+        # Варианты боя
+        self.out(colored("\n▶ Действия:", "cyan"))
+        self.out(colored("[1] ", "cyan") + colored("Атака", "white") + " - Базовая атака")
+        self.out(colored("[2] ", "cyan") + colored("Специальная атака", "blue") + f" (10 ОМ) - Особая атака класса {character.char_class}")
+        self.out(colored("[3] ", "cyan") + colored("Использовать зелье", "green") + " - Восстановить ОЗ/ОМ")
+        self.out(colored("[4] ", "cyan") + colored("Бежать", "yellow") + " - Попытаться сбежать (50% шанс)")
+        self.out(colored("[5] ", "cyan") + colored("Авто-бой", "magenta") + " - Автоматически выбирать действия до конца боя")
+
+    def show_potion_list(self, potions, items):
+        self.out(colored("\nДоступные зелья:", "cyan"))
+        for i, (potion, count) in enumerate(potions, 1):
+            self.out(colored(f"[{i}] ", "cyan") +
+                  colored(f"{potion} (x{count})", "white") +
+                  f" - {items[potion]['description']}")
+
+    def show_flee_attempt(self):
+        self.out(colored("\nВы пытаетесь сбежать...", "yellow"))
+        self.sleep(1)
+
+    # Инвентарь и магазин
+    def show_inventory(self, gold):
+        self.screen("ИНВЕНТАРЬ", "small", "yellow")
+        self.out(colored(f"Золото: {gold}", "yellow"))
+
+    def show_inventory_items(self, groups, items, equipped):
+        self.out(colored("\n◉ ПРЕДМЕТЫ:", "cyan"))
+        item_counter = 1
+        for item_type, type_items in groups.items():
+            if type_items:
+                self.out(colored(f"\n{INVENTORY_GROUPS[item_type]}:", "yellow"))
+                for item_name, count in type_items:
+                    item = items[item_name]
+                    mark = ""
+                    if item_type != "consumable" and item_name in equipped:
+                        mark = colored(" [НАДЕТО]", "green")
+
+                    self.out(colored(f"[{item_counter}] ", "cyan") + colored(f"{item_name} (x{count}){mark}", "white") +
+                          f" - {colored(item['description'], 'yellow')}")
+                    item_counter += 1
+
+        self.out("\n" + colored("[И] ", "cyan") + colored("Использовать/Экипировать предмет", "green"))
+        self.out(colored("[Н] ", "cyan") + colored("Назад", "red"))
+
+    def show_shop(self, gold, groups, items):
+        self.screen("МАГАЗИН", "small", "cyan")
+
+        self.frame_text(f"Ваше золото: {gold}", width=40, color='yellow')
+
+        # Отобразить товары для продажи с нумерацией
+        self.out(colored("\n◉ ТОВАРЫ:", "cyan"))
+        item_counter = 1
+        for item_type, type_items in groups.items():
+            if type_items:
+                self.out(colored(f"\n{SHOP_GROUPS[item_type]}:", "yellow"))
+                for item_name in type_items:
+                    item = items[item_name]
+                    price = item["value"]
+                    color = "white"
+                    if gold < price:
+                        color = "red"  # Недостаточно золота
+
+                    self.out(colored(f"[{item_counter}] ", "cyan") +
+                          colored(f"{item_name.ljust(20)}", color) +
+                          colored(f"{price} золота", "yellow") +
+                          f" - {item['description']}")
+                    item_counter += 1
+
+        self.out("\n" + colored("[К] ", "cyan") + colored("Купить предмет", "green"))
+        self.out(colored("[П] ", "cyan") + colored("Продать предмет", "green"))
+        self.out(colored("[Н] ", "cyan") + colored("Назад", "red"))
+
+    def show_buying(self):
+        self.loading_screen("Покупка предмета", 1)
+
+    def show_sell_list(self, gold, inventory, items, equipped):
+        self.show_clear()
+        self.out(colored("ПРОДАЖА ПРЕДМЕТОВ", "yellow"))
+        self.out(colored(f"Ваше золото: {gold}", "yellow"))
+
+        self.out(colored("\nВаши предметы:", "cyan"))
+        for i, (item_name, count) in enumerate(inventory, 1):
+            sell_price = items[item_name]["value"] // 2
+
+            # Нельзя продать экипированные предметы
+            if item_name in equipped:
+                self.out(colored(f"[{i}] ", "cyan") +
+                      colored(f"{item_name} (x{count}) - [НАДЕТО]", "red"))
+                continue
+
+            self.out(colored(f"[{i}] ", "cyan") +
+                  colored(f"{item_name} (x{count})", "white") +
+                  colored(f" - Продать за {sell_price} золота", "yellow"))
+
+    def show_selling(self):
+        self.loading_screen("Продажа предмета", 1)
+
+    # Путешествие и исследование
+    def show_travel(self, location, destinations):
+        self.screen("ПУТЕШЕСТВИЕ", "small", "yellow")
+
+        # Отобразить ASCII-арт текущей локации
+        self.out(colored(location["ascii_art"], "cyan"))
+
+        self.frame_text(f"Текущая локация: {location['name']}\n{location['description']}",
+                  width=60, color='green')
+
+        # Отобразить доступные локации
+        self.out(colored("\n◉ ДОСТУПНЫЕ НАПРАВЛЕНИЯ:", "cyan"))
+
+        for i, loc in destinations:
+            if loc["enemy_chance"] < 0.3:
+                danger_level = colored("■□□ (Низкая опасность)", "green")
+            elif loc["enemy_chance"] < 0.5:
+                danger_level = colored("■■□ (Средняя опасность)", "yellow")
+            else:
+                danger_level = colored("■■■ (Высокая опасность)", "red")
+
+            self.out(colored(f"[{i}] ", "cyan") +
+                  colored(f"{loc['name']}", "white") +
+                  f" - {loc['description']} {danger_level}")
+
+        self.out("\n" + colored("[Н] ", "cyan") + colored("Назад", "red"))
+
+    def show_travelling(self, destination):
+        self.show_clear()
+        self.out(colored(f"Путешествие в {destination}...", "yellow"))
+        self.loading_screen("В пути", 2)
+
+    def show_arrived(self, location):
+        self.show_clear()
+        self.out(colored(location["ascii_art"], "cyan"))
+
+        self.out(colored(f"\nВы прибыли в {location['name']}!", "green"))
+        self.animate_text(location["description"], color='white')
+
+    def show_explore(self, location):
+        self.show_clear()
+        self.out(colored(f"ИССЛЕДОВАНИЕ {location['name']}".center(60), "yellow"))
+        self.out(colored("="*60, "cyan"))
+
+        self.out(colored(location["ascii_art"], "cyan"))
+        self.animate_text(f"Вы исследуете {location['name']}...", color='white')
+
+        # Эффект исследования
+        self.loading_screen("Исследование местности", 2)
+
+    # Задания
+    def show_quest_log(self):
+        self.screen("ЗАДАНИЯ", "small", "cyan")
+
+    def show_active_quests(self, quests, progress):
+        self.out(colored("\n◉ АКТИВНЫЕ ЗАДАНИЯ:", "cyan"))
+        for quest_id, quest in quests.items():
+            objective = quest["objective"]
+            current = progress.get(quest_id, {}).get(objective["target"], 0)
+            total = objective["count"]
+
+            progress_bar = "■" * current + "□" * (total - current)
+
+            self.out(colored(f"{quest['name']}", "yellow"))
+            self.out(f"  {colored(quest['description'], 'white')}")
+            self.out(f"  Прогресс: {colored(f'{current}/{total} {objective['target']} побеждено', 'green')} {progress_bar}")
+
+            # Отобразить награды
+            rewards = quest["rewards"]
+            self.out(f"  Награды: {colored(f'Опыт: {rewards.get('xp', 0)}', 'yellow')} | " +
+                  f"{colored(f'Золото: {rewards.get('gold', 0)}', 'yellow')} | " +
+                  f"{colored(f'Предметы: {', '.join(rewards.get('items', []))}', 'green')}")
+            self.out()
+
+    def show_available_quests(self, quests):
+        self.out(colored("\n◉ ДОСТУПНЫЕ ЗАДАНИЯ:", "cyan"))
+        for i, quest in enumerate(quests, 1):
+            self.out(colored(f"[{i}] ", "cyan") +
+                  colored(f"{quest['name']}", "yellow") +
+                  f": {quest['description']}")
+
+        self.out("\n" + colored("[П] ", "cyan") + colored("Принять задание", "green"))
+
+    def show_completed_quests(self, quests):
+        self.out(colored("\n◉ ЗАВЕРШЕННЫЕ ЗАДАНИЯ:", "green"))
+        for quest in quests:
+            self.out(colored(f"✓ {quest['name']}", "green"))
+
+    # Отдых и сохранение
+    def show_tavern(self, character, cost):
+        self.screen("ТАВЕРНА", "small", "yellow")
+
+        self.frame_text(f"Таверна \"Сонный Тролль\"\nСтоимость ночлега: {cost} золота", width=50, color='yellow')
+
+        self.out(colored(f"\nВаше золото: {character.gold}", "yellow"))
+        self.out(colored(f"Текущее здоровье: {character.hp}/{character.max_hp}", "green"))
+        self.out(colored(f"Текущая мана: {character.mp}/{character.max_mp}", "blue"))
+
+    def show_resting(self):
+        self.out(colored("\nВы отдыхаете в таверне...", "yellow"))
+        self.loading_screen("Сон", 2)
+
+    def show_saving(self):
+        self.out(colored("\nСохранение игры...", "yellow"))
+        self.loading_screen("Сохранение данных", 1)
+
+    def show_save_slots(self, slots):
+        self.out(colored("\nСохраненные игры:", "cyan"))
+        for i, slot in enumerate(slots, 1):
+            saved_at = time.strftime("%d.%m.%Y %H:%M", time.localtime(slot["saved_at"]))
+            self.out(colored(f"[{i}] ", "cyan") + colored(slot["name"], "yellow") +
+                     f" - {slot['char_class']}, ур. {slot['level']}, {slot['location']}" +
+                     colored(f" ({saved_at})", "white"))
+
+    def show_loading_save(self):
+        self.out(colored("\nЗагрузка сохраненной игры...", "yellow"))
+        self.loading_screen("Загрузка данных", 1)
+
+
+class ScreenRenderer(TerminalRenderer):
+    """TerminalRenderer с двойной буферизацией.
+
+    Кадр от одной очистки экрана до следующей собирается в памяти. Перед
+    вводом и паузами анимаций он сравнивается с тем, что уже на экране, и в
+    терминал одним write уходят только изменившиеся строки: ANSI-переходы к
+    строке вместо очистки экрана, дописывание хвоста, если кадр только вырос.
+    """
+
+    def __init__(self, stream=None, time_scale=1.0, keys=None):
+        super().__init__(stream, time_scale, keys)
+        self.lines = [""]   # Собираемый кадр; последняя строка - та, где стоит курсор
+        self.shown = [""]   # Что сейчас на экране
+        self.shown_rows = [0]  # Экранная строка начала каждой строки shown
+        self.bells = ""
+        self.anchored = False  # Экран уже очищался, и кадр начинается в левом верхнем углу
+        self.redraw = False    # Первая очистка: следующий кадр рисуется с нуля
+
+    def out(self, text="", end="\n"):
+        parts = (text + end).split("\n")
+        self.lines[-1] += parts[0]
+        self.lines.extend(parts[1:])
+
+    def bell(self, signal):
+        self.bells += signal
+
+    def show_clear(self):
+        self.lines = [""]
+        self.redraw = not self.anchored
+
+    def loading_screen(self, description="Загрузка", duration=3):
+        # Полоска tqdm рисуется в кадр: при обновлении меняется одна строка.
+        # Как и tqdm, перерисовываем ее не чаще LOADING_INTERVAL
+        from tqdm import tqdm
+        desc = colored(description, 'yellow')
+        width = shutil.get_terminal_size().columns - 1
+        line = self.lines[-1]
+        start = drawn = time.monotonic()
+        for n in range(101):
+            now = time.monotonic()
+            if n in (0, 100) or now - drawn >= LOADING_INTERVAL:
+                self.lines[-1] = line + tqdm.format_meter(n, 100, now - start, ncols=width,
+                                                          prefix=desc, bar_format=LOADING_BAR)
+                drawn = now
+            if n < 100:
+                self.sleep(duration/100)
+        # tqdm закрывает полоску переводом строки, затем пустая строка после нее
+        self.out()
+        self.out()
+
+    def ask(self, prompt, **data):
+        self.out(self.prompt_text(prompt, data), end="")
+        self.keys.release()
+        self.flush()
+        answer = input()
+        # Терминал сам показал введенный ответ и перевел строку
+        self.out(answer)
+        self._mark_shown()
+        return answer
+
+    def _rows(self, lines):
+        """Экранная строка начала каждой строки с учетом переноса длинных строк"""
+        width = shutil.get_terminal_size().columns
+        rows = []
+        row = 0
+        for line in lines:
+            rows.append(row)
+            row += max(1, -(-len(ANSI_CODE.sub("", line)) // width))
+        return rows, row
+
+    def _mark_shown(self, rows=None):
+        self.shown = list(self.lines)
+        self.shown_rows = rows or self._rows(self.lines)[0]
+
+    def _frame_update(self, rows, height):
+        """ANSI-последовательность, превращающая shown в lines"""
+        lines, shown = self.lines, self.shown
+        last = len(shown) - 1
+
+        # Первая очистка экрана - перерисовать целиком
+        if self.redraw:
+            self.redraw = False
+            self.anchored = True
+            return CLEAR_SCREEN + "\n".join(lines)
+
+        # Кадр только дописан - вывести хвост с текущей позиции курсора
+        if (len(lines) > last and lines[last].startswith(shown[last])
+                and lines[:last] == shown[:last]):
+            tail = lines[last][len(shown[last]):]
+            return "\n".join([tail] + lines[last + 1:])
+
+        # Экран мог прокрутиться, если кадр выше терминала: top - сколько строк ушло вверх.
+        # Если изменения задевают ушедшие строки, кадр не помещается или укоротился - перерисовать целиком
+        shown_height = self._rows(shown)[1]
+        screen_rows = shutil.get_terminal_size().lines
+        top = max(0, shown_height - screen_rows)
+        if height - top > screen_rows or (top and height < shown_height):
+            return CLEAR_SCREEN + "\n".join(lines)
+
+        # Переписать только изменившиеся строки; последнюю - всегда, чтобы курсор встал в ее конец.
+        # Подряд идущие строки выводятся через перевод строки без лишнего позиционирования,
+        # у строки на прежнем месте - только отличающийся хвост
+        updates = []
+        final = len(lines) - 1
+        width = shutil.get_terminal_size().columns
+        previous = None
+        for i, line in enumerate(lines):
+            same_row = i < len(shown) and rows[i] == self.shown_rows[i]
+            if i < final and same_row and line == shown[i]:
+                continue
+            if rows[i] < top:
+                return CLEAR_SCREEN + "\n".join(lines)
+            start = _common_prefix(line, shown[i]) if same_row else 0
+            if start:
+                column = len(ANSI_CODE.sub("", line[:start]))
+                move = f"\x1b[{rows[i] - top + column // width + 1};{column % width + 1}H"
+            else:
+                move = "\n" if previous == i - 1 else f"\x1b[{rows[i] - top + 1};1H"
+            updates.append(f"{move}{line[start:]}{CLEAR_LINE_END}")
+            previous = i
+        if shown_height > height:
+            updates.append(CLEAR_BELOW)
+        return "".join(updates)
+
+    def flush(self):
+        """Вывести отличия собранного кадра от экрана одним write"""
+        if self.lines == self.shown and not self.bells:
+            return
+        rows, height = self._rows(self.lines)
+        update = self._frame_update(rows, height) if self.lines != self.shown else ""
+        self.stream.write(update + self.bells)
+        self.stream.flush()
+        self.bells = ""
+        self._mark_shown(rows)
+
+
+def _common_prefix(line, old):
+    """Длина общего начала строк, после которого можно дописать хвост (не внутри ANSI-кода и цвета)"""
+    end = 0
+    for new_char, old_char in zip(line, old):
+        if new_char != old_char:
+            break
+        end += 1
+    safe = 0
+    in_color = False
+    for code in ANSI_CODE.finditer(line):
+        if code.start() >= end:
+            break
+        if not in_color:
+            safe = code.start()
+        if code.end() > end:
+            return safe
+        in_color = code.group() != RESET_CODE
+    return safe if in_color else end
+
+
+def default_renderer(time_scale=1.0):
+    """Renderer для запуска из терминала: с буферизацией кадров, если вывод - экран"""
+    renderer = ScreenRenderer if sys.stdout.isatty() else TerminalRenderer
+    return renderer(time_scale=time_scale)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Запись ввода сессии и воспроизведение без экрана: то же зерно и те же ответы дают ту же игру"""
+import argparse
+import hashlib
+import json
+import shutil
+import sys
+import tempfile
+import time
+
+from renderer import NullRenderer, RecordingRenderer, Renderer
+
+SESSION_FORMAT = 1
+
+
+class ReplayError(RuntimeError):
+    """Воспроизводимая игра задала не тот вопрос, что был записан"""
+
+
+class InputRecorder(Renderer):
+    """Обертка renderer: все передает дальше и дописывает каждый ответ ask в файл сессии.
+
+    Первая строка файла - зерно и настройки игры, дальше по строке на ответ:
+    [вопрос, ответ]. Строки сбрасываются на диск сразу, так что сессия,
+    оборванная Ctrl+C или падением, воспроизводится до места обрыва.
+    """
+
+    def __init__(self, ui, path, seed, autosave=True):
+        self.ui = ui
+        self.file = open(path, "w", encoding="utf-8")
+        self.write({"format": SESSION_FORMAT, "seed": seed, "autosave": autosave})
+
+    def write(self, entry):
+        self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def emit(self, kind, **data):
+        self.ui.emit(kind, **data)
+
+    def ask(self, prompt, **data):
+        answer = self.ui.ask(prompt, **data)
+        self.write([prompt, answer])
+        return answer
+
+    def flush(self):
+        self.ui.flush()
+
+    def close(self):
+        self.ui.close()
+        self.file.close()
+
+
+def read_session(path):
+    """(настройки, [(вопрос, ответ)]) из файла InputRecorder"""
+    with open(path, encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        if header.get("format") != SESSION_FORMAT:
+            raise ValueError(f"{path}: неизвестный формат сессии {header.get('format')!r}")
+        return header, [tuple(json.loads(line)) for line in f if line.strip()]
+
+
+class Player:
+    """Ответы для NullRenderer: выдает записанные по порядку и сверяет вопросы"""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.position = 0
+        self.error = None  # Первое расхождение: игра может перехватить исключение, но оно не теряется
+
+    def __call__(self, prompt, **data):
+        if self.error:
+            raise self.error
+        if self.position == len(self.answers):
+            return None  # Ответы кончились: NullRenderer бросит EOFError, как input() на закрытом stdin
+        recorded, answer = self.answers[self.position]
+        if recorded != prompt:
+            self.error = ReplayError(f"ввод {self.position + 1}: записан вопрос {recorded!r}, игра спросила {prompt!r}")
+            raise self.error
+        self.position += 1
+        return answer
+
+
+def plain(value):
+    """Объект из данных события в JSON-совместимом виде (для отпечатка событий)"""
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    slots = getattr(type(value), "__slots__", None)
+    if slots:
+        return {name: getattr(value, name) for name in slots if name != "ui"}
+    return repr(value)
+
+
+def digest(events):
+    """sha256 последовательности событий renderer: совпадает, только если игра вывела то же самое"""
+    h = hashlib.sha256()
+    for event in events:
+        h.update(json.dumps(event, ensure_ascii=False, default=plain).encode("utf-8"))
+    return h.hexdigest()
+
+
+def replay(path, saves=None, events=False):
+    """Воспроизвести сессию без экрана; вернуть (персонаж Character.to_dict или None, число ответов, renderer).
+
+    Игра пишет сохранения во временный каталог: пустой или копию saves, если
+    сессия загружала сохранения, существовавшие до записи. Одиночное
+    сохранение прежних версий из текущего каталога не переносится: иначе
+    итог зависел бы от того, где запущено воспроизведение.
+    """
+    from RPGame import Game
+    from saves import SaveStore
+    header, answers = read_session(path)
+    player = Player(answers)
+    ui = RecordingRenderer(player) if events else NullRenderer(player)
+    directory = tempfile.mkdtemp(prefix="replay-")
+    if saves:
+        shutil.copytree(saves, directory, dirs_exist_ok=True)
+    game = Game(ui, autosave=header["autosave"], store=SaveStore(directory), seed=header["seed"], legacy_save=None)
+    try:
+        game.main_menu()
+    except EOFError:
+        pass  # Сессия оборвана посреди игры: ответы кончились в том же месте
+    finally:
+        game.close()
+        shutil.rmtree(directory)
+    if player.error:
+        raise player.error
+    return game.character.to_dict() if game.character else None, player.position, ui
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Воспроизвести записанную сессию (RPGame.py --record) без экрана")
+    parser.add_argument("session", help="файл сессии")
+    parser.add_argument("--saves", metavar="DIR", help="каталог сохранений на момент записи (копируется)")
+    parser.add_argument("--state", metavar="PATH", help="записать итоговое состояние персонажа в JSON")
+    parser.add_argument("--runs", type=int, default=1, help="воспроизвести N раз и проверить, что итог совпадает")
+    args = parser.parse_args(argv)
+
+    results = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        try:
+            state, answered, ui = replay(args.session, args.saves, events=True)
+        except ReplayError as e:
+            print(f"Воспроизведение разошлось с записью: {e}")
+            return 1
+        elapsed = time.perf_counter() - start
+        results.append((digest(ui.events), json.dumps(state, ensure_ascii=False, sort_keys=True)))
+        print(f"Ответов {answered}, событий {len(ui.events)}, {elapsed * 1e3:.0f} мс, "
+              f"отпечаток событий {results[-1][0][:16]}")
+    if args.state:
+        with open(args.state, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+    if state:
+        print(f"{state['name']} ({state['char_class']}), ур. {state['level']}, {state['gold']} золота, "
+              f"{state['hp']}/{state['max_hp']} ОЗ, {state['location']}")
+    if len(set(results)) > 1:
+        print("Воспроизведения разошлись")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
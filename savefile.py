@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""Двоичный формат сохранения: секции с длиной (заголовок, характеристики, предметы, задания), декодируются по требованию"""
+import argparse
+import json
+import struct
+import sys
+import time
+import zlib
+
+MAGIC = b"RPGS"
+FORMAT_VERSION = 2
+PREAMBLE = struct.Struct("<4sBB")   # сигнатура, версия, число секций
+SECTION = struct.Struct("<4sBI")    # метка, сжатие (0 - нет, 1 - zlib), длина
+COUNTS = struct.Struct("<III")      # в секции: чисел, строк, байт строк
+COUNTS_V1 = struct.Struct("<HHH")   # Версия 1: больше 64 КБ имен предметов не помещалось
+
+# Секции в порядке записи: заголовок первым, чтобы меню загрузки не трогало остальное
+HEADER, STATS, ITEMS, QUESTS, JOURNAL = b"HEAD", b"STAT", b"ITEM", b"QUST", b"JRNL"
+STAT_FIELDS = ("xp", "xp_next", "gold", "max_hp", "hp", "max_mp", "mp", "base_strength",
+               "base_defense", "base_agility", "base_critical", "base_luck")
+COMPRESS_MIN = 64  # Секции короче почти не сжимаются: zlib только добавит байт
+CHECK_ITEMS = 5000  # Предметов в проверке большого инвентаря: имена занимают больше 64 КБ
+
+
+# Секция - массив int32 и строки UTF-8 через "\0": разбор - два вызова на C вместо чтения по полю
+def pack_section(ints, strs):
+    text = "\0".join(strs)
+    if strs and text.count("\0") != len(strs) - 1:
+        raise ValueError("строка сохранения содержит символ \\0")
+    text = text.encode("utf-8")
+    return COUNTS.pack(len(ints), len(strs), len(text)) + struct.pack(f"<{len(ints)}i", *ints) + text
+
+
+def unpack_section(payload, counts=COUNTS):
+    count, strings, size = counts.unpack_from(payload)
+    ints = struct.unpack_from(f"<{count}i", payload, counts.size)
+    start = counts.size + 4 * count
+    return ints, str(payload[start:start + size], "utf-8").split("\0") if strings else []
+
+
+def encode_header(data):
+    return pack_section([data["level"]], [data["name"], data["char_class"], data["location"]])
+
+
+def decode_header(ints, strs):
+    name, char_class, location = strs
+    return {"name": name, "char_class": char_class, "location": location, "level": ints[0]}
+
+
+def encode_stats(data):
+    return pack_section([data[field] for field in STAT_FIELDS], [])
+
+
+def decode_stats(ints, strs):
+    return dict(zip(STAT_FIELDS, ints))
+
+
+def encode_items(data):
+    # Пустой слот экипировки - пустая строка
+    equipment = [value for slot, item_name in data["equipment"].items() for value in (slot, item_name or "")]
+    return pack_section([len(data["equipment"]), *data["inventory"].values()],
+                        equipment + list(data["inventory"]))
+
+
+def decode_items(ints, strs):
+    slots = 2 * ints[0]
+    return {"equipment": dict(zip(strs[0:slots:2], [item_name or None for item_name in strs[1:slots:2]])),
+            "inventory": dict(zip(strs[slots:], ints[1:]))}
+
+
+def encode_quests(data):
+    progress = data["quest_progress"]
+    active = list(data["active_quests"].values())
+    ints = [len(active), len(data["completed_quests"]), len(progress), *map(len, progress.values())]
+    strs = active + data["completed_quests"] + list(progress)
+    for targets in progress.values():
+        ints += targets.values()
+        strs += targets
+    return pack_section(ints, strs)
+
+
+def decode_quests(ints, strs):
+    active, completed, quests = ints[:3]
+    at = active + completed + quests  # Имена целей в strs идут после id заданий
+    n = 3 + quests                    # Счетчики в ints - после размеров прогресса
+    progress = {}
+    for quest_id, size in zip(strs[active + completed:at], ints[3:n]):
+        progress[quest_id] = dict(zip(strs[at:at + size], ints[n:n + size]))
+        at += size
+        n += size
+    return {"active_quests": {quest_id: quest_id for quest_id in strs[:active]},
+            "completed_quests": strs[active:active + completed], "quest_progress": progress}
+
+
+# Номер последней записи журнала (journal.py), вошедшей в снимок; прежние версии секцию пропускают
+def encode_journal(data):
+    return pack_section([data.get("journal_seq", 0)], [])
+
+
+def decode_journal(ints, strs):
+    return {"journal_seq": ints[0]}
+
+
+CODECS = {
+    HEADER: (encode_header, decode_header),
+    STATS: (encode_stats, decode_stats),
+    ITEMS: (encode_items, decode_items),
+    QUESTS: (encode_quests, decode_quests),
+    JOURNAL: (encode_journal, decode_journal),
+}
+
+
+def encode(data, compress=False):
+    """Данные персонажа (Character.to_dict) в байты двоичного формата"""
+    sections = []
+    for tag, (encoder, _) in CODECS.items():
+        payload = encoder(data)
+        codec = 0
+        if compress and len(payload) >= COMPRESS_MIN:
+            packed = zlib.compress(payload, 6)
+            if len(packed) < len(payload):
+                payload, codec = packed, 1
+        sections.append((tag, codec, payload))
+    out = bytearray(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(sections)))
+    for tag, codec, payload in sections:
+        out += SECTION.pack(tag, codec, len(payload))
+    for _, _, payload in sections:
+        out += payload
+    return bytes(out)
+
+
+class SaveFile:
+    """Разобранная таблица секций; каждая секция декодируется при первом обращении.
+
+    Неизвестные секции (из более новых версий) пропускаются.
+    """
+
+    def __init__(self, data):
+        data = memoryview(data)
+        magic, version, count = PREAMBLE.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("не файл сохранения")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"сохранение версии {version} новее поддерживаемой {FORMAT_VERSION}")
+        self.data = data
+        self.counts = COUNTS if version >= 2 else COUNTS_V1
+        self.sections = {}  # метка -> (сжатие, начало, длина)
+        offset = PREAMBLE.size + count * SECTION.size
+        for i in range(count):
+            tag, codec, size = SECTION.unpack_from(data, PREAMBLE.size + i * SECTION.size)
+            self.sections[tag] = (codec, offset, size)
+            offset += size
+        if offset > len(data):
+            raise ValueError("файл сохранения обрезан")
+        self.decoded = {}
+
+    @classmethod
+    def read(cls, path):
+        with open(path, "rb") as f:
+            return cls(f.read())
+
+    def section(self, tag):
+        decoded = self.decoded.get(tag)
+        if decoded is None:
+            codec, offset, size = self.sections[tag]
+            payload = self.data[offset:offset + size]
+            if codec == 1:
+                payload = zlib.decompress(payload)
+            decoded = self.decoded[tag] = CODECS[tag][1](*unpack_section(payload, self.counts))
+        return decoded
+
+    def header(self):
+        return self.section(HEADER)
+
+    def stats(self):
+        return self.section(STATS)
+
+    def to_dict(self):
+        """Все секции в виде Character.to_dict (в файлах прежних версий нет секции журнала)"""
+        data = {}
+        for tag in CODECS:
+            if tag in self.sections:
+                data.update(self.section(tag))
+        return data
+
+
+def benchmark_character(level, items=0):
+    """Персонаж середины игры: экипировка, инвентарь и задания в разной стадии; items - лишних предметов"""
+    from RPGame import QUESTS
+    from simulator import build_character
+    character = build_character("Воин", level)
+    character.name = "Замер"
+    for item_name in ("Зелье здоровья", "Зелье маны", "Стальной меч", "Амулет удачи"):
+        character.inventory[item_name] += 3
+    for quest in QUESTS[:-1]:
+        character.add_quest(quest["id"])
+        character.update_quest_progress(quest["objective"]["target"])
+    character.completed_quests.append(QUESTS[-1]["id"])
+    for n in range(items):
+        character.inventory[f"Предмет пакета {n}"] = 1 + n % 5
+    return character
+
+
+def timed(function, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        function()
+    return (time.perf_counter() - start) / rounds
+
+
+def check_large(items=CHECK_ITEMS):
+    """Размер сохранения персонажа с items предметами; AssertionError, если оно не читается обратно"""
+    from RPGame import Character
+    data = benchmark_character(10, items).to_dict()
+    for compress in (False, True):
+        blob = encode(data, compress)
+        assert Character.from_dict(SaveFile(blob).to_dict()).to_dict() == data, (items, compress)
+    return len(encode(data))
+
+
+def benchmark(level, rounds):
+    """[(формат, байт, запись, полная загрузка, только заголовок)], время в секундах"""
+    from RPGame import Character
+    data = benchmark_character(level).to_dict()
+    formats = [
+        ("JSON indent=2", lambda d: json.dumps(d, indent=2).encode("utf-8"),
+         lambda b: json.loads(b), lambda b: json.loads(b)["name"]),
+        ("JSON компактный", lambda d: json.dumps(d, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+         lambda b: json.loads(b), lambda b: json.loads(b)["name"]),
+        ("двоичный", lambda d: encode(d, compress=False),
+         lambda b: SaveFile(b).to_dict(), lambda b: SaveFile(b).header()),
+        ("двоичный+zlib", lambda d: encode(d, compress=True),
+         lambda b: SaveFile(b).to_dict(), lambda b: SaveFile(b).header()),
+    ]
+    rows = []
+    for name, dump, load, header in formats:
+        blob = dump(data)
+        assert Character.from_dict(load(blob)).to_dict() == data, name
+        rows.append((name, len(blob), timed(lambda: dump(data), rounds),
+                     timed(lambda: Character.from_dict(load(blob)), rounds), timed(lambda: header(blob), rounds)))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Двоичные сохранения: перевод из/в JSON и бенчмарк форматов")
+    sub = parser.add_subparsers(dest="command", required=True)
+    to_json = sub.add_parser("export", help="двоичное сохранение -> JSON")
+    to_json.add_argument("source")
+    to_json.add_argument("target")
+    from_json = sub.add_parser("import", help="JSON-сохранение -> двоичное")
+    from_json.add_argument("source")
+    from_json.add_argument("target")
+    from_json.add_argument("--compress", action="store_true", help="сжать секции zlib")
+    bench = sub.add_parser("bench", help="размер и время записи/загрузки по форматам")
+    bench.add_argument("--level", type=int, default=10)
+    bench.add_argument("--rounds", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        with open(args.target, "w", encoding="utf-8") as f:
+            json.dump(SaveFile.read(args.source).to_dict(), f, ensure_ascii=False, indent=2)
+    elif args.command == "import":
+        with open(args.source, encoding="utf-8") as f:
+            data = json.load(f)
+        with open(args.target, "wb") as f:
+            f.write(encode(data, compress=args.compress))
+    else:
+        print(f"Проверка: {CHECK_ITEMS} предметов, {check_large():,} байт - читается без потерь\n")
+        print(f"{'Формат':<18} {'Байт':>6} {'Запись, мкс':>12} {'Загрузка, мкс':>14} {'Заголовок, мкс':>15}")
+        for name, size, write, load, header in benchmark(args.level, args.rounds):
+            print(f"{name:<18} {size:>6} {write * 1e6:>12.1f} {load * 1e6:>14.1f} {header * 1e6:>15.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
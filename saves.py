@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+"""Сохранения по слотам: атомарная запись файлов и индекс заголовков для меню загрузки"""
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from journal import Journal
+from savefile import SaveFile, encode
+
+SAVE_DIR = "saves"
+BINARY_SUFFIX = ".sav"  # Двоичный формат savefile.py - по умолчанию
+JSON_SUFFIX = ".json"   # Прежний формат: читается, пишется при binary=False
+INDEX_FILE = "_index.json"  # Имена слотов не начинаются с "_", так что с сохранением не совпадет
+INDEX_LOG = "_index.log"  # Изменения заголовков после последней полной записи индекса
+INDEX_FORMAT = 1
+INDEX_COMPACT_MIN = 256  # Строк журнала индекса, до которых индекс не переписывается целиком
+HEADER_FIELDS = ("name", "char_class", "level", "location")  # Что меню загрузки показывает о слоте
+STALE_TMP_AGE = 600  # Секунд: временный файл старше - остаток оборванной записи
+AUTOSAVE_DELAY = 0.5  # Секунд после изменения до записи: серия изменений уходит одной записью
+SNAPSHOT_BYTES = 64 * 1024  # Журнал слота длиннее - следующая запись делается полным снимком
+
+
+def fsync_dir(directory):
+    """Закрепить на диске переименование внутри directory (на Windows каталог не открыть - пропускаем)"""
+    if os.name != "posix":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, data):
+    """Записать bytes в path целиком или не записать вовсе: временный файл, fsync, rename"""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    fsync_dir(directory)
+
+
+def slot_name(name):
+    """Имя слота (и файла) для персонажа name: только буквы, цифры, "-" и "_" """
+    return re.sub(r"[^\w-]+", "_", name).strip("_") or "save"
+
+
+def make_header(slot, data, saved_at):
+    return {"slot": slot, **{field: data[field] for field in HEADER_FIELDS}, "saved_at": saved_at}
+
+
+class SaveStore:
+    """Каталог сохранений: файл на слот и индекс с заголовками всех слотов.
+
+    Меню загрузки читает только индекс. Каждый файл пишется атомарно, так что
+    сбой посреди записи оставляет прежнюю версию слота. Если индекс потерян или
+    отстал от файлов (сбой между записью слота и индекса), он сверяется со
+    списком файлов и досчитывается по тем слотам, которых в нем нет.
+
+    Индекс не переписывается при каждой записи слота: новый заголовок
+    дописывается строкой в журнал индекса, а целиком индекс пишется, когда
+    журнал становится длиннее самого индекса. Так запись слота не зависит от
+    числа слотов. Журнал индекса не синхронизируется с диском: потерянная
+    строка найдется при сверке - файл слота окажется новее заголовка.
+
+    Между полными снимками (save) изменения дописываются в журнал слота
+    (record), и загрузка воспроизводит его поверх снимка. Заголовок в индексе
+    обновляется только снимком, так что до него меню может показывать прежние
+    уровень и локацию.
+    """
+
+    def __init__(self, directory=SAVE_DIR, binary=True, compress=False):
+        self.directory = directory
+        self.suffix = BINARY_SUFFIX if binary else JSON_SUFFIX
+        self.compress = compress
+        self.index = None  # слот -> заголовок; читается при первом обращении
+        self.index_records = 0  # Строк в журнале индекса
+        self.index_lock = threading.RLock()  # Индекс общий для слотов; файлы слотов пишутся без нее
+        self.journals = {}  # слот -> Journal
+
+    def path(self, slot, suffix=None):
+        return os.path.join(self.directory, slot + (suffix or self.suffix))
+
+    def find(self, slot):
+        """Файл слота: двоичный, если он есть, иначе JSON"""
+        for suffix in (BINARY_SUFFIX, JSON_SUFFIX):
+            path = self.path(slot, suffix)
+            if os.path.exists(path):
+                return path
+        raise FileNotFoundError(f"нет сохранения в слоте {slot!r}")
+
+    def journal(self, slot):
+        journal = self.journals.get(slot)
+        if journal is None:
+            journal = self.journals[slot] = Journal(self.directory, slot)
+        return journal
+
+    def close(self):
+        """Следующая запись каждого слота начнет новый сегмент журнала"""
+        for journal in list(self.journals.values()):
+            journal.close_segment()
+
+    def release(self, slot):
+        """Забыть журнал слота, которым больше не играют: следующая запись слота будет полным снимком"""
+        self.journals.pop(slot, None)
+
+    def encode(self, data):
+        if self.suffix == BINARY_SUFFIX:
+            return encode(data, self.compress)
+        return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+    def read_index(self):
+        """Последняя полная запись индекса с примененным журналом индекса"""
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), encoding="utf-8") as f:
+                data = json.load(f)
+            index = data["slots"] if data.get("format") == INDEX_FORMAT else {}
+        except (OSError, ValueError):
+            index = {}
+        self.index_records = 0
+        try:
+            with open(os.path.join(self.directory, INDEX_LOG), encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        slot, header = json.loads(line)
+                    except ValueError:
+                        break  # Строка оборвана сбоем
+                    if header is None:
+                        index.pop(slot, None)
+                    else:
+                        index[slot] = header
+                    self.index_records += 1
+        except OSError:
+            pass
+        return index
+
+    def write_index(self):
+        """Записать индекс целиком и очистить журнал индекса"""
+        data = json.dumps({"format": INDEX_FORMAT, "slots": self.index}, ensure_ascii=False)
+        atomic_write(os.path.join(self.directory, INDEX_FILE), data.encode("utf-8"))
+        if self.index_records:
+            os.remove(os.path.join(self.directory, INDEX_LOG))
+            self.index_records = 0
+
+    def update_index(self, slot, header):
+        """Заголовок слота (None - слот удален): строка в журнал индекса или, если он разросся, весь индекс"""
+        with self.index_lock:
+            if header is None:
+                self.index.pop(slot, None)
+            else:
+                self.index[slot] = header
+            if self.index_records >= max(INDEX_COMPACT_MIN, len(self.index)):
+                self.write_index()
+                return
+            line = json.dumps([slot, header], ensure_ascii=False, separators=(",", ":")) + "\n"
+            with open(os.path.join(self.directory, INDEX_LOG), "a", encoding="utf-8") as f:
+                f.write(line)
+            self.index_records += 1
+
+    def load_index(self):
+        """Индекс, сверенный со списком файлов слотов"""
+        with self.index_lock:
+            if self.index is None:
+                self.reconcile_index()
+            return self.index
+
+    def reconcile_index(self):
+        """Прочитать индекс и сверить его со списком файлов слотов"""
+        index = self.read_index()
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            entries = []
+        on_disk = {}  # слот -> время изменения его файла
+        for entry in entries:
+            if entry.name.endswith((BINARY_SUFFIX, JSON_SUFFIX)) and entry.name != INDEX_FILE:
+                slot = os.path.splitext(entry.name)[0]
+                on_disk[slot] = max(on_disk.get(slot, 0), entry.stat().st_mtime)
+        self.remove_stale_tmp([entry.name for entry in entries if entry.name.startswith(".tmp-")])
+        stale = index.keys() - on_disk.keys()
+        # Заголовок старше файла - строка журнала индекса не дошла до диска
+        missing = {slot for slot, mtime in on_disk.items() if slot not in index or index[slot]["saved_at"] < mtime}
+        for slot in stale:
+            del index[slot]
+        for slot in missing:
+            try:
+                index[slot] = self.read_header(slot)
+            except (OSError, ValueError, KeyError):
+                pass  # Поврежденный файл в меню не попадает, но и не удаляется
+        self.index = index
+        if stale or missing:
+            try:
+                self.write_index()
+            except OSError:
+                pass  # Каталог только для чтения: индекс соберется заново в следующий раз
+
+    def remove_stale_tmp(self, names):
+        """Удалить временные файлы записей, оборванных сбоем (свежие может писать другой процесс)"""
+        now = time.time()
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                if now - os.path.getmtime(path) > STALE_TMP_AGE:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def slots(self):
+        """Заголовки всех слотов, последние сохранения сверху"""
+        with self.index_lock:
+            return sorted(self.load_index().values(), key=lambda header: header["saved_at"], reverse=True)
+
+    def free_slot(self, name):
+        """Незанятый слот для нового персонажа name"""
+        with self.index_lock:
+            index = self.load_index()
+            base = slot = slot_name(name)
+            n = 2
+            while slot in index:
+                slot = f"{base}_{n}"
+                n += 1
+            return slot
+
+    def save(self, slot, data):
+        """Атомарно записать полный снимок персонажа в слот, сжать журнал и обновить индекс; вернуть заголовок"""
+        index = self.load_index()
+        os.makedirs(self.directory, exist_ok=True)
+        journal = self.journal(slot)
+        if journal.state is None:
+            journal.compact(None)  # Слот перезаписывается без загрузки: чужой журнал к снимку не относится
+        atomic_write(self.path(slot), self.encode({**data, "journal_seq": journal.seq}))
+        journal.compact(data)
+        other = self.path(slot, JSON_SUFFIX if self.suffix == BINARY_SUFFIX else BINARY_SUFFIX)
+        if os.path.exists(other):
+            os.remove(other)  # Слот в другом формате устарел
+        self.update_index(slot, make_header(slot, data, time.time()))
+        return index[slot]
+
+    def record(self, slot, data):
+        """Дописать в журнал слота изменения с прошлой записи; полный снимок, если журнала нет или он разросся"""
+        journal = self.journal(slot)
+        if journal.state is None or journal.since_snapshot >= SNAPSHOT_BYTES:
+            self.save(slot, data)
+        else:
+            journal.record(data)
+
+    def delete(self, slot):
+        """Удалить слот: снимок, журнал и заголовок в индексе"""
+        index = self.load_index()
+        self.journal(slot).compact(None)
+        del self.journals[slot]
+        for suffix in (BINARY_SUFFIX, JSON_SUFFIX):
+            path = self.path(slot, suffix)
+            if os.path.exists(path):
+                os.remove(path)
+        if slot in index:
+            self.update_index(slot, None)
+
+    def load(self, slot):
+        """Данные персонажа из слота с воспроизведенным журналом (для Character.from_dict)"""
+        path = self.find(slot)
+        if path.endswith(BINARY_SUFFIX):
+            data = SaveFile.read(path).to_dict()
+        else:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        return self.journal(slot).replay(data, data.pop("journal_seq", 0))
+
+    def read_header(self, slot):
+        """Заголовок слота для индекса; из двоичного файла декодируется только секция заголовка"""
+        path = self.find(slot)
+        if path.endswith(BINARY_SUFFIX):
+            data = SaveFile.read(path).header()
+        else:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        return make_header(slot, data, os.path.getmtime(path))
+
+    def import_file(self, path):
+        """Перенести одиночный файл сохранения прежних версий в новый слот, если слотов еще нет"""
+        if self.load_index() or not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        slot = self.free_slot(data["name"])
+        self.save(slot, data)
+        return slot
+
+
+class Autosaver:
+    """Фоновая запись снимков персонажа в SaveStore.
+
+    request() только подменяет ожидающий снимок и будит поток, так что ввод
+    игры не ждет диска. Поток выжидает delay, чтобы серия изменений (награды
+    за бой, покупки подряд) ушла одной записью, и пишет последний снимок:
+    изменения - в журнал слота, full=True - полным снимком.
+    """
+
+    def __init__(self, store, delay=AUTOSAVE_DELAY):
+        self.store = store
+        self.delay = delay
+        self.cond = threading.Condition()
+        self.pending = None    # (слот, данные, полный снимок), еще не отданные на запись
+        self.requested = None  # Последний принятый снимок: такой же повторно не пишется
+        self.busy = False      # Поток сейчас пишет
+        self.flushing = 0      # Ждущие flush: задержка слияния не нужна
+        self.closed = False
+        self.error = None      # Ошибка фоновой записи, еще не показанная игроку
+        self.saved = None      # Последний записанный снимок (слот, данные)
+        self.writes = 0
+        self.thread = None
+
+    def request(self, slot, data, full=False):
+        """Поставить снимок в очередь; не блокирует"""
+        with self.cond:
+            if (slot, data) == self.requested and not full:
+                return
+            if self.pending:
+                full = full or self.pending[2]  # Вытесненный запрос полного снимка не теряется
+            self.requested = (slot, data)
+            self.pending = (slot, data, full)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="autosave", daemon=True)
+                self.thread.start()
+            self.cond.notify_all()
+
+    def run(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.pending is not None or self.closed)
+                if self.pending is None:
+                    return
+                self.cond.wait_for(lambda: self.closed or self.flushing, timeout=self.delay)
+                slot, data, full = self.pending
+                self.pending = None
+                self.busy = True
+            try:
+                if full:
+                    self.store.save(slot, data)
+                else:
+                    self.store.record(slot, data)
+                error = None
+            except Exception as e:
+                error = e
+            with self.cond:
+                self.busy = False
+                if error is None:
+                    self.saved = (slot, data)
+                    self.writes += 1
+                    self.error = None  # Более новый снимок записан - прежняя ошибка уже неважна
+                else:
+                    self.error = error
+                    self.requested = None  # Следующий запрос повторит запись
+                self.cond.notify_all()
+
+    def flush(self):
+        """Дождаться записи всех принятых снимков"""
+        with self.cond:
+            self.flushing += 1
+            self.cond.notify_all()
+            self.cond.wait_for(lambda: self.pending is None and not self.busy)
+            self.flushing -= 1
+
+    def save(self, slot, data):
+        """Записать полный снимок сейчас (ручное сохранение): дождаться записи и поднять ее ошибку"""
+        self.request(slot, data, full=True)
+        self.flush()
+        error = self.take_error()
+        if error:
+            raise error
+
+    def take_error(self):
+        with self.cond:
+            error, self.error = self.error, None
+        return error
+
+    def close(self):
+        """Дописать ожидающий снимок и остановить поток"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        if self.thread:
+            self.thread.join()
+
+
+def benchmark(slots, rounds, binary=True, compress=False):
+    """(запись слота, чтение индекса, заголовки из файлов, загрузка всех файлов) в секундах для slots сохранений"""
+    from RPGame import Character
+    directory = tempfile.mkdtemp(prefix="saves-bench-")
+    try:
+        store = SaveStore(directory, binary, compress)
+        data = Character("Герой", "Воин").to_dict()
+        store.index = {}
+        for i in range(slots):  # Заготовка без fsync: замеряется не она
+            slot, hero = f"hero_{i}", {**data, "name": f"Герой {i}"}
+            with open(store.path(slot), "wb") as f:
+                f.write(store.encode(hero))
+            store.index[slot] = make_header(slot, hero, time.time())
+        store.write_index()
+
+        write = index = headers = full = float("inf")
+        for _ in range(rounds):
+            start = time.perf_counter()
+            store.save("hero_0", data)
+            write = min(write, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            SaveStore(directory).slots()
+            index = min(index, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for slot in store.index:
+                store.read_header(slot)
+            headers = min(headers, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for slot in store.index:
+                store.load(slot)
+            full = min(full, time.perf_counter() - start)
+    finally:
+        shutil.rmtree(directory)
+    return write, index, headers, full
+
+
+def crash_child(directory, binary):
+    """Процесс для crash_test: без остановки пишет снимки через Autosaver и печатает золото записанных"""
+    from RPGame import Character
+    autosaver = Autosaver(SaveStore(directory, binary), delay=0)
+    character = Character("Герой", "Воин")
+    for i in range(2000):  # Крупный файл: запись дольше, и убийство чаще приходится на ее середину
+        character.inventory[f"Предмет {i}"] = 1
+    reported = 0
+    while True:
+        character.gold += 1
+        autosaver.request("hero", character.to_dict())
+        saved = autosaver.saved
+        if saved and saved[1]["gold"] > reported:
+            reported = saved[1]["gold"]
+            print(reported, flush=True)
+
+
+def crash_test(runs, binary=True, seed=0):
+    """Убить пишущий процесс в случайный момент runs раз; вернуть число запусков, после которых сохранение испорчено.
+
+    После каждого убийства слот должен читаться и быть не старше последней
+    записи, о которой процесс успел сообщить.
+    """
+    from RPGame import Character
+    rng = random.Random(seed)
+    directory = tempfile.mkdtemp(prefix="saves-crash-")
+    command = [sys.executable, os.path.abspath(__file__), "--crash-child", directory] + ([] if binary else ["--json"])
+    failures = leftovers = 0
+    try:
+        for run in range(1, runs + 1):
+            child = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+            confirmed = int(child.stdout.readline())
+            time.sleep(rng.uniform(0, 0.3))
+            child.kill()
+            for line in child.stdout:
+                confirmed = int(line)
+            child.wait()
+            interrupted = sum(name.startswith(".tmp-") for name in os.listdir(directory)) - leftovers
+            leftovers += interrupted
+            try:
+                store = SaveStore(directory, binary)
+                loaded = Character.from_dict(store.load("hero")).gold
+                ok = loaded >= confirmed and "hero" in store.load_index()
+            except Exception as e:
+                loaded, ok = repr(e), False
+            failures += not ok
+            print(f"Запуск {run:>3}: записано до {confirmed:>5}, загружено {loaded:>5}, "
+                  f"{'запись оборвана' if interrupted else 'между записями'}: {'OK' if ok else 'ОШИБКА'}")
+    finally:
+        shutil.rmtree(directory)
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Слоты сохранений: список или бенчмарк меню загрузки")
+    parser.add_argument("--dir", default=SAVE_DIR, help="каталог сохранений")
+    parser.add_argument("--bench", type=int, metavar="N", help="замер на N синтетических слотах")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="в бенчмарке и проверке писать слоты в JSON, а не в двоичном формате")
+    parser.add_argument("--compress", action="store_true", help="сжимать секции двоичных слотов")
+    parser.add_argument("--crash-test", type=int, metavar="N",
+                        help="N раз убить процесс посреди автосохранений и проверить, что слот читается")
+    parser.add_argument("--crash-child", metavar="DIR", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.crash_child:
+        crash_child(args.crash_child, not args.json)
+        return 0
+    if args.crash_test:
+        failures = crash_test(args.crash_test, not args.json)
+        print(f"\nИспорчено сохранений: {failures} из {args.crash_test}")
+        return 1 if failures else 0
+
+    if args.bench:
+        write, index, headers, full = benchmark(args.bench, args.rounds, not args.json, args.compress)
+        print(f"Запись слота (с индексом): {write * 1e3:>8.2f} мс")
+        print(f"Меню из индекса:           {index * 1e3:>8.2f} мс на {args.bench} слотов")
+        print(f"Заголовки из всех файлов:  {headers * 1e3:>8.2f} мс")
+        print(f"Загрузка всех сохранений:  {full * 1e3:>8.2f} мс")
+        return 0
+
+    for header in SaveStore(args.dir).slots():
+        saved_at = time.strftime("%Y-%m-%d %H:%M", time.localtime(header["saved_at"]))
+        print(f"{header['slot']:<24} {header['name']:<20} {header['char_class']:<8} "
+              f"ур. {header['level']:<3} {header['location']:<16} {saved_at}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
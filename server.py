@@ -0,0 +1,978 @@
+#!/usr/bin/env python3
+"""Игровой сервер: много игроков по telnet на одной машине, у каждого подключения своя сессия Game.
+
+    python server.py --port 4000                 # игроки: telnet localhost 4000
+    python server.py --port 4000 --workers 4     # сессии по 4 процессам за общим приемом
+    python server.py --load-test 1000            # нагрузочный прогон: 1000 клиентов, задержки ответов
+    python server.py --load-test 200 --scaling 4 # пропускная способность пула от 1 до 4 воркеров
+
+Сетевой ввод-вывод целиком в цикле asyncio, а игра каждого подключения идет
+в своем потоке: Game спрашивает игрока синхронно (ui.ask), и поток ждет строку
+от клиента, не занимая цикл. Вывод копится в буфере сессии и уходит клиенту
+одной записью на вопрос; медленный клиент тормозит только свою сессию.
+
+С --workers один цикл asyncio перестает быть пределом: сессии закрепляются
+по коду за процессами-воркерами (каждый со своим циклом и своей частью
+сохранений), а прием только пересылает байты.
+"""
+import argparse
+import asyncio
+import json
+import os
+import queue
+import random
+import re
+import secrets
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import savefile
+from renderer import ANSI_CODE, MESSAGES, PROMPTS, FastForward, TerminalRenderer, colored
+
+HOST = "127.0.0.1"
+PORT = 4000
+MAX_SESSIONS = 2000
+IDLE_TIMEOUT = 900.0       # Секунд без ввода, после которых подключение закрывается
+OUTPUT_LIMIT = 64 * 1024   # Байт неотправленного вывода, после которых сессия ждет клиента
+INPUT_BACKLOG = 64         # Строк, набранных наперед; дальше сервер перестает читать сокет
+REBALANCE_MARGIN = 8       # На сколько сессий воркер может быть загружен сильнее самого свободного
+ROUTES_FILE = "routes.json"
+ROUTES_INTERVAL = 1.0      # Секунд между записями таблицы маршрутов приема
+PIPE_CHUNK = 65536
+SLOT_LOCKS = 64            # Блокировок слотов в SharedStore: слоты с разными блокировками пишутся параллельно
+
+# Команды telnet: конец вопроса отмечается IAC GA, как у MUD-серверов, - клиент видит, что ход его
+IAC, SE, GA, SB, WILL, WONT, DO, DONT = 255, 240, 249, 250, 251, 252, 253, 254
+PROMPT_END = bytes([IAC, GA])
+
+
+def telnet_text(data):
+    """Строка ввода без команд telnet (IAC ...) и перевода строки"""
+    if IAC in data:
+        text = bytearray()
+        i = 0
+        while i < len(data):
+            if data[i] != IAC:
+                text.append(data[i])
+                i += 1
+                continue
+            command = data[i + 1] if i + 1 < len(data) else None
+            if command == IAC:
+                text.append(IAC)  # Экранированный байт 255
+                i += 2
+            elif command in (WILL, WONT, DO, DONT):
+                i += 3
+            elif command == SB:
+                end = data.find(bytes([IAC, SE]), i)
+                i = len(data) if end < 0 else end + 2
+            else:
+                i += 2
+        data = bytes(text)
+    return data.decode("utf-8", "replace").rstrip("\r\n\x00")
+
+
+class SharedStore:
+    """Хранилище сохранений (SaveStore или CharacterDB), общее для всех сессий.
+
+    Сессии и их автосохранения обращаются к нему из своих потоков. Вызовы
+    одного слота идут по очереди под его блокировкой (одной из SLOT_LOCKS по
+    хэшу слота), а разные слоты пишутся параллельно: fsync одной сессии не
+    задерживает остальные. Общие данные хранилища (индекс слотов, соединение
+    с базой) оно защищает само. Выданные free_slot слоты резервируются: два
+    новых персонажа с одним именем не получат один слот, даже если ни один
+    еще не сохранился.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.lock = threading.Lock()  # Резервирование слотов, перенос старого сохранения и закрытие
+        self.slot_locks = [threading.Lock() for _ in range(SLOT_LOCKS)]
+        self.reserved = set()
+
+    def slot_lock(self, slot):
+        return self.slot_locks[hash(slot) % SLOT_LOCKS]
+
+    def slots(self):
+        return self.store.slots()
+
+    def free_slot(self, name):
+        with self.lock:
+            slot = base = self.store.free_slot(name)
+            n = 2
+            while slot in self.reserved:
+                slot = self.store.free_slot(f"{base}_{n}")
+                n += 1
+            self.reserved.add(slot)
+            return slot
+
+    def save(self, slot, data):
+        with self.slot_lock(slot):
+            return self.store.save(slot, data)
+
+    def record(self, slot, data):
+        with self.slot_lock(slot):
+            return self.store.record(slot, data)
+
+    def load(self, slot):
+        with self.slot_lock(slot):
+            return self.store.load(slot)
+
+    def import_file(self, path):
+        with self.lock:
+            return self.store.import_file(path)
+
+    def export(self, slot):
+        """Персонаж слота в двоичном формате сохранения (для переноса на другой воркер); None, если слота нет"""
+        with self.slot_lock(slot):
+            try:
+                data = self.store.load(slot)
+            except (FileNotFoundError, LookupError):
+                return None
+        return savefile.encode(data)
+
+    def import_character(self, slot, blob):
+        """Записать в слот персонажа, перенесенного с другого воркера"""
+        data = savefile.SaveFile(blob).to_dict()
+        data.pop("journal_seq", None)  # Номер журнала прежнего хранилища здесь ничего не значит
+        with self.slot_lock(slot):
+            self.store.save(slot, data)
+
+    def delete(self, slot):
+        with self.slot_lock(slot):
+            self.store.delete(slot)
+
+    def release(self, slot):
+        with self.slot_lock(slot):
+            self.store.release(slot)
+
+    def close(self):
+        """Game.close закрывает хранилище своей сессии; общее закрывает сервер (shutdown)"""
+
+    def shutdown(self):
+        with self.lock:
+            self.store.close()
+
+
+class SessionSlot:
+    """Хранилище сессии воркера: первый новый персонаж сессии получает слот с ее кодом.
+
+    По этому слоту сессия продолжается при следующем входе с тем же кодом и
+    переносится на другой воркер. Остальное - как у общего хранилища.
+    """
+
+    def __init__(self, store, code, taken=False):
+        self.store = store
+        self.code = code
+        self.taken = taken  # Слот кода уже занят персонажем сессии
+
+    def free_slot(self, name):
+        if self.taken:
+            return self.store.free_slot(name)
+        self.taken = True
+        return self.code
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+
+class SessionStream:
+    """Поток вывода TerminalRenderer для сессии: текст копится и уходит клиенту при flush"""
+
+    def __init__(self, session):
+        self.session = session
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append(text)
+
+    def flush(self, prompt=False):
+        if not self.parts and not prompt:
+            return
+        data = "".join(self.parts).replace("\n", "\r\n").encode("utf-8")
+        self.parts = []
+        self.session.send(data + PROMPT_END if prompt else data)
+
+    def isatty(self):
+        return False  # FastForward не переводит "терминал" в посимвольный режим
+
+
+class SessionRenderer(TerminalRenderer):
+    """TerminalRenderer подключения: вывод - в буфер сессии, ответы - строки от клиента"""
+
+    def __init__(self, session, time_scale=0.0):
+        stream = SessionStream(session)
+        super().__init__(stream, time_scale, FastForward(stream))
+        self.session = session
+
+    def ask(self, prompt, **data):
+        self.keys.release()
+        self.out(self.prompt_text(prompt, data), end="")
+        self.stream.flush(prompt=True)
+        return self.session.read_line()
+
+
+class Session:
+    """Подключение игрока: цикл asyncio читает строки в очередь, поток игры забирает их в ask"""
+
+    def __init__(self, server, reader, writer, code=None):
+        self.server = server
+        self.code = code  # Код сессии, если подключение пришло через прием пула воркеров
+        self.loop = server.loop
+        self.reader = reader
+        self.writer = writer
+        self.lines = queue.Queue()
+        self.room = asyncio.Semaphore(INPUT_BACKLOG)  # Свободные места в очереди строк
+        self.writable = threading.Event()  # Сброшен, пока клиент не забрал вывод сверх OUTPUT_LIMIT
+        self.writable.set()
+        self.eof = False
+        writer.transport.set_write_buffer_limits(high=OUTPUT_LIMIT)
+
+    # Поток игры
+    def play(self):
+        from RPGame import Character, Game
+        ui = SessionRenderer(self, self.server.time_scale)
+        store = self.server.store
+        data = None
+        if self.code:
+            try:
+                data = store.load(self.code)
+            except (FileNotFoundError, LookupError):
+                pass  # Новая сессия
+            store = SessionSlot(store, self.code, taken=data is not None)
+        game = Game(ui, autosave=self.server.autosave, store=store)
+        try:
+            if data:  # Сессия продолжается: сразу в игру персонажем из слота кода
+                game.use_character(Character.from_dict(data))
+                game.slot = self.code
+                ui.emit("loaded")
+                ui.pause()
+                game.game_loop()
+            game.main_menu()
+        except EOFError:
+            pass  # Клиент отключился
+        except Exception as e:
+            ui.emit("crashed", error=str(e))
+            print(f"Сессия {self.peer()}: {e!r}", file=sys.stderr)
+        finally:
+            game.close()
+            if not self.eof:
+                ui.emit("farewell")
+            ui.close()
+
+    def send(self, data):
+        """Отдать вывод циклу; после остановки сервера писать уже некуда"""
+        try:
+            self.loop.call_soon_threadsafe(self.write, data)
+        except RuntimeError:
+            pass
+
+    def read_line(self):
+        """Следующая строка клиента; EOFError, если он отключился"""
+        if self.eof:
+            raise EOFError
+        self.writable.wait()
+        line = self.lines.get()
+        if line is None:
+            self.eof = True  # Повторные вопросы после отключения тоже получают EOFError
+            raise EOFError
+        try:
+            self.loop.call_soon_threadsafe(self.room.release)
+        except RuntimeError:
+            pass
+        return line
+
+    # Цикл asyncio
+    def write(self, data):
+        if self.writer.is_closing():
+            return
+        self.writer.write(data)
+        if self.writable.is_set() and self.writer.transport.get_write_buffer_size() > OUTPUT_LIMIT:
+            self.writable.clear()
+            self.loop.create_task(self.drain())
+
+    async def drain(self):
+        try:
+            await self.writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.writable.set()
+
+    async def read_input(self):
+        try:
+            while True:
+                await self.room.acquire()
+                line = await asyncio.wait_for(self.reader.readline(), self.server.idle_timeout)
+                if not line:
+                    break
+                self.lines.put(telnet_text(line))
+        except asyncio.TimeoutError:
+            self.write("\r\nНет ввода слишком долго - соединение закрыто.\r\n".encode("utf-8"))
+        except (ConnectionError, ValueError):
+            pass  # Обрыв связи или строка длиннее буфера чтения
+        finally:
+            self.disconnect()
+
+    def disconnect(self):
+        """Разбудить поток игры: следующий вопрос получит EOFError"""
+        self.lines.put(None)
+        self.writable.set()
+
+    def peer(self):
+        peer = self.writer.get_extra_info("peername")
+        return f"{peer[0]}:{peer[1]}" if peer else "?"
+
+
+class GameServer:
+    """Прием подключений и сессии игроков"""
+
+    def __init__(self, store, max_sessions=MAX_SESSIONS, autosave=True, time_scale=0.0, idle_timeout=IDLE_TIMEOUT,
+                 worker=False):
+        self.store = SharedStore(store)
+        self.worker = worker  # Подключения приходят от приема пула (Front) и начинаются строкой команды
+        self.max_sessions = max_sessions
+        self.autosave = autosave
+        self.time_scale = time_scale
+        self.idle_timeout = idle_timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_sessions, thread_name_prefix="session")
+        self.sessions = set()
+        self.playing = {}  # Код сессии -> asyncio.Event, который сработает, когда ее игра закончится
+        self.loop = None
+        self.served = 0
+
+    async def serve(self, host, port):
+        self.loop = asyncio.get_running_loop()
+        server = await asyncio.start_server(self.handle, host, port, backlog=self.max_sessions)
+        address = server.sockets[0].getsockname()
+        print(f"Сервер слушает {address[0]}:{address[1]}, сессий до {self.max_sessions}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+    async def handle(self, reader, writer):
+        code = None
+        if self.worker:
+            try:
+                command, code, *args = (await reader.readline()).decode("utf-8").split()
+            except (ValueError, ConnectionError):
+                writer.close()
+                return
+            # Прежнее подключение сессии могло еще не дописать автосохранение
+            while code in self.playing:
+                await self.playing[code].wait()
+            if command != "PLAY":
+                await self.transfer(command, code, args, reader, writer)
+                return
+        if len(self.sessions) >= self.max_sessions:
+            writer.write("Сервер заполнен, попробуйте позже.\r\n".encode("utf-8"))
+            writer.close()
+            return
+        session = Session(self, reader, writer, code)
+        self.sessions.add(session)
+        if code:
+            self.playing[code] = asyncio.Event()
+        self.served += 1
+        reading = asyncio.create_task(session.read_input())
+        try:
+            await self.loop.run_in_executor(self.executor, session.play)
+        except asyncio.CancelledError:
+            session.disconnect()  # Сервер останавливается: игру сессии дождется shutdown
+        finally:
+            reading.cancel()
+            self.sessions.discard(session)
+            if code:
+                self.playing.pop(code).set()
+            try:
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def transfer(self, command, code, args, reader, writer):
+        """Перенос персонажа сессии между воркерами: EXPORT отдает его в формате сохранения, IMPORT принимает, DROP удаляет"""
+        try:
+            if command == "EXPORT":
+                blob = await self.loop.run_in_executor(None, self.store.export, code)
+                writer.write(b"NONE\r\n" if blob is None else f"OK {len(blob)}\r\n".encode("ascii") + blob)
+            elif command == "IMPORT":
+                blob = await reader.readexactly(int(args[0]))
+                await self.loop.run_in_executor(None, self.store.import_character, code, blob)
+                writer.write(b"OK\r\n")
+            elif command == "DROP":
+                await self.loop.run_in_executor(None, self.store.delete, code)
+                writer.write(b"OK\r\n")
+            else:
+                raise ValueError(f"неизвестная команда {command!r}")
+            await writer.drain()
+        except Exception as e:
+            print(f"{command} {code}: {e!r}", file=sys.stderr)
+            writer.write(f"ERROR {e}\r\n".encode("utf-8"))
+        finally:
+            writer.close()
+
+    def shutdown(self):
+        """Отключить всех (сессии допишут автосохранения) и закрыть хранилище"""
+        for session in list(self.sessions):
+            session.disconnect()
+        self.executor.shutdown(wait=True)
+        self.store.shutdown()
+
+
+# Пул воркеров: прием (Front) и процессы server.py --worker, у каждого своя часть сохранений
+async def pipe(reader, writer):
+    """Пересылать байты, пока reader не закроется, затем закрыть writer"""
+    try:
+        while True:
+            data = await reader.read(PIPE_CHUNK)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+class Front:
+    """Прием подключений для пула воркеров: сессия закреплена за воркером по коду.
+
+    Прием спрашивает код сессии, выбирает воркер - тот же, что в прошлый раз,
+    или наименее загруженный для новой - и дальше только пересылает байты.
+    Если закрепленный воркер перегружен или его больше нет в пуле, персонаж
+    сессии переносится на другой в формате сохранения (savefile).
+    """
+
+    def __init__(self, workers, routes_file, open_shard, idle_timeout=IDLE_TIMEOUT):
+        self.workers = workers          # [(хост, порт)] воркеров
+        self.load = [0] * len(workers)  # Открытых сессий на каждом
+        self.routes_file = routes_file
+        self.routes = self.read_routes()  # Код сессии -> номер воркера
+        self.owned = [0] * len(workers)   # Закрепленных сессий на каждом: новые идут туда, где их меньше
+        for worker in self.routes.values():
+            if worker < len(workers):
+                self.owned[worker] += 1
+        self.open_shard = open_shard    # Номер -> хранилище части воркера (для частей вне пула)
+        self.orphans = {}               # Номер -> SharedStore части вне пула
+        self.idle_timeout = idle_timeout
+        self.active = set()  # Коды открытых сессий
+        self.dirty = False   # routes изменились после записи
+        self.loop = None
+        self.moved = 0
+
+    def read_routes(self):
+        try:
+            with open(self.routes_file, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def write_routes(self, routes):
+        from saves import atomic_write
+        atomic_write(self.routes_file, json.dumps(routes).encode("utf-8"))
+
+    async def keep_routes(self):
+        """Записывать таблицу маршрутов, если она изменилась, не чаще раза в ROUTES_INTERVAL"""
+        while True:
+            await asyncio.sleep(ROUTES_INTERVAL)
+            if self.dirty:
+                self.dirty = False
+                await self.loop.run_in_executor(None, self.write_routes, dict(self.routes))
+
+    async def serve(self, host, port):
+        self.loop = asyncio.get_running_loop()
+        server = await asyncio.start_server(self.handle, host, port, backlog=4096)
+        address = server.sockets[0].getsockname()
+        print(f"Прием слушает {address[0]}:{address[1]}, воркеров {len(self.workers)}", flush=True)
+        saving = asyncio.create_task(self.keep_routes())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            saving.cancel()
+
+    def text(self, kind, prompt=False, **data):
+        """Сообщение (MESSAGES) или вопрос (PROMPTS) приема в байтах для клиента"""
+        template, color = (PROMPTS if prompt else MESSAGES)[kind][:2]
+        text = template.format(**data) if data else template
+        text = colored(text, color) if color else text
+        if prompt:
+            return text.replace("\n", "\r\n").encode("utf-8") + PROMPT_END
+        return (text + "\n").replace("\n", "\r\n").encode("utf-8")
+
+    def pick(self, code):
+        """(воркер для сессии, воркер, с которого перенести ее персонажа, или None)"""
+        best = min(range(len(self.workers)), key=lambda worker: (self.load[worker], self.owned[worker]))
+        worker = self.routes.get(code)
+        if worker is None:
+            return best, None
+        if worker >= len(self.workers) or self.load[worker] > self.load[best] + REBALANCE_MARGIN:
+            return best, worker
+        return worker, None
+
+    async def request(self, worker, line, payload=b""):
+        """Команда переноса воркеру: данные ответа OK, None на NONE"""
+        reader, writer = await asyncio.open_connection(*self.workers[worker])
+        try:
+            writer.write(line.encode("utf-8") + b"\r\n" + payload)
+            status, *rest = (await reader.readline()).decode("utf-8").split(maxsplit=1)
+            if status == "NONE":
+                return None
+            if status != "OK":
+                raise RuntimeError(f"воркер {worker}: {line.split()[0]}: {' '.join(rest)}")
+            return await reader.readexactly(int(rest[0])) if rest else b""
+        finally:
+            writer.close()
+
+    async def move(self, code, source, target):
+        """Перенести персонажа сессии с воркера source на target: копия, запись на новом месте, удаление на старом"""
+        if source < len(self.workers):
+            blob = await self.request(source, f"EXPORT {code}")
+        else:
+            orphan = self.orphans.get(source)
+            if orphan is None:
+                orphan = self.orphans[source] = SharedStore(self.open_shard(source))
+            blob = await self.loop.run_in_executor(None, orphan.export, code)
+        if blob is not None:
+            await self.request(target, f"IMPORT {code} {len(blob)}", blob)
+            if source < len(self.workers):
+                await self.request(source, f"DROP {code}")
+            else:
+                await self.loop.run_in_executor(None, orphan.delete, code)
+            self.moved += 1
+
+    async def handle(self, reader, writer):
+        try:
+            writer.write(self.text("session_code", prompt=True))
+            line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+        except (asyncio.TimeoutError, ConnectionError):
+            line = b""
+        if not line:
+            writer.close()
+            return
+        code = telnet_text(line).strip().lower()
+        if code in self.active:
+            writer.write(self.text("session_busy", code=code))
+            writer.close()
+            return
+        if code not in self.routes:  # Пустой или незнакомый код - новая сессия
+            code = secrets.token_hex(4)
+            while code in self.routes:
+                code = secrets.token_hex(4)
+            writer.write(self.text("session_new", code=code))
+        self.active.add(code)
+        try:
+            worker, source = self.pick(code)
+            if source is not None:
+                try:
+                    await self.move(code, source, worker)
+                except Exception as e:
+                    print(f"Перенос сессии {code}: {e!r}", file=sys.stderr)
+                    if source < len(self.workers):
+                        worker = source  # Персонаж остался на прежнем воркере
+            previous = self.routes.get(code)
+            if previous != worker:
+                if previous is not None and previous < len(self.workers):
+                    self.owned[previous] -= 1
+                self.owned[worker] += 1
+                self.routes[code] = worker
+                self.dirty = True
+            self.load[worker] += 1
+            try:
+                await self.relay(reader, writer, worker, code)
+            finally:
+                self.load[worker] -= 1
+        except (ConnectionError, asyncio.CancelledError):
+            pass  # Клиент или воркер оборвал связь, или прием останавливается
+        finally:
+            self.active.discard(code)
+            writer.close()
+
+    async def relay(self, reader, writer, worker, code):
+        """Пересылать байты между клиентом и воркером, пока одна из сторон не закроет подключение"""
+        worker_reader, worker_writer = await asyncio.open_connection(*self.workers[worker])
+        worker_writer.write(f"PLAY {code}\r\n".encode("utf-8"))
+        tasks = [asyncio.create_task(pipe(reader, worker_writer)), asyncio.create_task(pipe(worker_reader, writer))]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            worker_writer.close()
+
+    def shutdown(self):
+        self.write_routes(self.routes)
+        for orphan in self.orphans.values():
+            orphan.shutdown()
+
+
+def shard_args(args, number):
+    """Аргументы хранилища воркера number: своя папка в --saves или своя база рядом с --db"""
+    if args.db:
+        root, ext = os.path.splitext(args.db)
+        return ["--db", f"{root}-{number}{ext}"]
+    from saves import SAVE_DIR
+    return ["--saves", os.path.join(args.saves or SAVE_DIR, f"worker-{number}")]
+
+
+def open_shard(args, number):
+    """Хранилище части воркера number в этом процессе (для частей, оставшихся вне пула)"""
+    kind, path = shard_args(args, number)
+    if kind == "--db":
+        from database import CharacterDB
+        return CharacterDB(path)
+    from saves import SaveStore
+    return SaveStore(path)
+
+
+def start_workers(args, count):
+    """Запустить count воркеров на свободных портах; [(процесс, порт)], когда все слушают"""
+    workers = []
+    for number in range(count):
+        port = free_port(HOST)
+        command = [sys.executable, os.path.abspath(__file__), "--worker", "--host", HOST, "--port", str(port),
+                   "--max-sessions", str(args.max_sessions), "--idle-timeout", str(args.idle_timeout),
+                   "--time-scale", str(args.time_scale), *shard_args(args, number)]
+        if args.no_autosave:
+            command.append("--no-autosave")
+        workers.append((subprocess.Popen(command, stdout=subprocess.DEVNULL), port))
+    for process, port in workers:
+        wait_listening(HOST, port, process)
+    return workers
+
+
+def stop_workers(workers):
+    """SIGTERM воркерам: они отключают сессии и дописывают автосохранения"""
+    for process, _ in workers:
+        if process.poll() is None:
+            process.terminate()
+    for process, _ in workers:
+        try:
+            process.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def run_pool(args):
+    """Прием на args.port и args.workers воркеров за ним"""
+    if args.db:
+        routes_file = os.path.splitext(args.db)[0] + "-" + ROUTES_FILE
+    else:
+        from saves import SAVE_DIR
+        os.makedirs(args.saves or SAVE_DIR, exist_ok=True)
+        routes_file = os.path.join(args.saves or SAVE_DIR, ROUTES_FILE)
+    workers = start_workers(args, args.workers)
+    front = Front([(HOST, port) for _, port in workers], routes_file,
+                  lambda number: open_shard(args, number), args.idle_timeout)
+    try:
+        asyncio.run(front.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_workers(workers)
+        front.shutdown()
+        print(f"Прием остановлен, сессий перенесено: {front.moved}", flush=True)
+    return 0
+
+
+# Нагрузочный прогон: клиенты-боты отвечают на вопросы по тексту подсказки
+def prompt_patterns():
+    """[(вид, регулярное выражение последней строки вопроса)]: сначала вопросы без подстановок"""
+    patterns = []
+    for kind, (template, _) in PROMPTS.items():
+        line = template.split("\n")[-1]
+        parts = re.split(r"\{\w+\}", line)
+        patterns.append((len(parts) > 1, kind, re.compile(".*?".join(map(re.escape, parts)))))
+    return [(kind, pattern) for _, kind, pattern in sorted(patterns, key=lambda entry: entry[0])]
+
+
+PROMPT_PATTERNS = prompt_patterns()
+BOT_MENU = "1111134567238"  # Пункты меню игры; без "9", чтобы бот не выходил сам
+
+
+def prompt_kind(text):
+    """Вид вопроса (ключ PROMPTS) по выводу до IAC GA"""
+    line = ANSI_CODE.sub("", text).split("\n")[-1]
+    for kind, pattern in PROMPT_PATTERNS:
+        if pattern.fullmatch(line):
+            return kind
+    return None
+
+
+def bot_answer(kind, number, rng):
+    if kind == "game_menu":
+        return rng.choice(BOT_MENU)
+    if kind == "character_name":
+        return f"Бот{number}"
+    if kind == "combat_action":
+        return rng.choice("112")
+    if kind == "choice":
+        return rng.choice("ннн12")  # Чаще выйти из подменю, иногда путешествие или неверный выбор
+    if kind in ("main_menu", "character_class", "buy_number", "quest_number", "item_number"):
+        return "1"
+    if kind in ("potion", "sell_number", "slot_number"):
+        return "0"
+    if kind and kind.startswith("confirm"):
+        return "д"
+    if kind == "quest_choice":
+        return "п"
+    return ""
+
+
+def message_pattern(kind):
+    """Регулярное выражение сообщения MESSAGES с именованными группами вместо подстановок"""
+    parts = re.split(r"\{(\w+)\}", MESSAGES[kind][0])
+    return re.compile("".join(re.escape(part) if i % 2 == 0 else f"(?P<{part}>\\w+)" for i, part in enumerate(parts)))
+
+
+SESSION_NEW = message_pattern("session_new")
+
+
+async def read_prompt(reader):
+    """Вывод сервера до конца следующего вопроса, без ANSI-кодов и IAC GA"""
+    data = await reader.readuntil(PROMPT_END)
+    return ANSI_CODE.sub("", data[:-len(PROMPT_END)].decode("utf-8", "replace").replace("\r\n", "\n"))
+
+
+async def reconnect(host, port, code, attempts=100):
+    """Войти снова с кодом сессии: (reader, writer, вывод после кода); прием мог еще не заметить прошлый выход"""
+    for _ in range(attempts):
+        reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+        await read_prompt(reader)
+        writer.write(f"{code}\r\n".encode("utf-8"))
+        try:
+            return reader, writer, await read_prompt(reader)
+        except asyncio.IncompleteReadError:  # Сессия занята: прием ответил и закрыл подключение
+            writer.close()
+            await asyncio.sleep(0.05)
+    raise RuntimeError(f"сессия {code} так и осталась занятой")
+
+
+async def bot_client(number, host, port, actions, think, rng, latencies):
+    """Один игрок: новый персонаж и actions ходов из меню игры; (время подключения, ответов).
+
+    Через прием пула бот на середине выходит и входит снова со своим кодом
+    сессии - персонаж должен продолжиться на том же воркере.
+    """
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+    text = await read_prompt(reader)
+    connected = time.perf_counter() - start
+    code = None
+    answered = turns = 0
+    try:
+        while turns < actions:
+            kind = prompt_kind(text)
+            if kind == "game_menu":
+                turns += 1
+                if code and turns == actions // 2 + 1:
+                    writer.close()
+                    sent = time.perf_counter()
+                    reader, writer, text = await reconnect(host, port, code)
+                    latencies.append(time.perf_counter() - sent)
+                    answered += 1
+                    continue
+            if think:
+                await asyncio.sleep(rng.uniform(0, think))
+            sent = time.perf_counter()
+            writer.write((bot_answer(kind, number, rng) + "\r\n").encode("utf-8"))
+            text = await read_prompt(reader)
+            latencies.append(time.perf_counter() - sent)
+            answered += 1
+            if code is None and kind == "session_code":
+                code = SESSION_NEW.search(text)["code"]
+    finally:
+        writer.close()
+    return connected, answered
+
+
+async def run_clients(clients, host, port, actions, think, seed):
+    latencies = []
+    rng = random.Random(seed)
+    tasks = [bot_client(n, host, port, actions, think, random.Random(rng.random()), latencies)
+             for n in range(1, clients + 1)]
+    start = time.perf_counter()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    return results, latencies, time.perf_counter() - start
+
+
+def free_port(host):
+    with socket.socket() as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
+
+
+def wait_listening(host, port, process, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"сервер завершился с кодом {process.returncode}")
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("сервер не начал слушать порт")
+
+
+def peak_rss_kb(pid):
+    """Сумма пиковой памяти процесса и его дочерних (воркеров) по VmHWM, только Linux; или None"""
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            pids = [pid, *map(int, f.read().split())]
+    except OSError:
+        pids = [pid]
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+        except (OSError, StopIteration):
+            return None
+    return total
+
+
+def percentile(values, share):
+    return values[min(len(values) - 1, int(share * len(values)))]
+
+
+def run_load(clients, actions, think, seed, host=HOST, workers=0):
+    """Поднять сервер (workers > 0 - прием с пулом воркеров) отдельным процессом с временной папкой
+    сохранений и прогнать clients ботов сразу; словарь результатов для report"""
+    directory = tempfile.mkdtemp(prefix="server-load-")
+    port = free_port(host)
+    command = [sys.executable, os.path.abspath(__file__), "--host", host, "--port", str(port),
+               "--saves", directory, "--max-sessions", str(clients + 16)]
+    if workers:
+        command += ["--workers", str(workers)]
+    log = open(os.path.join(directory, "server.log"), "w+", encoding="utf-8")
+    process = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        wait_listening(host, port, process, timeout=30.0 + 5 * workers)
+        results, latencies, elapsed = asyncio.run(run_clients(clients, host, port, actions, think, seed))
+        rss = peak_rss_kb(process.pid)
+    finally:
+        process.send_signal(signal.SIGINT if os.name != "nt" else signal.SIGTERM)
+        try:
+            process.wait(timeout=120)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        log.seek(0)
+        server_log = log.read()
+        log.close()
+        shutil.rmtree(directory, ignore_errors=True)
+    latencies.sort()
+    return {"clients": clients, "actions": actions, "think": think, "workers": workers,
+            "failures": [result for result in results if isinstance(result, BaseException)],
+            "connects": sorted(result[0] for result in results if not isinstance(result, BaseException)),
+            "latencies": latencies, "elapsed": elapsed, "rss_kb": rss,
+            "returncode": process.returncode, "log": server_log}
+
+
+def report(run):
+    """Напечатать результаты run_load; код выхода: 1 при ошибках клиентов или сервера"""
+    latencies, connects, failures = run["latencies"], run["connects"], run["failures"]
+    pool = f", воркеров: {run['workers']}" if run["workers"] else ""
+    print(f"Клиентов: {run['clients']}, ходов меню на клиента: {run['actions']}, "
+          f"думать до {run['think'] * 1e3:.0f} мс{pool}")
+    print(f"Успешных сессий: {len(connects)}, ошибок: {len(failures)}")
+    for error in sorted({repr(failure) for failure in failures})[:5]:
+        print(f"  {error}")
+    if latencies:
+        print(f"Ответов: {len(latencies)} за {run['elapsed']:.1f} с ({len(latencies) / run['elapsed']:.0f}/с)")
+        print("Задержка ответа: " + ", ".join(f"p{int(share * 100)} {percentile(latencies, share) * 1e3:.1f} мс"
+                                              for share in (0.5, 0.9, 0.99)) + f", макс {latencies[-1] * 1e3:.1f} мс")
+    if connects:
+        print(f"Подключение до первого вопроса: p50 {percentile(connects, 0.5) * 1e3:.1f} мс, "
+              f"p99 {percentile(connects, 0.99) * 1e3:.1f} мс")
+    if run["rss_kb"]:
+        print(f"Пиковая память сервера: {run['rss_kb'] / 1024:.1f} МБ")
+    if run["returncode"]:
+        print(f"Сервер завершился с кодом {run['returncode']}:\n{run['log'][-2000:]}")
+    return 1 if failures or run["returncode"] else 0
+
+
+def scaling(clients, actions, seed, max_workers, host=HOST):
+    """Пропускная способность без пауз ботов: один процесс, затем пул из 1, 2, 4... max_workers воркеров"""
+    counts = sorted({min(2 ** power, max_workers) for power in range(max_workers.bit_length() + 1)})
+    print(f"Клиентов: {clients}, ходов меню на клиента: {actions}, без пауз; ядер: {os.cpu_count()}")
+    print(f"{'Воркеров':<10} {'Ответов/с':>10} {'Ускорение':>10} {'p50':>10} {'p99':>10} {'Ошибок':>7}")
+    base = None
+    status = 0
+    for workers in [0, *counts]:
+        run = run_load(clients, actions, 0.0, seed, host, workers)
+        status |= 1 if run["failures"] or run["returncode"] else 0
+        latencies = run["latencies"]
+        throughput = len(latencies) / run["elapsed"]
+        if workers == 1:
+            base = throughput  # Масштабирование считается от пула из одного воркера
+        speedup = f"{throughput / base:.2f}x" if base else "-"
+        p50, p99 = (f"{percentile(latencies, share) * 1e3:.0f} мс" if latencies else "-" for share in (0.5, 0.99))
+        print(f"{workers or 'без пула':<10} {throughput:>10.0f} {speedup:>10} {p50:>10} {p99:>10} "
+              f"{len(run['failures']):>7}", flush=True)
+    return status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сервер игры по telnet: отдельная сессия на каждое подключение")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--saves", metavar="DIR", help="папка сохранений (по умолчанию saves/)")
+    parser.add_argument("--db", metavar="PATH", help="хранить персонажей в базе SQLite вместо папки")
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS, help="сессий на процесс (воркер)")
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT, help="секунд без ввода до отключения")
+    parser.add_argument("--time-scale", type=float, default=0.0, help="множитель анимаций (по сети обычно 0)")
+    parser.add_argument("--no-autosave", action="store_true")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="распределить сессии по N процессам-воркерам за общим приемом (0 - один процесс)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)  # Процесс пула, запускает прием
+    parser.add_argument("--load-test", type=int, metavar="CLIENTS", help="нагрузочный прогон с CLIENTS ботами")
+    parser.add_argument("--scaling", type=int, metavar="N",
+                        help="с --load-test: пропускная способность пула от 1 до N воркеров без пауз ботов")
+    parser.add_argument("--actions", type=int, default=10, help="ходов меню на бота")
+    parser.add_argument("--think", type=float, default=3.0,
+                        help="случайная пауза бота перед ответом, до N секунд (0 - нагрузка на пределе)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    if args.load_test and args.scaling:
+        return scaling(args.load_test, args.actions, args.seed, args.scaling, args.host)
+    if args.load_test:
+        return report(run_load(args.load_test, args.actions, args.think, args.seed, args.host, args.workers))
+
+    os.environ.setdefault("FORCE_COLOR", "1")  # Цвета нужны клиентам telnet, а не stdout сервера (NO_COLOR сильнее)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)  # SIGTERM завершает так же, как Ctrl+C
+    if args.workers:
+        return run_pool(args)
+    if args.worker:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C в терминале получает и воркер; останавливает его прием
+
+    from banners import BANNERS
+    BANNERS.size = max(BANNERS.size, args.max_sessions)  # Баннер с именем на каждого игрока
+    if args.db:
+        from database import CharacterDB
+        store = CharacterDB(args.db)
+    else:
+        from saves import SaveStore
+        store = SaveStore(args.saves) if args.saves else SaveStore()
+    server = GameServer(store, args.max_sessions, autosave=not args.no_autosave,
+                        time_scale=args.time_scale, idle_timeout=args.idle_timeout, worker=args.worker)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        print(f"Сервер остановлен, сессий обслужено: {server.served}", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
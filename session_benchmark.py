@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""Бенчмарк целой игровой сессии: RPGame.py по сценарию без анимаций, сравнение с сохраненным базовым прогоном"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+GAME = os.path.join(ROOT, "RPGame.py")
+BASELINE_FILE = os.path.join(ROOT, "session_baseline.json")
+RESULTS_DIR = "session_results"
+RESULTS_FORMAT = 1
+DEFAULT_THRESHOLD = 0.15  # Целая сессия шумит сильнее микробенчмарков
+METRICS = ("wall", "cpu", "rss_kb", "stdout_bytes")
+TIMES = ("wall", "cpu")  # Остальные метрики от запуска к запуску почти не меняются
+
+# Ответы на вопросы, не зависящие от места в сценарии; паузы и прочее - пустая строка
+ANSWERS = {"character_name": "Бенчмарк", "character_class": "1", "combat_action": "1", "potion": "0",
+           "buy_number": "1", "confirm_sell": "д", "confirm_rest": "д", "quest_choice": "п", "quest_number": "1",
+           "slot_number": "1", "confirm_exit": "д", "confirm_exit_autosave": "д"}
+
+
+def plan(explore):
+    """Визиты в меню игры: (пункт, ответы на вопросы "choice" внутри него)"""
+    first = explore // 2
+    return ([("1", [])] * first                  # Исследовать: находки и бои
+            + [("3", ["к", "н"])]               # Магазин: купить первый товар и выйти
+            + [("2", ["2"])]                     # Путешествие во вторую локацию
+            + [("1", [])] * (explore - first)
+            + [("2", ["1"]), ("7", []), ("4", ["н"]), ("6", []), ("8", []), ("9", [])]  # Домой, отдых, сохранение
+            + [("1", [])] * 2 + [("9", [])])     # После загрузки сохранения
+
+
+class SessionScript:
+    """Ответы на вопросы игры: новый персонаж, сценарий plan, выход, загрузка сохранения, еще немного игры и выход"""
+
+    def __init__(self, explore):
+        self.main = iter(["1", "2", "3"])
+        self.visits = iter(plan(explore))
+        self.choices = iter(())
+        self.answers = []
+
+    def __call__(self, prompt, **data):
+        if prompt == "main_menu":
+            answer = next(self.main, "3")
+        elif prompt == "game_menu":
+            answer, choices = next(self.visits, ("9", []))
+            self.choices = iter(choices)
+        elif prompt == "choice":
+            answer = next(self.choices, "н")
+        else:
+            answer = ANSWERS.get(prompt, "")
+        self.answers.append(answer)
+        return answer
+
+
+def script_answers(explore, seed):
+    """(весь ввод сессии по порядку, итоговый персонаж): сценарий проигрывается без экрана с тем же зерном, что и замер"""
+    from RPGame import Game
+    from renderer import NullRenderer
+    script = SessionScript(explore)
+    directory = tempfile.mkdtemp(prefix="session-script-")
+    cwd = os.getcwd()
+    os.chdir(directory)  # Как у замеряемой игры: пустая папка сохранений, без старого rpg_save_russian.json
+    try:
+        game = Game(NullRenderer(script), seed=seed)
+        game.main_menu()
+        game.close()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory)
+    return script.answers, (game.slot, game.character.to_dict())
+
+
+def run_game(answers, seed, expected=None):
+    """Один запуск RPGame.py с ответами на stdin: {метрика: значение}.
+
+    expected - (слот, персонаж) из script_answers: сохранение игры должно с ним
+    совпасть, иначе замеряется не та сессия.
+    """
+    command = [sys.executable, GAME, "--fast-start", "--time-scale", "0", "--seed", str(seed)]
+    directory = tempfile.mkdtemp(prefix="session-run-")
+    try:
+        start = time.perf_counter()
+        child = subprocess.Popen(command, cwd=directory, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                 stderr=subprocess.DEVNULL)
+        feeder = threading.Thread(target=feed, args=(child.stdin, answers))
+        feeder.start()
+        written = 0
+        while True:
+            chunk = child.stdout.read(65536)
+            if not chunk:
+                break
+            written += len(chunk)
+        feeder.join()
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(child.pid, 0)
+            child.returncode = os.waitstatus_to_exitcode(status)
+            cpu, rss = usage.ru_utime + usage.ru_stime, usage.ru_maxrss
+            if sys.platform == "darwin":
+                rss //= 1024  # macOS отдает байты, Linux - килобайты
+        else:
+            child.wait()  # Windows: без rusage дочернего процесса
+            cpu = rss = None
+        wall = time.perf_counter() - start
+        child.stdout.close()
+        if expected:
+            from saves import SaveStore
+            slot, state = expected
+            if SaveStore(os.path.join(directory, "saves")).load(slot) != state:
+                raise RuntimeError("игра разошлась со сценарием: итоговое сохранение не совпадает")
+    finally:
+        shutil.rmtree(directory)
+    if child.returncode:
+        raise RuntimeError(f"игра завершилась с кодом {child.returncode}")
+    return {"wall": wall, "cpu": cpu, "rss_kb": rss, "stdout_bytes": written}
+
+
+def feed(stream, answers):
+    try:
+        stream.write("".join(answer + "\n" for answer in answers).encode("utf-8"))
+        stream.close()
+    except BrokenPipeError:
+        pass  # Игра вышла раньше, чем дочитала ввод - расхождение покажет размер вывода
+
+
+def summarize(runs):
+    """{метрика: {"best", "median"}} по запускам"""
+    summary = {}
+    for metric in METRICS:
+        values = sorted(run[metric] for run in runs if run[metric] is not None)
+        if values:
+            summary[metric] = {"best": values[0], "median": values[len(values) // 2]}
+    return summary
+
+
+def benchmark(explore, seed, runs):
+    """Результаты сценариев "запуск" (сразу выход) и "сессия" по runs запусков каждый"""
+    answers, expected = script_answers(explore, seed)
+    results = {"format": RESULTS_FORMAT, "created": time.time(), "python": platform.python_version(),
+               "machine": platform.machine(), "params": {"explore": explore, "seed": seed}, "scenarios": {}}
+    for name, scenario, check in (("запуск", ["3"], None), ("сессия", answers, expected)):
+        measured = [run_game(scenario, seed, check) for _ in range(runs)]
+        results["scenarios"][name] = {"answers": len(scenario), "runs": measured, "summary": summarize(measured)}
+    return results
+
+
+def format_metric(metric, value):
+    if metric in TIMES:
+        return f"{value * 1e3:.0f} мс"
+    if metric == "rss_kb":
+        return f"{value / 1024:.1f} МБ"
+    return f"{value / 1024:.1f} КБ"
+
+
+def compare(results, baseline, threshold):
+    """[(сценарий, метрика, было, стало, изменение, регрессия, шум)] по лучшим значениям"""
+    rows = []
+    for name, scenario in results["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if not base:
+            continue
+        for metric, current in scenario["summary"].items():
+            before = base["summary"].get(metric)
+            if not before:
+                continue
+            change = current["best"] / before["best"] - 1
+            noise = 0
+            if metric in TIMES:  # Замедление меньше разброса запусков не отличить от помех машины
+                noise = max(value["median"] / value["best"] - 1 for value in (current, before))
+            rows.append((name, metric, before["best"], current["best"], change, change > max(threshold, noise), noise))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Время, память и объем вывода целой игровой сессии по сценарию")
+    parser.add_argument("--explore", type=int, default=20, help="сколько раз исследовать локации")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=5, help="запусков каждого сценария")
+    parser.add_argument("--results-dir", default=RESULTS_DIR, help="куда сохранять результаты каждого прогона")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="базовый прогон для сравнения")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--update-baseline", action="store_true", help="записать этот прогон как базовый")
+    args = parser.parse_args(argv)
+
+    results = benchmark(args.explore, args.seed, args.runs)
+    os.makedirs(args.results_dir, exist_ok=True)
+    path = os.path.join(args.results_dir, time.strftime("session-%Y%m%d-%H%M%S.json"))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    print(f"{'Сценарий':<8} {'Ответов':>7} " + " ".join(f"{metric:>14}" for metric in METRICS))
+    for name, scenario in results["scenarios"].items():
+        summary = scenario["summary"]
+        print(f"{name:<8} {scenario['answers']:>7} "
+              + " ".join(f"{format_metric(metric, summary[metric]['best']) if metric in summary else '-':>14}"
+                         for metric in METRICS))
+    print(f"\nРезультаты: {path}")
+
+    if args.update_baseline:
+        shutil.copyfile(path, args.baseline)
+        print(f"Базовый прогон обновлен: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"Нет базового прогона {args.baseline}: запустите с --update-baseline")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("format") != RESULTS_FORMAT or baseline["params"] != results["params"]:
+        print(f"{args.baseline}: другой формат или параметры сценария {baseline.get('params')} - сравнение невозможно")
+        return 2
+
+    print(f"\nСравнение с {args.baseline} (Python {baseline['python']}, {baseline['machine']}), "
+          f"порог +{args.threshold:.0%}")
+    regressions = 0
+    for name, metric, before, after, change, regression, noise in compare(results, baseline, args.threshold):
+        regressions += regression
+        mark = "  РЕГРЕССИЯ" if regression else f"  (в пределах шума ±{noise:.0%})" if change > args.threshold else ""
+        print(f"{name:<8} {metric:<13} {format_metric(metric, before):>10} {format_metric(metric, after):>10} "
+              f"{change:>+8.1%}{mark}")
+    print(f"\nРегрессий: {regressions}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
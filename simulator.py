@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""Безголовый симулятор боёв по правилам Combat - без вывода на экран и пауз"""
+import argparse
+import random
+import time
+from collections import Counter
+
+from RPGame import (CLASS_STATS, ENEMIES, ENEMY_REGISTRY, ITEMS, MAX_LEVEL, ATTACK_SPREAD, ENEMY_SPREAD,
+                    SPECIAL_COST, FLEE_CHANCE, BURN_POWER, BURN_DURATION, ENEMY_LEVEL_SCALE, HEALTH_POTION,
+                    MANA_POTION, Character, attack_profile, special_profile, enemy_profile, scale_enemy)
+
+MAX_TURNS = 500  # Защита от бесконечного боя при неудачной политике
+
+WIN, LOSS, FLEE, TIMEOUT = "win", "loss", "flee", "timeout"
+
+
+def build_character(char_class, level=1, equip=True):
+    """Создать персонажа нужного уровня без анимаций, при желании надев стартовую экипировку"""
+    character = Character("Симуляция", char_class)
+    for _ in range(level - 1):
+        character.advance_level()
+
+    if equip:
+        for item_name in list(character.inventory):
+            slot = ITEMS[item_name]["type"]
+            if slot in character.equipment and character.equipment[slot] is None:
+                character.equipment[slot] = item_name
+                character.inventory[item_name] -= 1
+                if character.inventory[item_name] <= 0:
+                    del character.inventory[item_name]
+        character.refresh_stats()
+
+    return character
+
+
+def find_enemy(enemy_name):
+    """Найти шаблон врага по имени"""
+    return ENEMY_REGISTRY[enemy_name]
+
+
+class Matchup:
+    """Предрасчитанные параметры боя персонажа с конкретным (уже масштабированным) врагом"""
+
+    def __init__(self, character, enemy):
+        self.char_class = character.char_class
+        self.level = character.level
+        self.enemy_name = enemy["name"]
+
+        self.hp = character.hp
+        self.max_hp = character.max_hp
+        self.mp = character.mp
+        self.max_mp = character.max_mp
+        self.enemy_hp = enemy["hp"]
+
+        self.attack = attack_profile(character, enemy)
+        self.special = special_profile(character, enemy)
+        self.enemy_attack = enemy_profile(character, enemy)
+
+        self.health_potions = character.inventory.get(HEALTH_POTION, 0)
+        self.mana_potions = character.inventory.get(MANA_POTION, 0)
+        self.heal = ITEMS[HEALTH_POTION]["effect"]["hp"]
+        self.restore = ITEMS[MANA_POTION]["effect"]["mp"]
+
+        # Всё, что определяет переходы между состояниями боя - ключ для кэшей
+        self.key = (self.max_hp, self.max_mp, self.attack, self.special,
+                    self.enemy_attack, self.heal, self.restore)
+
+    @classmethod
+    def for_level(cls, char_class, level, enemy_name, equip=True, scale_step=ENEMY_LEVEL_SCALE):
+        """Бой персонажа класса char_class на уровне level с врагом, масштабированным как в GameState.start_combat"""
+        character = build_character(char_class, level, equip)
+        return cls(character, scale_enemy(find_enemy(enemy_name), level, scale_step))
+
+    def initial_state(self):
+        """Состояние начала боя: (ОЗ, ОМ, ОЗ врага, горение, зелья здоровья, зелья маны)"""
+        return (self.hp, self.mp, self.enemy_hp, (), self.health_potions, self.mana_potions)
+
+
+# Политики получают Matchup и состояние initial_state() и возвращают действие
+def attack_policy(matchup, state):
+    """Всегда базовая атака"""
+    return "attack"
+
+
+def special_policy(matchup, state):
+    """Специальная атака, пока хватает ОМ"""
+    return "special" if state[1] >= SPECIAL_COST else "attack"
+
+
+def cautious_policy(matchup, state):
+    """Лечиться при ОЗ ниже 30%, иначе специальная атака при наличии ОМ"""
+    hp, mp, enemy_hp, burns, health_potions, mana_potions = state
+    if health_potions and hp < matchup.max_hp * 0.3:
+        return "health_potion"
+    if mp >= SPECIAL_COST:
+        return "special"
+    return "attack"
+
+
+POLICIES = {
+    "attack": attack_policy,
+    "special": special_policy,
+    "cautious": cautious_policy,
+}
+
+
+class FightStats:
+    """Сводка результатов серии боёв"""
+
+    def __init__(self):
+        self.fights = 0
+        self.outcomes = Counter()
+        self.turns = Counter()    # Ходов до победы
+        self.fight_turns = Counter()  # Ходов до конца боя при любом исходе, кроме таймаута
+        self.hp_left = Counter()  # ОЗ персонажа после победы
+
+    @property
+    def win_rate(self):
+        return self.outcomes[WIN] / self.fights if self.fights else 0.0
+
+    def rate(self, outcome):
+        return self.outcomes[outcome] / self.fights if self.fights else 0.0
+
+    def merge(self, other):
+        self.fights += other.fights
+        self.outcomes.update(other.outcomes)
+        self.turns.update(other.turns)
+        self.fight_turns.update(other.fight_turns)
+        self.hp_left.update(other.hp_left)
+        return self
+
+    def summary(self):
+        """Основные показатели в виде словаря"""
+        return {
+            "fights": self.fights,
+            "win_rate": self.win_rate,
+            "loss_rate": self.rate(LOSS),
+            "flee_rate": self.rate(FLEE),
+            "timeout_rate": self.rate(TIMEOUT),
+            "turns_mean": _mean(self.turns),
+            "turns_p50": _percentile(self.turns, 0.5),
+            "turns_p90": _percentile(self.turns, 0.9),
+            "fight_turns_mean": _mean(self.fight_turns),  # Как expected_turns точного расчета (odds.py)
+            "hp_left_mean": _mean(self.hp_left),
+            "hp_left_p10": _percentile(self.hp_left, 0.1),
+            "hp_left_p50": _percentile(self.hp_left, 0.5),
+        }
+
+
+def _mean(counter):
+    total = sum(counter.values())
+    if not total:
+        return 0.0
+    return sum(value * count for value, count in counter.items()) / total
+
+
+def _percentile(counter, q):
+    total = sum(counter.values())
+    if not total:
+        return 0
+    threshold = q * total
+    seen = 0
+    for value in sorted(counter):
+        seen += counter[value]
+        if seen >= threshold:
+            return value
+    return value
+
+
+def run_fights(matchup, fights, policy=special_policy, rng=None, max_turns=MAX_TURNS):
+    """Провести серию боёв по правилам Combat и собрать FightStats.
+
+    Порядок бросков случайных чисел совпадает с Combat.character_turn/enemy_turn
+    и командами боя (Attack, Special, Flee), поэтому при одинаковом зерне бой повторяет игровой.
+    """
+    rng = rng or random.Random()
+    rand = rng.random
+    stats = FightStats()
+    outcomes = stats.outcomes
+    turns_hist = stats.turns
+    fight_turns = stats.fight_turns
+    hp_hist = stats.hp_left
+
+    dodge_chance, crit_chance, damage, crit_damage = matchup.attack
+    attack_low = ATTACK_SPREAD[0]
+    attack_span = ATTACK_SPREAD[1] - ATTACK_SPREAD[0]
+    special_crit, special_damage, special_crit_damage, special_spread, burn_chance = matchup.special
+    special_low = special_spread[0]
+    special_span = special_spread[1] - special_spread[0]
+    miss_chance, enemy_damage = matchup.enemy_attack
+    enemy_low = ENEMY_SPREAD[0]
+    enemy_span = ENEMY_SPREAD[1] - ENEMY_SPREAD[0]
+    max_hp, max_mp = matchup.max_hp, matchup.max_mp
+    heal, restore = matchup.heal, matchup.restore
+
+    for _ in range(fights):
+        hp, mp, enemy_hp = matchup.hp, matchup.mp, matchup.enemy_hp
+        health_potions, mana_potions = matchup.health_potions, matchup.mana_potions
+        burns = ()
+        turns = 0
+
+        while True:
+            turns += 1
+            if turns > max_turns:
+                outcome = TIMEOUT
+                break
+
+            action = policy(matchup, (hp, mp, enemy_hp, burns, health_potions, mana_potions))
+
+            # Ход персонажа
+            if action == "attack":
+                if rand() < dodge_chance:
+                    continue  # Уклонение - враг не отвечает
+                hit = crit_damage if rand() < crit_chance else damage
+                enemy_hp -= round(hit * (attack_low + attack_span * rand()))
+            elif action == "special":
+                if mp < SPECIAL_COST:
+                    continue  # Недостаточно ОМ - ход не засчитан
+                mp -= SPECIAL_COST
+                hit = special_crit_damage if special_crit and rand() < special_crit else special_damage
+                enemy_hp -= round(hit * (special_low + special_span * rand()))
+                if burn_chance and rand() < burn_chance:
+                    burns += (BURN_DURATION,)
+            elif action == "health_potion":
+                if not health_potions:
+                    continue
+                health_potions -= 1
+                hp = min(max_hp, hp + heal)
+            elif action == "mana_potion":
+                if not mana_potions:
+                    continue
+                mana_potions -= 1
+                mp = min(max_mp, mp + restore)
+            elif action == "flee":
+                if rand() < FLEE_CHANCE:
+                    outcome = FLEE
+                    break
+            else:
+                raise ValueError(f"Неизвестное действие: {action}")
+
+            # Эффекты после атаки персонажа
+            if burns and action in ("attack", "special"):
+                enemy_hp -= BURN_POWER * len(burns)
+                burns = tuple(d - 1 for d in burns if d > 1)
+
+            # Ход врага
+            if enemy_hp > 0 and rand() >= miss_chance:
+                hp -= round(enemy_damage * (enemy_low + enemy_span * rand()))
+                if burns:
+                    enemy_hp -= BURN_POWER * len(burns)
+                    burns = tuple(d - 1 for d in burns if d > 1)
+
+            if enemy_hp <= 0:
+                outcome = WIN
+                turns_hist[turns] += 1
+                hp_hist[hp] += 1
+                break
+            if hp <= 0:
+                outcome = LOSS
+                break
+
+        outcomes[outcome] += 1
+        if outcome != TIMEOUT:
+            fight_turns[turns] += 1
+
+    stats.fights = fights
+    return stats
+
+
+def simulate(char_class, level, enemy_name, fights=1000, policy=special_policy, seed=None, equip=True):
+    """Серия боёв для одной комбинации класса, уровня и врага"""
+    matchup = Matchup.for_level(char_class, level, enemy_name, equip)
+    return run_fights(matchup, fights, policy, random.Random(seed))
+
+
+def sweep(classes=None, levels=None, enemies=None, fights=1000, policy=special_policy, seed=None, equip=True):
+    """Перебрать все комбинации класс x уровень x враг; вернуть {(класс, уровень, враг): FightStats}"""
+    classes = classes or list(CLASS_STATS)
+    levels = levels or range(1, MAX_LEVEL + 1)
+    enemies = enemies or [e["name"] for e in ENEMIES]
+    rng = random.Random(seed)
+
+    results = {}
+    for char_class in classes:
+        for level in levels:
+            for enemy_name in enemies:
+                matchup = Matchup.for_level(char_class, level, enemy_name, equip)
+                results[(char_class, level, enemy_name)] = run_fights(matchup, fights, policy, rng)
+    return results
+
+
+def _parse_levels(text):
+    if "-" in text:
+        low, high = text.split("-")
+        return range(int(low), int(high) + 1)
+    return [int(level) for level in text.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Безголовая симуляция боёв для балансировки")
+    parser.add_argument("--fights", type=int, default=1000, help="боёв на каждую комбинацию")
+    parser.add_argument("--levels", default=f"1-{MAX_LEVEL}", help="например 1-20 или 1,5,10")
+    parser.add_argument("--classes", nargs="*", help="классы персонажей (по умолчанию все)")
+    parser.add_argument("--enemies", nargs="*", help="враги (по умолчанию все)")
+    parser.add_argument("--policy", choices=sorted(POLICIES) + ["auto"], default="special")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--no-equip", action="store_true", help="не надевать стартовую экипировку")
+    args = parser.parse_args(argv)
+
+    if args.policy == "auto":
+        from autobattle import AutoBattler
+        policy = AutoBattler()
+    else:
+        policy = POLICIES[args.policy]
+
+    start = time.perf_counter()
+    results = sweep(args.classes, _parse_levels(args.levels), args.enemies, args.fights,
+                    policy, args.seed, not args.no_equip)
+    elapsed = time.perf_counter() - start
+
+    print(f"{'Класс':<8} {'Ур.':>3} {'Враг':<11} {'Победы':>7} {'Бегство':>7} {'Ходы':>6} "
+          f"{'p50':>4} {'p90':>4} {'ОЗ ост.':>8} {'p10':>5}")
+    for (char_class, level, enemy_name), stats in results.items():
+        s = stats.summary()
+        print(f"{char_class:<8} {level:>3} {enemy_name:<11} {s['win_rate']:>7.1%} {s['flee_rate']:>7.1%} "
+              f"{s['turns_mean']:>6.2f} {s['turns_p50']:>4} {s['turns_p90']:>4} "
+              f"{s['hp_left_mean']:>8.1f} {s['hp_left_p10']:>5}")
+
+    total = sum(stats.fights for stats in results.values())
+    print(f"\n{total} боёв за {elapsed:.2f} с ({total / elapsed:,.0f} боёв/с)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""Долгий прогон под нагрузкой: тысячи ботов играют по стратегиям в нескольких процессах без вывода.
+
+Показывает действия в секунду, рост памяти на игрока со временем и все
+исключения - чтобы утечки и провалы производительности находились до игроков.
+
+    python -m soak --players 2000 --processes 4 --duration 600
+    python -m soak --policy random --duration 60 --interval 5 --db
+"""
+import argparse
+import collections
+import json
+import multiprocessing
+import os
+import queue
+import random
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+
+from RPGame import (CLASS_STATS, HEALTH_POTION, ITEMS, LOCATIONS, MANA_POTION, QUESTS, REST_COST, SPECIAL_COST,
+                    AcceptQuest, Attack, Buy, Character, Equip, Explore, Flee, GameState, Rest, Sell, Special,
+                    Travel, Use, shop_items)
+from savefile import encode
+
+DEFAULT_PLAYERS = 1000
+DEFAULT_DURATION = 60.0
+DEFAULT_INTERVAL = 5.0
+SAMPLE_SIZE = 50  # Игроков процесса, по которым меряются размеры персонажа и сохранения
+CLIFF = 0.5  # Интервал медленнее лучшего больше чем вдвое - провал производительности
+SAVE_CHANCE = 0.05  # Доля ходов вне боя, после которых бот сохраняется (как автосохранение)
+LOAD_CHANCE = 0.01  # ... и перезапускается из своего сохранения
+HOME = LOCATIONS[0]["name"]
+SHOP = shop_items(HOME)
+POTIONS = (HEALTH_POTION, MANA_POTION)
+GEAR_SLOTS = ("weapon", "armor", "boots", "accessory")
+
+SAVE, LOAD = "save", "load"  # Действия вне ядра: запись слота и загрузка персонажа из него
+POLICIES = {}  # имя -> функция (state, rng), возвращающая команду, SAVE или LOAD
+
+
+def policy(name):
+    def register(choose):
+        POLICIES[name] = choose
+        return choose
+    return register
+
+
+def fight(state, rng):
+    """Ход в бою, общий для осмысленных стратегий: лечиться, бежать при смерти, иначе бить"""
+    character = state.character
+    if character.hp < character.max_hp * 0.3:
+        if character.inventory.get(POTIONS[0], 0) > 0:
+            return Use(POTIONS[0])
+        if character.hp < character.max_hp * 0.15:
+            return Flee()
+    if character.mp >= SPECIAL_COST and rng.random() < 0.5:
+        return Special()
+    return Attack()
+
+
+def persistence(rng):
+    """SAVE, LOAD или None: боты сохраняются и загружаются так же часто при любой стратегии"""
+    roll = rng.random()
+    if roll < LOAD_CHANCE:
+        return LOAD
+    if roll < SAVE_CHANCE:
+        return SAVE
+    return None
+
+
+@policy("random")
+def random_policy(state, rng):
+    """Любая команда наугад, в том числе недопустимые: ядро должно отказать, не упав"""
+    character = state.character
+    if state.combat:
+        return rng.choice((Attack(), Special(), Flee(), Use(rng.choice(POTIONS))))
+    action = persistence(rng)
+    if action:
+        return action
+    owned = list(character.inventory) or list(SHOP)
+    return rng.choice((
+        Explore(), Explore(), Explore(),
+        Travel(rng.choice(LOCATIONS)["name"]),
+        Buy(rng.choice(SHOP)),
+        Sell(rng.choice(owned)),
+        Equip(rng.choice(owned)),
+        Use(rng.choice(owned)),
+        Rest(),
+        AcceptQuest(rng.choice(QUESTS)["id"]),
+    ))
+
+
+@policy("explorer")
+def explorer_policy(state, rng):
+    """Сценарий обычного игрока: задания, зелья и отдых в Деревне, охота там, где по силам"""
+    character = state.character
+    if state.combat:
+        return fight(state, rng)
+    action = persistence(rng)
+    if action:
+        return action
+    if character.hp < character.max_hp * 0.5:
+        if character.location == HOME and character.gold >= REST_COST:
+            return Rest()
+        if character.inventory.get(POTIONS[0], 0) > 0:
+            return Use(POTIONS[0])
+        if character.location != HOME:
+            return Travel(HOME)
+    if character.location == HOME:
+        for quest in QUESTS:
+            if quest["id"] not in character.active_quests and quest["id"] not in character.completed_quests:
+                return AcceptQuest(quest["id"])
+        if character.inventory.get(POTIONS[0], 0) < 3 and character.gold >= ITEMS[POTIONS[0]]["value"] * 2:
+            return Buy(POTIONS[0])
+    # Каждые пять уровней - следующая локация
+    hunt = LOCATIONS[min(len(LOCATIONS) - 1, 1 + (character.level - 1) // 5)]["name"]
+    if character.location != hunt and rng.random() < 0.2:
+        return Travel(hunt)
+    return Explore()
+
+
+@policy("trader")
+def trader_policy(state, rng):
+    """Торговец: покупает, надевает и продает снаряжение, за золотом ходит в Лес - нагрузка на инвентарь"""
+    character = state.character
+    if state.combat:
+        return fight(state, rng)
+    action = persistence(rng)
+    if action:
+        return action
+    if character.location != HOME:
+        return Travel(HOME) if character.gold >= 100 or character.hp < character.max_hp * 0.3 else Explore()
+    if character.hp < character.max_hp * 0.5 and character.gold >= REST_COST:
+        return Rest()
+    equipped = set(character.equipment.values())
+    spare = [item for item, count in character.inventory.items()
+             if count > 0 and ITEMS[item]["type"] in GEAR_SLOTS]
+    if spare and rng.random() < 0.5:
+        return Equip(rng.choice(spare))
+    for_sale = [item for item, count in character.inventory.items() if count > 0 and item not in equipped]
+    if for_sale and rng.random() < 0.3:
+        return Sell(rng.choice(for_sale))
+    affordable = [item for item in SHOP if ITEMS[item]["value"] <= character.gold]
+    if affordable:
+        return Buy(rng.choice(affordable))
+    return Travel(LOCATIONS[1]["name"])
+
+
+class Player:
+    """Бот: персонаж в GameState ядра, своя стратегия и свой генератор случайностей"""
+    __slots__ = ("slot", "policy", "rng", "state", "saved", "action")
+
+    def __init__(self, slot, policy_name, seed):
+        self.slot = slot
+        self.policy = POLICIES[policy_name]
+        self.rng = random.Random(seed)
+        self.saved = False
+        self.action = None  # Последний ход: с ним в отчет попадает исключение
+        self.reset()
+
+    def reset(self):
+        """Новый персонаж в том же слоте - после исключения прежнее состояние ненадежно"""
+        self.state = GameState(Character(self.slot, self.rng.choice(list(CLASS_STATS))), self.rng)
+
+    def step(self, store):
+        """Один ход стратегии"""
+        self.action = None
+        action = self.action = self.policy(self.state, self.rng)
+        if action == LOAD and self.saved:
+            self.state = GameState(Character.from_dict(store.load(self.slot)), self.rng)
+        elif action in (SAVE, LOAD):
+            store.record(self.slot, self.state.character.to_dict())  # Как автосохранение Game
+            self.saved = True
+        else:
+            self.state.apply(action)
+        return action
+
+
+def rss_kb():
+    """Текущая память процесса в КБ: /proc на Linux, иначе пиковая по rusage; или None"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def open_files():
+    """Открытых файлов процесса (сегменты журналов, база) или None, если /proc нет"""
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def measure_players(players):
+    """Средние размеры персонажа по выборке игроков: в них видны утечки состояния"""
+    sample = players[::max(1, len(players) // SAMPLE_SIZE)]
+    totals = collections.Counter()
+    for player in sample:
+        character = player.state.character
+        totals["inventory"] += len(character.inventory)
+        totals["empty"] += sum(1 for count in character.inventory.values() if count <= 0)
+        totals["progress"] += sum(len(progress) for progress in character.quest_progress.values())
+        totals["completed"] += len(character.completed_quests)
+        totals["level"] += character.level
+        totals["save_bytes"] += len(encode(character.to_dict()))
+    return {name: value / len(sample) for name, value in totals.items()}
+
+
+def open_store(directory, index, db):
+    if db:
+        from database import CharacterDB
+        return CharacterDB(os.path.join(directory, f"soak-{index}.db"))
+    from saves import SaveStore
+    return SaveStore(os.path.join(directory, f"soak-{index}"))
+
+
+def worker(index, players, policy_name, seed, duration, interval, directory, db, ready, go, results):
+    """Процесс нагрузки: players ботов по очереди делают по ходу до конца duration.
+
+    Каждые interval секунд в results уходит замер: ходы, память, файлы,
+    размеры персонажей и исключения с начала прогона.
+    """
+    store = open_store(directory, index, db)
+    names = list(POLICIES) if policy_name == "mixed" else [policy_name]
+    bots = [Player(f"bot{index}_{n}", names[n % len(names)], seed * 1000003 + index * 100003 + n)
+            for n in range(players)]
+    errors = collections.Counter()
+    details = {}  # ключ исключения -> первый traceback
+    commands = collections.Counter()
+
+    def sample(tick, actions, elapsed):
+        results.put({"worker": index, "tick": tick, "time": elapsed, "actions": actions, "rss_kb": rss_kb(),
+                     "files": open_files(), "players": measure_players(bots), "errors": dict(errors),
+                     "details": details, "commands": dict(commands)})
+
+    ready.put(index)
+    go.wait()
+    start = time.perf_counter()
+    deadline = start + duration
+    actions = tick = 0
+    sample(tick, actions, 0.0)
+    next_sample = start + interval
+    now = start
+    while now < deadline:
+        for bot in bots:
+            try:
+                action = bot.step(store)
+                commands[action if isinstance(action, str) else type(action).__name__] += 1
+            except Exception as error:  # Прогон ищет любые ошибки: считаем и играем дальше новым персонажем
+                frame = traceback.extract_tb(error.__traceback__)[-1]
+                key = (f"{type(error).__name__}: {error} - {bot.action or 'стратегия'!r} "
+                       f"в {os.path.basename(frame.filename)}:{frame.lineno}")
+                errors[key] += 1
+                details.setdefault(key, traceback.format_exc())
+                bot.reset()
+            actions += 1
+        now = time.perf_counter()
+        if now >= next_sample or now >= deadline:
+            tick += 1
+            sample(tick, actions, now - start)
+            next_sample += interval
+    store.close()
+    results.put({"worker": index, "done": True})
+
+
+def run(players, processes, policy_name, seed, duration, interval, directory, db):
+    """Прогон: [(tick, сводка по процессам)] и итоговые исключения и команды"""
+    ready, results = multiprocessing.Queue(), multiprocessing.Queue()
+    go = multiprocessing.Event()
+    shares = [players // processes + (n < players % processes) for n in range(processes)]
+    children = [multiprocessing.Process(target=worker, daemon=True,
+                                        args=(n, shares[n], policy_name, seed, duration, interval,
+                                              directory, db, ready, go, results))
+                for n in range(processes)]
+    for child in children:
+        child.start()
+    for _ in children:
+        receive(ready, children)  # Все боты созданы: память на старте их уже учитывает
+    go.set()
+
+    ticks = collections.defaultdict(dict)  # tick -> {процесс: замер}
+    last = {}
+    done = 0
+    while done < processes:
+        message = receive(results, children)
+        if message.get("done"):
+            done += 1
+        else:
+            ticks[message["tick"]][message["worker"]] = last[message["worker"]] = message
+    for child in children:
+        child.join()
+        if child.exitcode:
+            raise RuntimeError(f"процесс нагрузки завершился с кодом {child.exitcode}")
+
+    timeline = [summarize(tick, samples, players) for tick, samples in sorted(ticks.items())
+                if len(samples) == processes]
+    errors, details, commands = collections.Counter(), {}, collections.Counter()
+    for message in last.values():
+        errors.update(message["errors"])
+        details.update(message["details"])
+        commands.update(message["commands"])
+    return timeline, errors, details, commands
+
+
+def receive(messages, children):
+    """Следующее сообщение процессов нагрузки; RuntimeError, если кто-то из них упал, не дописав"""
+    while True:
+        try:
+            return messages.get(timeout=1)
+        except queue.Empty:
+            for child in children:
+                if child.exitcode:
+                    raise RuntimeError(f"процесс нагрузки завершился с кодом {child.exitcode}") from None
+
+
+def summarize(tick, samples, players):
+    """Замер всех процессов за один интервал"""
+    samples = list(samples.values())
+    rss = [sample["rss_kb"] for sample in samples]
+    files = [sample["files"] for sample in samples]
+    return {"tick": tick, "time": max(sample["time"] for sample in samples),
+            "actions": sum(sample["actions"] for sample in samples),
+            "rss_kb": None if None in rss else sum(rss),
+            "files": None if None in files else sum(files),
+            "players": {name: sum(sample["players"][name] for sample in samples) / len(samples)
+                        for name in samples[0]["players"]},
+            "kb_per_player": None if None in rss else sum(rss) / players}
+
+
+def slope(points):
+    """Наклон прямой по методу наименьших квадратов: прирост y за единицу x"""
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread if spread else 0.0
+
+
+def rates(timeline):
+    """Действий в секунду по интервалам (первый замер - старт, у него интервала нет)"""
+    return [(after["actions"] - before["actions"]) / (after["time"] - before["time"])
+            for before, after in zip(timeline, timeline[1:]) if after["time"] > before["time"]]
+
+
+def report(timeline, errors, details, commands, players):
+    """Таблица по интервалам, рост памяти, провалы производительности и исключения; True - все чисто"""
+    print(f"{'Время':>7} {'Действий/с':>11} {'RSS МБ':>8} {'КБ/игрок':>9} {'Файлов':>7} {'Инвентарь':>10} "
+          f"{'Пустых':>7} {'Прогресс':>9} {'Уровень':>8} {'Сохр. Б':>8}")
+    speeds = rates(timeline)
+    for n, point in enumerate(timeline):
+        sizes = point["players"]
+        rate = f"{speeds[n - 1]:.0f}" if n else "-"
+        rss = f"{point['rss_kb'] / 1024:.1f}" if point["rss_kb"] is not None else "-"
+        per_player = f"{point['kb_per_player']:.2f}" if point["kb_per_player"] is not None else "-"
+        print(f"{point['time']:>6.0f}с {rate:>11} {rss:>8} {per_player:>9} {point['files'] or '-':>7} "
+              f"{sizes['inventory']:>10.2f} {sizes['empty']:>7.2f} {sizes['progress']:>9.2f} "
+              f"{sizes['level']:>8.1f} {sizes['save_bytes']:>8.0f}")
+
+    clean = True
+    total = timeline[-1]["actions"] if timeline else 0
+    print(f"\nДействий: {total} за {timeline[-1]['time']:.0f} с, игроков: {players}" if timeline else "\nНет замеров")
+    print("Команды: " + ", ".join(f"{name} {count}" for name, count in commands.most_common()))
+    # Первый интервал - разогрев (кэши, аллокатор): рост считается после него
+    grown = [(point["time"] / 60, point["kb_per_player"]) for point in timeline[1:]
+             if point["kb_per_player"] is not None]
+    if len(grown) >= 2:
+        print(f"Рост памяти: {slope(grown):+.3f} КБ на игрока в минуту "
+              f"({timeline[1]['kb_per_player']:.2f} -> {timeline[-1]['kb_per_player']:.2f} КБ)")
+    for name, label in (("inventory", "записей инвентаря"), ("progress", "записей прогресса заданий"),
+                        ("save_bytes", "байт сохранения")):
+        points = [(point["time"] / 60, point["players"][name]) for point in timeline[1:]]
+        if len(points) >= 2:
+            print(f"Рост {label}: {slope(points):+.3f} на игрока в минуту")
+    if speeds:
+        best = max(speeds)
+        slow = [(timeline[n + 1]["time"], speed) for n, speed in enumerate(speeds) if speed < best * CLIFF]
+        if slow:
+            clean = False
+            print(f"ПРОВАЛ ПРОИЗВОДИТЕЛЬНОСТИ: {len(slow)} интервал(ов) медленнее {CLIFF:.0%} от лучшего "
+                  f"({best:.0f}/с), первый на {slow[0][0]:.0f} с: {slow[0][1]:.0f}/с")
+    if errors:
+        clean = False
+        print(f"\nИсключений: {sum(errors.values())}")
+        for key, count in errors.most_common():
+            print(f"{count:>8}  {key}")
+        first = errors.most_common(1)[0][0]
+        print(f"\nПервый traceback самого частого:\n{details[first]}")
+    else:
+        print("Исключений нет")
+    return clean
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Долгий прогон ботов по стратегиям: пропускная способность, "
+                                                 "рост памяти и исключения")
+    parser.add_argument("--players", type=int, default=DEFAULT_PLAYERS, help="ботов всего")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="процессов нагрузки")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="секунд прогона")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="секунд между замерами")
+    parser.add_argument("--policy", choices=[*POLICIES, "mixed"], default="mixed",
+                        help="стратегия ботов; mixed - все по очереди")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", action="store_true", help="сохранять в SQLite (CharacterDB), а не в файлы")
+    parser.add_argument("--saves", metavar="DIR", help="папка сохранений ботов (по умолчанию временная)")
+    parser.add_argument("--output", metavar="PATH", help="записать замеры и исключения в JSON")
+    args = parser.parse_args(argv)
+    if args.players < 1 or args.processes < 1:
+        parser.error("нужен хотя бы один бот и один процесс")
+    processes = min(args.processes, args.players)
+
+    directory = args.saves or tempfile.mkdtemp(prefix="soak-")
+    os.makedirs(directory, exist_ok=True)
+    print(f"Ботов: {args.players} в {processes} процесс(ах), стратегия {args.policy}, "
+          f"{args.duration:.0f} с, замер каждые {args.interval:.0f} с\n", flush=True)
+    try:
+        timeline, errors, details, commands = run(args.players, processes, args.policy, args.seed,
+                                                  args.duration, args.interval, directory, args.db)
+    finally:
+        if not args.saves:
+            shutil.rmtree(directory, ignore_errors=True)
+    clean = report(timeline, errors, details, commands, args.players)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "params": vars(args), "timeline": timeline,
+                       "errors": dict(errors), "details": details, "commands": dict(commands)},
+                      f, ensure_ascii=False, indent=2)
+    return 0 if clean else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
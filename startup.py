@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Бенчмарк запуска: разбор `python -X importtime` для импорта модуля игры"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+# Тяжелые зависимости, которые должны загружаться только при первом использовании
+LAZY_MODULES = ("pyfiglet", "tqdm", "termcolor", "colorama")
+
+
+def import_times(module, python=sys.executable):
+    """Один запуск `python -X importtime -c 'import module'`: {модуль: (собственное, общее) в мкс}"""
+    result = subprocess.run([python, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Время импорта модулей игры")
+    parser.add_argument("module", nargs="?", default="RPGame")
+    parser.add_argument("--runs", type=int, default=7, help="запусков; берется медиана")
+    parser.add_argument("--top", type=int, default=15, help="сколько самых долгих импортов показать")
+    parser.add_argument("--budget-ms", type=float, help="код возврата 1, если медиана импорта больше")
+    args = parser.parse_args(argv)
+
+    runs = [import_times(args.module) for _ in range(args.runs)]
+    cumulative = defaultdict(list)
+    own = defaultdict(list)
+    for times in runs:
+        for name, (self_us, cumulative_us) in times.items():
+            own[name].append(self_us)
+            cumulative[name].append(cumulative_us)
+
+    total = statistics.median(cumulative[args.module]) / 1000
+    print(f"import {args.module}: {total:.1f} мс (медиана {args.runs} запусков), модулей: {len(cumulative)}")
+    print(f"\n{'Модуль':<40} {'Свое, мс':>9} {'Всего, мс':>10}")
+    slowest = sorted(cumulative, key=lambda name: statistics.median(cumulative[name]), reverse=True)
+    for name in slowest[:args.top]:
+        print(f"{name:<40} {statistics.median(own[name]) / 1000:>9.2f} "
+              f"{statistics.median(cumulative[name]) / 1000:>10.2f}")
+
+    failed = False
+    eager = [name for name in LAZY_MODULES if name in cumulative]
+    if eager:
+        print(f"\nЗагружены при импорте (должны быть отложены): {', '.join(eager)}")
+        failed = True
+    if args.budget_ms is not None and total > args.budget_ms:
+        print(f"\nИмпорт дольше бюджета {args.budget_ms:.1f} мс")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
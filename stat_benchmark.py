@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Микробенчмарк характеристик персонажа: чтение по кэшу против обхода экипировки на каждом обращении"""
+import argparse
+import random
+import time
+
+from RPGame import ITEMS, STAT_NAMES, Character, Combat
+from simulator import build_character, find_enemy, scale_enemy
+
+
+class UncachedCharacter(Character):
+    """Character с прежними свойствами: каждое чтение обходит все слоты экипировки"""
+    __slots__ = ()
+
+    def _equipment_bonus(self, stat):
+        bonus = 0
+        for slot, item_name in self.equipment.items():
+            if item_name and stat in ITEMS[item_name]["effect"]:
+                bonus += ITEMS[item_name]["effect"][stat]
+        return bonus
+
+    strength = property(lambda self: self.base_strength + self._equipment_bonus("strength"))
+    defense = property(lambda self: self.base_defense + self._equipment_bonus("defense"))
+    agility = property(lambda self: self.base_agility + self._equipment_bonus("agility"))
+    critical = property(lambda self: self.base_critical + self._equipment_bonus("critical"))
+    luck = property(lambda self: self.base_luck + self._equipment_bonus("luck"))
+
+
+def uncached(character):
+    """Тот же персонаж, но с характеристиками без кэша"""
+    character.__class__ = UncachedCharacter
+    return character
+
+
+def fight_turns(character, enemy_template, fights, seed):
+    """Бои настоящим Combat (атака каждый ход): (ходов, секунд)"""
+    random.seed(seed)
+    turns = 0
+    start = time.perf_counter()
+    for _ in range(fights):
+        character.hp = character.max_hp
+        combat = Combat(character, enemy_template)
+        while True:
+            turns += 1
+            combat.character_turn("attack")
+            if combat.is_enemy_defeated():
+                break
+            combat.enemy_turn()
+            if combat.is_character_defeated():
+                break
+    return turns, time.perf_counter() - start
+
+
+def stat_reads(character, reads):
+    """Секунд на reads чтений всех характеристик"""
+    start = time.perf_counter()
+    for _ in range(reads):
+        for stat in STAT_NAMES:
+            getattr(character, stat)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Стоимость чтения характеристик персонажа в бою")
+    parser.add_argument("--char-class", default="Воин")
+    parser.add_argument("--level", type=int, default=10)
+    parser.add_argument("--enemy", default="Тролль")
+    parser.add_argument("--fights", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    enemy = scale_enemy(find_enemy(args.enemy), args.level)
+    variants = [("кэш", build_character(args.char_class, args.level)),
+                ("обход", uncached(build_character(args.char_class, args.level)))]
+    assert all(getattr(variants[0][1], stat) == getattr(variants[1][1], stat) for stat in STAT_NAMES)
+
+    print(f"{args.char_class} ур. {args.level} против {args.enemy}: {args.fights} боев, атака каждый ход\n")
+    print(f"{'Вариант':<8} {'Ходов':>7} {'мкс/ход':>9} {'нс/чтение':>10}")
+    for name, character in variants:
+        turns, seconds = fight_turns(character, enemy, args.fights, args.seed)
+        reads = stat_reads(character, args.reads) / (args.reads * len(STAT_NAMES))
+        print(f"{name:<8} {turns:>7} {seconds / turns * 1e6:>9.2f} {reads * 1e9:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()